@@ -1,6 +1,7 @@
 import os
 import json
 from anthropic import Anthropic
+from metrics import track_llm_call
 
 client = None
 
@@ -15,6 +16,17 @@ def get_client():
     return client
 
 
+def shop_data(db, store_id):
+    """(inventory, consumption, alerts, production_vs_consumption) the insights are based on."""
+    from routes import dashboard
+    return (
+        dashboard.current_inventory(store_id=store_id, db=db),
+        dashboard.daily_consumption(days=7, store_id=store_id, db=db),
+        dashboard.low_stock_alerts(store_id=store_id, db=db),
+        dashboard.production_vs_consumption(days=7, store_id=store_id, db=db),
+    )
+
+
 def generate_insights(inventory, consumption, alerts, production_vs_consumption):
     """Generate AI insights from current shop data using Claude."""
     c = get_client()
@@ -25,7 +37,19 @@ def generate_insights(inventory, consumption, alerts, production_vs_consumption)
             "make_list": [],
             "production_notes": [],
         }
+    try:
+        return request_insights(c, inventory, consumption, alerts, production_vs_consumption)
+    except Exception as e:
+        return {
+            "summary": f"AI insights temporarily unavailable: {str(e)}",
+            "predictions": [],
+            "make_list": [],
+            "production_notes": [],
+        }
 
+
+def request_insights(c, inventory, consumption, alerts, production_vs_consumption):
+    """Ask Claude for insights; raises if the call fails (the scheduler records it)."""
     data_context = f"""Here is the current data for an ice cream shop:
 
 ## Current Inventory
@@ -60,7 +84,7 @@ Respond in this exact JSON format:
 
 Be specific with numbers. If data is limited, say so and give best estimates. Keep it practical and actionable for shop staff."""
 
-    try:
+    with track_llm_call("anthropic"):
         response = c.messages.create(
             model="claude-sonnet-4-5-20250929",
             max_tokens=1024,
@@ -68,20 +92,13 @@ Be specific with numbers. If data is limited, say so and give best estimates. Ke
                 {"role": "user", "content": data_context + "\n\n" + prompt}
             ],
         )
-        text = response.content[0].text
-        # Extract JSON from response
-        start = text.find("{")
-        end = text.rfind("}") + 1
-        if start >= 0 and end > start:
-            return json.loads(text[start:end])
-        return {"summary": text, "predictions": [], "make_list": [], "production_notes": []}
-    except Exception as e:
-        return {
-            "summary": f"AI insights temporarily unavailable: {str(e)}",
-            "predictions": [],
-            "make_list": [],
-            "production_notes": [],
-        }
+    text = response.content[0].text
+    # Extract JSON from response
+    start = text.find("{")
+    end = text.rfind("}") + 1
+    if start >= 0 and end > start:
+        return json.loads(text[start:end])
+    return {"summary": text, "predictions": [], "make_list": [], "production_notes": []}
 
 
 def _today():
@@ -4,15 +4,28 @@ import os
 # Ensure backend/ is on the path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from fastapi import FastAPI, Depends
+import time
+from fastapi import FastAPI, Depends, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from database import init_db, get_db
-from routes import flavors, production, counts, dashboard, reports, voice, photo_import
-
-app = FastAPI(title="Ice Cream Inventory Tracker")
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from database import get_db, engine
+from routes import flavors, production, counts, dashboard, reports, voice, photo_import, export, imports, forecast, stores, admin, sync
+import query_stats
+import metrics
+import profiling
+import assets
+import scheduler
+import warmup
+from compression import CompressionMiddleware
+from serialization import FastJSONResponse, FastJSONRoute
+from stores import get_store_id
+
+app = FastAPI(title="Ice Cream Inventory Tracker", default_response_class=FastJSONResponse)
+app.router.route_class = FastJSONRoute  # orjson for app-level routes too (see serialization.py)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +33,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries", "X-Profiled-Status"],
 )
 
+# gzip/brotli for API responses above COMPRESS_MIN_BYTES (see compression.py)
+app.add_middleware(CompressionMiddleware)
+
+# Per-request SQL query count and DB time, and Prometheus metrics
+query_stats.install(engine)
+metrics.install(engine)
+
+
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    stats, token = query_stats.start_request(request.scope)
+    started = time.perf_counter()
+    status = 500
+    metrics.http_in_flight.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers.update(query_stats.response_headers(stats, (time.perf_counter() - started) * 1000))
+        return response
+    except PoolTimeoutError:
+        metrics.db_timeouts.inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.http_in_flight.dec()
+        path = request.url.path
+        if path != "/metrics":
+            route = metrics.route_template(request)
+            metrics.http_requests.inc(request.method, route, status)
+            metrics.http_latency.observe(request.method, route, value=elapsed)
+        query_stats.finish_request(
+            stats, token, request.method, path, status, elapsed * 1000,
+            record=not path.startswith(("/api/admin", "/static", "/assets", "/metrics")),
+        )
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Admin ?__profile=1 and PROFILE_RECORD_RATE sampling (see profiling.py)."""
+    mode = profiling.profile_mode(request)
+    if mode is None:
+        return await call_next(request)
+
+    with profiling.Sampler() as sampler:
+        response = await call_next(request)
+    route = metrics.route_template(request)
+    profile = sampler.speedscope(f"{request.method} {request.url.path} ({response.status_code})")
+    if mode == "record":
+        await run_in_threadpool(profiling.save, profile, request.method, route)
+        return response
+
+    headers = {"X-Profiled-Status": str(response.status_code)}
+    for name in ("Server-Timing", "X-DB-Queries"):
+        if name in response.headers:
+            headers[name] = response.headers[name]
+    return JSONResponse(profile, headers=headers)
+
 # Register route modules
 app.include_router(flavors.router)
 app.include_router(production.router)
@@ -30,65 +101,28 @@ app.include_router(dashboard.router)
 app.include_router(reports.router)
 app.include_router(voice.router)
 app.include_router(photo_import.router)
-
-
-def run_migrations():
-    """Run database migrations on startup (for Render free tier without Shell access)"""
-    import sqlite3
-    import os
-
-    # Get database path
-    db_path = os.path.join(os.path.dirname(__file__), "..", "inventory.db")
-
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Check and add variance columns to daily_counts
-        cursor.execute("PRAGMA table_info(daily_counts)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        if "predicted_count" not in columns:
-            print("Adding variance tracking columns to daily_counts...")
-            cursor.execute("ALTER TABLE daily_counts ADD COLUMN predicted_count REAL")
-            cursor.execute("ALTER TABLE daily_counts ADD COLUMN variance REAL")
-            cursor.execute("ALTER TABLE daily_counts ADD COLUMN variance_pct REAL")
-            print("✓ Variance columns added")
-
-        if "employee_name" not in columns:
-            print("Adding employee_name to daily_counts...")
-            cursor.execute("ALTER TABLE daily_counts ADD COLUMN employee_name TEXT")
-            print("✓ Employee name column added to daily_counts")
-
-        # Check and add employee_name to production
-        cursor.execute("PRAGMA table_info(production)")
-        prod_columns = [col[1] for col in cursor.fetchall()]
-
-        if "employee_name" not in prod_columns:
-            print("Adding employee_name to production...")
-            cursor.execute("ALTER TABLE production ADD COLUMN employee_name TEXT")
-            print("✓ Employee name column added to production")
-
-        # Add soft delete columns to production
-        if "deleted_at" not in prod_columns:
-            print("Adding soft delete tracking to production...")
-            cursor.execute("ALTER TABLE production ADD COLUMN deleted_at TEXT")
-            cursor.execute("ALTER TABLE production ADD COLUMN deleted_by TEXT")
-            print("✓ Soft delete columns added to production")
-
-        conn.commit()
-        conn.close()
-        print("✓ All migrations completed successfully")
-
-    except Exception as e:
-        print(f"Migration error (may be safe to ignore if columns already exist): {e}")
+app.include_router(export.router)
+app.include_router(imports.router)
+app.include_router(forecast.router)
+app.include_router(stores.router)
+app.include_router(admin.router)
+app.include_router(sync.router)
 
 
 @app.on_event("startup")
 def on_startup():
-    init_db()
-    # Run migrations automatically on startup
-    run_migrations()
+    # Create or upgrade the schema (one version lookup when already current)
+    from migrations import migrate
+    migrate()
+    scheduler.start()
+    # Precompute first-screen results in the background; /ready reports when done
+    warmup.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    scheduler.stop()
+    warmup.stop()
 
 
 @app.get("/health")
@@ -101,29 +135,66 @@ def health_check():
     }
 
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness for load balancers: 503 until the startup cache warm-up has finished."""
+    state = warmup.status()
+    return FastJSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/insights")
-def get_insights(db: Session = Depends(get_db)):
+def get_insights(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
+    # Precomputed by the insights job when nothing has changed since (see scheduler.py)
+    precomputed = scheduler.precomputed_insights(db, store_id)
+    if precomputed is not None:
+        return precomputed
     # Lazy load AI insights to speed up app startup
-    from ai_insights import generate_insights
-    inv = dashboard.current_inventory(db=db)
-    cons = dashboard.daily_consumption(days=7, db=db)
-    alerts = dashboard.low_stock_alerts(db=db)
-    pvc = dashboard.production_vs_consumption(days=7, db=db)
-    return generate_insights(inv, cons, alerts, pvc)
+    from ai_insights import generate_insights, shop_data
+    return generate_insights(*shop_data(db, store_id))
 
 
 # Serve frontend
 frontend_dir = os.path.join(os.path.dirname(__file__), "..", "frontend")
 
 
+def serve_page(request: Request, page: str):
+    """An HTML page, fingerprinted build first (see assets.py); revalidated on every load."""
+    path, encodings = assets.page_file(page)
+    path, encoding = assets.negotiate(path, encodings, request.headers.get("accept-encoding"))
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type="text/html", headers=headers)
+
+
 @app.get("/")
-def serve_index():
-    return FileResponse(os.path.join(frontend_dir, "index.html"))
+def serve_index(request: Request):
+    return serve_page(request, "index.html")
 
 
 @app.get("/help")
-def serve_help():
-    return FileResponse(os.path.join(frontend_dir, "how-to-use.html"))
+def serve_help(request: Request):
+    return serve_page(request, "how-to-use.html")
+
+
+@app.api_route("/assets/{name}", methods=["GET", "HEAD"], include_in_schema=False)
+def serve_asset(name: str, request: Request):
+    """Content-hashed asset, precompressed variant per Accept-Encoding, cached forever."""
+    found = assets.asset_file(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    path, media_type, encodings = found
+    path, encoding = assets.negotiate(path, encodings, request.headers.get("accept-encoding"))
+    headers = {"Cache-Control": assets.IMMUTABLE, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 
 app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
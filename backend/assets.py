@@ -0,0 +1,189 @@
+"""Fingerprinted, precompressed frontend assets.
+
+The build step copies each file in ASSETS to frontend/dist/ under a
+content-hashed name (app.js -> app.3f2a9c1b0d.js), writes .gz and .br
+variants of the text files when they are meaningfully smaller, rewrites the
+/static/... references in the HTML pages to the hashed /assets/... URLs and
+records everything in dist/manifest.json.
+
+The app serves /assets/<hashed name> with `Cache-Control: immutable` (a
+new build means new names), choosing the brotli or gzip variant the
+client's Accept-Encoding allows, and serves the rewritten HTML with
+`Cache-Control: no-cache` so tablets pick up a new build on their next
+load. Without a build (local development) the pages and /static/ files
+are served from frontend/ as before.
+
+Brotli variants need the optional `brotli` package; without it only gzip
+variants are written.
+
+Run this script:
+- Build: python assets.py   (run on deploy: see Dockerfile and start.sh)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
+DIST_DIR = os.path.join(FRONTEND_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+ASSETS = ("app.js", "styles.css", "Rich_Farm_logo.png")
+PAGES = ("index.html", "how-to-use.html")
+
+HASH_CHARS = 10
+MIN_SAVING = 0.05        # Keep a compressed variant only if it is at least 5% smaller
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = (".js", ".css", ".html")   # PNGs are already compressed
+MEDIA_TYPES = {".js": "text/javascript", ".css": "text/css", ".png": "image/png", ".html": "text/html"}
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = None
+_manifest_mtime = None
+
+
+def _hashed_name(name, content):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_CHARS]}{ext}"
+
+
+def _write_variants(path, content):
+    """Write .gz/.br next to path when they save enough bytes; returns {encoding: bytes}."""
+    if not path.endswith(COMPRESSIBLE):
+        return {}
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    written = {}
+    for encoding, suffix in ENCODINGS:
+        data = variants.get(encoding)
+        if data is not None and len(data) <= len(content) * (1 - MIN_SAVING):
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+            written[encoding] = len(data)
+    return written
+
+
+def build():
+    """Rebuild frontend/dist/ from the sources.
+
+    Returns:
+        the manifest dict
+    """
+    started = time.perf_counter()
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+
+    manifest = {"assets": {}, "pages": {}}
+    for name in ASSETS:
+        with open(os.path.join(FRONTEND_DIR, name), "rb") as f:
+            content = f.read()
+        hashed = _hashed_name(name, content)
+        path = os.path.join(DIST_DIR, hashed)
+        with open(path, "wb") as f:
+            f.write(content)
+        manifest["assets"][name] = {
+            "file": hashed,
+            "bytes": len(content),
+            "encodings": _write_variants(path, content),
+        }
+
+    for page in PAGES:
+        with open(os.path.join(FRONTEND_DIR, page), encoding="utf-8") as f:
+            html = f.read()
+        for name, asset in manifest["assets"].items():
+            html = html.replace(f"/static/{name}", f"/assets/{asset['file']}")
+        path = os.path.join(DIST_DIR, page)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        manifest["pages"][page] = {"encodings": _write_variants(path, html.encode("utf-8"))}
+
+    manifest["built_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    manifest["build_ms"] = round((time.perf_counter() - started) * 1000)
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest():
+    """The current build's manifest (re-read when rebuilt), or None without a build."""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime
+    except OSError:
+        return None
+    if mtime != _manifest_mtime:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    return _manifest
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def negotiate(path, available, accept_encoding):
+    """Pick the best precompressed variant of path.
+
+    Returns:
+        (file path, Content-Encoding or None)
+    """
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return path + suffix, encoding
+    return path, None
+
+
+def asset_file(hashed_name):
+    """(path, media type, available encodings) for a built asset, or None if it isn't one."""
+    manifest = load_manifest()
+    if manifest is None:
+        return None
+    for asset in manifest["assets"].values():
+        if asset["file"] == hashed_name:
+            ext = os.path.splitext(hashed_name)[1]
+            return os.path.join(DIST_DIR, hashed_name), MEDIA_TYPES.get(ext), asset["encodings"]
+    return None
+
+
+def page_file(page):
+    """(path, available encodings) for an HTML page: the rewritten build if there is one."""
+    manifest = load_manifest()
+    if manifest is None or page not in manifest["pages"]:
+        return os.path.join(FRONTEND_DIR, page), {}
+    return os.path.join(DIST_DIR, page), manifest["pages"][page]["encodings"]
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, asset in manifest["assets"].items():
+        sizes = ", ".join(f"{enc} {n:,}" for enc, n in asset["encodings"].items()) or "not compressed"
+        print(f"  {name} -> {asset['file']}: {asset['bytes']:,} bytes ({sizes})")
+    if brotli is None:
+        print("  (brotli not installed: gzip variants only)")
+    print(f"Built {len(manifest['assets'])} assets and {len(manifest['pages'])} pages in {manifest['build_ms']} ms")
@@ -4,7 +4,7 @@ Automatically marks specialty flavors as discontinued when they haven't been cou
 in AUTO_DISCONTINUE_DAYS days.
 
 Run this script:
-- Daily via cron/scheduler
+- Daily: the auto_discontinue job in scheduler.py
 - Manually: python auto_discontinue.py
 - Via API: POST /api/admin/auto-discontinue
 """
@@ -79,9 +79,12 @@ def auto_discontinue_specialties(db: SessionLocal = None):
             db.close()
 
 
-def get_at_risk_flavors(db: SessionLocal = None):
+def get_at_risk_flavors(db: SessionLocal = None, store_id: int = None):
     """Get specialty flavors approaching auto-discontinuation.
 
+    Args:
+        store_id: Limit to one store (all stores when None)
+
     Returns:
         List of flavors that haven't been counted in AT_RISK_WARNING_DAYS+ days
     """
@@ -107,8 +110,10 @@ def get_at_risk_flavors(db: SessionLocal = None):
                     )
                 )
             )
-            .all()
         )
+        if store_id is not None:
+            candidates = candidates.filter(Flavor.store_id == store_id)
+        candidates = candidates.all()
 
         # Filter to only specialty categories and calculate days
         at_risk = []
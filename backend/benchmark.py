@@ -0,0 +1,291 @@
+"""Endpoint latency benchmarks with regression thresholds.
+
+Generates small, medium and large databases with seed.py (cached per day,
+since the data ends yesterday, and migrated to the current schema before
+each use), then calls each endpoint in-process with TestClient and records
+p50/p95 latency, SQL query count and peak Python memory. Every call is made
+after moving the store's data version, as a write would, so GETs are timed
+computing their result rather than served from the datacache. Each size
+runs in its own process because the database URL is bound at import time.
+
+Results are compared to benchmark_baseline.json. The run fails (exit code 1)
+when both p50 and p95 latency, or peak memory, grow past the threshold
+ratio, or when an endpoint starts issuing more queries.
+
+Run this script:
+- Check: python benchmark.py [--sizes small,medium,large] [--threshold 1.3]
+- Record a new baseline: python benchmark.py --update-baseline
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BACKEND_DIR, "benchmark_baseline.json")
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "scoop-bench")
+
+# seed.py arguments per database size
+SIZES = {
+    "small": {"stores": 1, "flavors": 25, "days": 30},
+    "medium": {"stores": 1, "flavors": 60, "days": 365},
+    "large": {"stores": 5, "flavors": 60, "days": 730},
+}
+DATA_SEED = 42
+DEFAULT_SIZES = ("small", "medium")
+
+DEFAULT_REPEATS = 20
+DEFAULT_THRESHOLD = 1.3     # Fail when latency or peak memory grows past 1.3x baseline
+MIN_SLACK_MS = 2.0          # ...and by more than this, so sub-ms noise never fails
+MIN_SLACK_KB = 256
+
+# (method, path) in the order they run; POST /api/counts runs last because it writes
+ENDPOINTS = [
+    ("GET", "/api/dashboard/inventory"),
+    ("GET", "/api/dashboard/make-list"),
+    ("GET", "/api/dashboard/alerts"),
+    ("GET", "/api/counts/smart-defaults"),
+    ("GET", "/api/reports/waste?days=30"),
+    ("GET", "/api/reports/par-accuracy?days=30"),
+    ("GET", "/api/reports/variance?days=7"),
+    ("GET", "/api/reports/employee-performance?days=30"),
+    ("POST", "/api/counts"),
+]
+
+
+# ===== WORKER (one database) =====
+
+def _count_payload():
+    """Tonight's count for every active flavor/product type with a par level."""
+    from database import SessionLocal
+    from models import Flavor, ParLevel
+    from stores import DEFAULT_STORE_ID
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(ParLevel.flavor_id, ParLevel.product_type)
+            .join(Flavor, ParLevel.flavor_id == Flavor.id)
+            .filter(Flavor.store_id == DEFAULT_STORE_ID, Flavor.status == 'active')
+            .all()
+        )
+    finally:
+        db.close()
+    return {
+        "entries": [
+            {"flavor_id": fid, "product_type": ptype, "count": 3, "predicted_count": 2.5,
+             "employee_name": "bench"}
+            for fid, ptype in rows
+        ],
+    }
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _invalidate():
+    """Move the default store's data version, so cached results are recomputed."""
+    from sqlalchemy import update, insert
+    from database import engine
+    from models import DataVersion
+    from stores import DEFAULT_STORE_ID
+
+    with engine.begin() as conn:
+        bumped = conn.execute(
+            update(DataVersion)
+            .where(DataVersion.store_id == DEFAULT_STORE_ID)
+            .values(version=DataVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            conn.execute(insert(DataVersion).values(store_id=DEFAULT_STORE_ID, version=1))
+
+
+def run_worker(repeats):
+    """Benchmark every endpoint against the database in DATABASE_URL.
+
+    Startup events are skipped (TestClient is not entered), so the seeded
+    database is used exactly as generated.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from database import engine
+    from app import app
+
+    queries = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_args):
+        queries[0] += 1
+
+    client = TestClient(app)
+    payload = _count_payload()
+    results = {}
+    for method, path in ENDPOINTS:
+        def call():
+            _invalidate()  # Outside the timing and the query count
+            started = time.perf_counter()
+            queries[0] = 0
+            if method == "POST":
+                r = client.post(path, json=payload)
+            else:
+                r = client.get(path)
+            if r.status_code >= 400:
+                raise RuntimeError(f"{method} {path} -> {r.status_code}: {r.text[:200]}")
+            return (time.perf_counter() - started) * 1000
+
+        # Cold call fills per-process caches (store lookup, lazy imports)
+        cold_ms = call()
+        samples = [call() for _ in range(repeats)]
+
+        # Separate pass: tracemalloc slows allocation-heavy code
+        tracemalloc.start()
+        call()
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[f"{method} {path}"] = {
+            "cold_ms": round(cold_ms, 2),
+            "p50_ms": round(_percentile(samples, 50), 2),
+            "p95_ms": round(_percentile(samples, 95), 2),
+            "queries": queries[0],
+            "peak_kb": round(peak / 1024),
+        }
+    return results
+
+
+# ===== ORCHESTRATOR =====
+
+def database_for(size, regenerate=False):
+    """Path to today's generated database for a size, building it if needed.
+
+    A database cached before a schema change is migrated, as deploys do.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{size}-{DATA_SEED}-{date.today().isoformat()}.sqlite")
+    if regenerate or not os.path.exists(path):
+        for stale in os.listdir(CACHE_DIR):
+            if stale.startswith(f"{size}-"):
+                os.remove(os.path.join(CACHE_DIR, stale))
+        spec = SIZES[size]
+        print(f"Generating {size} database ({spec['stores']} stores x {spec['flavors']} flavors x {spec['days']} days)...")
+        subprocess.run(
+            [sys.executable, "seed.py", "--stores", str(spec["stores"]), "--flavors", str(spec["flavors"]),
+             "--days", str(spec["days"]), "--seed", str(DATA_SEED)],
+            cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+            check=True, stdout=subprocess.DEVNULL,
+        )
+    subprocess.run(
+        [sys.executable, "migrations.py"],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    return path
+
+
+def run_size(size, repeats, regenerate=False):
+    """Benchmark one size against a scratch copy of its database."""
+    source = database_for(size, regenerate)
+    work = source.replace(".sqlite", ".work.sqlite")
+    shutil.copyfile(source, work)
+    try:
+        proc = subprocess.run(
+            [sys.executable, "benchmark.py", "--worker", "--repeats", str(repeats)],
+            cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{work}"},
+            check=True, capture_output=True, text=True,
+        )
+    finally:
+        os.remove(work)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """List regressions of results against baseline.
+
+    Returns:
+        list of human-readable regression messages (empty when clean)
+    """
+    problems = []
+    for size, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            # A real slowdown moves the median too; a lone p95 spike is scheduler noise
+            slower = all(
+                r[k] > base[k] * threshold and r[k] - base[k] > MIN_SLACK_MS for k in ("p50_ms", "p95_ms")
+            )
+            if slower:
+                problems.append(f"{size} {name}: p50/p95 {r['p50_ms']}/{r['p95_ms']} ms "
+                                f"vs baseline {base['p50_ms']}/{base['p95_ms']} ms")
+            if r["queries"] > base["queries"]:
+                problems.append(f"{size} {name}: {r['queries']} queries vs baseline {base['queries']}")
+            if r["peak_kb"] > base["peak_kb"] * threshold and r["peak_kb"] - base["peak_kb"] > MIN_SLACK_KB:
+                problems.append(f"{size} {name}: peak {r['peak_kb']} KB vs baseline {base['peak_kb']} KB")
+    return problems
+
+
+def print_results(size, endpoints, baseline):
+    print(f"\n{size}:")
+    print(f"  {'endpoint':<48} {'p50 ms':>8} {'p95 ms':>8} {'base p95':>9} {'cold ms':>8} {'queries':>8} {'peak KB':>8}")
+    for name, r in endpoints.items():
+        base = baseline.get(size, {}).get(name, {}).get("p95_ms", "-")
+        print(f"  {name:<48} {r['p50_ms']:>8} {r['p95_ms']:>8} {base:>9} {r['cold_ms']:>8} "
+              f"{r['queries']:>8} {r['peak_kb']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against generated databases.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="comma-separated: small,medium,large")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed calls per endpoint")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed growth ratio")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild cached databases")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.repeats)))
+        sys.exit(0)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    for size in sizes:
+        results[size] = run_size(size, args.repeats, args.regenerate)
+        print_results(size, results[size], baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        sys.exit(0)
+
+    problems = compare(results, baseline, args.threshold)
+    if problems:
+        print(f"\n{len(problems)} regression(s) past {args.threshold}x baseline:")
+        for p in problems:
+            print(f"  - {p}")
+        sys.exit(1)
+    print("\nNo regressions." if baseline else "\nNo baseline yet; run with --update-baseline to record one.")
@@ -0,0 +1,256 @@
+"""Bulk import of daily counts from CSV count sheets.
+
+Streams rows from one or more CSV files, validates them against the flavor
+catalog and upserts them in chunks: one row per (flavor, product_type, date),
+matching how POST /api/counts treats repeat counts. Existing data is never
+wiped.
+
+Expected columns:
+    date            YYYY-MM-DD (counted at 21:00) or a full ISO datetime
+    flavor_name     or `flavor`; matched case-insensitively
+    product_type    tub | pint | quart
+    count           number; blank or "?" imports as 0
+    employee_name   optional
+
+Run this script:
+- Manually: python bulk_import.py [--store ID] counts.csv [more.csv ...]
+- Via API: POST /api/import/counts (multipart upload)
+"""
+
+import csv
+import sys
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import insert, update, select
+from database import SessionLocal
+from models import Flavor, DailyCount
+from rollups import refresh_rollups
+from stores import DEFAULT_STORE_ID
+from utils import update_last_counted_cache
+
+# Rows per executemany round trip
+CHUNK_SIZE = 2000
+# Cap on per-row errors echoed back; the total is always reported
+MAX_REPORTED_ERRORS = 200
+
+VALID_PRODUCT_TYPES = ("tub", "pint", "quart")
+DEFAULT_COUNT_HOUR = 21
+
+
+def load_flavor_catalog(db, store_id=DEFAULT_STORE_ID):
+    """Map lowercased flavor name -> flavor id for one store, loaded once per import."""
+    return {
+        name.strip().lower(): fid
+        for fid, name in db.query(Flavor.id, Flavor.name).filter(Flavor.store_id == store_id)
+    }
+
+
+def parse_count_row(row, catalog):
+    """Validate one CSV row.
+
+    Returns:
+        dict of DailyCount column values
+
+    Raises:
+        ValueError with a message suitable for the per-row error report
+    """
+    flavor_name = (row.get("flavor_name") or row.get("flavor") or "").strip()
+    if not flavor_name:
+        raise ValueError("missing flavor name")
+    flavor_id = catalog.get(flavor_name.lower())
+    if flavor_id is None:
+        raise ValueError(f"unknown flavor '{flavor_name}'")
+
+    product_type = (row.get("product_type") or "").strip().lower()
+    if product_type not in VALID_PRODUCT_TYPES:
+        raise ValueError(f"invalid product_type '{product_type}'")
+
+    raw_date = (row.get("date") or row.get("counted_at") or "").strip()
+    try:
+        if len(raw_date) == 10:
+            counted_at = datetime.strptime(raw_date, "%Y-%m-%d").replace(hour=DEFAULT_COUNT_HOUR)
+        else:
+            counted_at = datetime.fromisoformat(raw_date)
+    except ValueError:
+        raise ValueError(f"invalid date '{raw_date}'")
+
+    raw_count = (row.get("count") or "").strip()
+    try:
+        count = float(raw_count) if raw_count and raw_count != "?" else 0
+    except ValueError:
+        raise ValueError(f"invalid count '{raw_count}'")
+    if count < 0:
+        raise ValueError("count cannot be negative")
+
+    return {
+        "flavor_id": flavor_id,
+        "product_type": product_type,
+        "count": count,
+        "counted_at": counted_at,
+        "employee_name": (row.get("employee_name") or "").strip() or None,
+    }
+
+
+def _upsert_chunk(db, store_id, records):
+    """Insert or update one chunk of parsed records.
+
+    Returns:
+        (inserted, updated)
+    """
+    # Last row wins for duplicate keys within the chunk
+    by_key = {}
+    for rec in records:
+        by_key[(rec["flavor_id"], rec["product_type"], rec["counted_at"].date())] = rec
+
+    # One query finds every existing row the chunk collides with
+    days = [k[2] for k in by_key]
+    start = datetime.combine(min(days), datetime.min.time())
+    end = datetime.combine(max(days), datetime.max.time())
+    existing = db.execute(
+        select(DailyCount.id, DailyCount.flavor_id, DailyCount.product_type, DailyCount.counted_at)
+        .where(
+            DailyCount.store_id == store_id,
+            DailyCount.flavor_id.in_({k[0] for k in by_key}),
+            DailyCount.counted_at >= start,
+            DailyCount.counted_at <= end,
+        )
+    )
+    existing_ids = {}
+    for row_id, fid, ptype, counted_at in existing:
+        existing_ids.setdefault((fid, ptype, counted_at.date()), row_id)
+
+    inserts, updates = [], []
+    for key, rec in by_key.items():
+        row_id = existing_ids.get(key)
+        if row_id is None:
+            inserts.append({"store_id": store_id, **rec})
+        else:
+            updates.append({"id": row_id, **rec})
+
+    if inserts:
+        db.execute(insert(DailyCount), inserts)
+    if updates:
+        db.execute(update(DailyCount), updates)
+    return len(inserts), len(updates)
+
+
+def _rows(name, text_file):
+    """(line number, row) pairs of one CSV file."""
+    try:
+        # Line 1 is the header
+        yield from enumerate(csv.DictReader(text_file), start=2)
+    except UnicodeDecodeError:
+        raise HTTPException(400, f"{name} is not UTF-8 text; save it as CSV UTF-8 and upload it again")
+
+
+def import_counts(sources, db=None, store_id=DEFAULT_STORE_ID):
+    """Import count rows for one store from an iterable of (name, text_file) pairs.
+
+    Returns:
+        dict with row totals, per-row errors and throughput
+
+    Raises:
+        HTTPException(400) if a file isn't UTF-8 text (nothing is imported)
+    """
+    close_db = False
+    if db is None:
+        db = SessionLocal()
+        close_db = True
+
+    started = time.perf_counter()
+    result = {"rows": 0, "inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+    affected_flavors = set()
+    # (flavor_id, product_type) -> (first day, last day) imported: all refresh_rollups needs
+    day_ranges = {}
+
+    try:
+        catalog = load_flavor_catalog(db, store_id)
+        chunk = []
+
+        def flush():
+            inserted, updated = _upsert_chunk(db, store_id, chunk)
+            result["inserted"] += inserted
+            result["updated"] += updated
+            for rec in chunk:
+                affected_flavors.add(rec["flavor_id"])
+                key = (rec["flavor_id"], rec["product_type"])
+                day = rec["counted_at"].date()
+                first, last = day_ranges.get(key, (day, day))
+                day_ranges[key] = (min(first, day), max(last, day))
+            chunk.clear()
+
+        for name, text_file in sources:
+            for line_no, row in _rows(name, text_file):
+                result["rows"] += 1
+                try:
+                    rec = parse_count_row(row, catalog)
+                except ValueError as e:
+                    result["error_count"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"file": name, "line": line_no, "error": str(e)})
+                    continue
+                chunk.append(rec)
+                if len(chunk) >= CHUNK_SIZE:
+                    flush()
+
+        if chunk:
+            flush()
+        update_last_counted_cache(db, affected_flavors)
+        refresh_rollups(db, [
+            (flavor_id, product_type, day)
+            for (flavor_id, product_type), span in day_ranges.items()
+            for day in span
+        ])
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if close_db:
+            db.close()
+
+    elapsed = time.perf_counter() - started
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_second"] = round(result["rows"] / elapsed, 1) if elapsed > 0 else None
+    return result
+
+
+def import_count_files(paths, db=None, store_id=DEFAULT_STORE_ID):
+    """Import count rows from CSV files on disk."""
+    def sources():
+        for path in paths:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                yield path, f
+
+    return import_counts(sources(), db=db, store_id=store_id)
+
+
+def print_report(result):
+    print(f"  Rows read:  {result['rows']}")
+    print(f"  Inserted:   {result['inserted']}")
+    print(f"  Updated:    {result['updated']}")
+    print(f"  Errors:     {result['error_count']}")
+    for err in result["errors"]:
+        print(f"    - {err['file']}:{err['line']}: {err['error']}")
+    print(f"  Took {result['seconds']}s ({result['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    store_id = DEFAULT_STORE_ID
+    if args[:1] == ["--store"] and len(args) > 1:
+        store_id = int(args[1])
+        args = args[2:]
+    if not args:
+        print("Usage: python bulk_import.py [--store ID] counts.csv [more.csv ...]")
+        sys.exit(2)
+    print(f"Importing {len(args)} file(s) into store {store_id}...")
+    try:
+        report = import_count_files(args, store_id=store_id)
+    except HTTPException as e:
+        print(f"  {e.detail}")
+        sys.exit(1)
+    print_report(report)
+    sys.exit(1 if report["error_count"] else 0)
@@ -0,0 +1,105 @@
+"""Compression of API responses.
+
+ASGI middleware that brotli- or gzip-encodes /api/ responses, whichever the
+client's Accept-Encoding prefers (brotli first). A response is left alone
+when it is:
+- streamed (the first body chunk has more_body set, e.g. the CSV export),
+  so nothing is buffered
+- smaller than COMPRESS_MIN_BYTES, where headers cost more than they save
+- already encoded, or not a text type (JSON, CSV, text/*)
+
+Bodies over OFFLOAD_BYTES are compressed in the threadpool to keep the
+event loop free.
+
+Settings (environment):
+- COMPRESS_MIN_BYTES: smallest body compressed (default 1024)
+- COMPRESS_GZIP_LEVEL: 1-9 (default 6)
+- COMPRESS_BROTLI_QUALITY: 0-11 (default 5); brotli needs the `brotli` package
+"""
+
+import gzip
+import os
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from assets import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
+OFFLOAD_BYTES = 64 * 1024
+
+PATH_PREFIXES = ("/api/",)
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding, gzip_level=COMPRESS_GZIP_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES,
+                 gzip_level=COMPRESS_GZIP_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None  # response start, held until the first body chunk shows whether to compress
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=held["headers"])
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body", False)
+                    or len(body) < self.minimum_size
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(held)
+                await send(message)
+                return
+
+            if len(body) > OFFLOAD_BYTES:
+                body = await run_in_threadpool(compress, body, encoding, self.gzip_level, self.brotli_quality)
+            else:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
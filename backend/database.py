@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import os
 
@@ -11,6 +11,10 @@ if DATABASE_URL.startswith("postgres://"):
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Tables whose changes move the data version that worker caches are keyed on (see datacache.py)
+VERSIONED_TABLES = frozenset({"stores", "flavors", "production", "daily_counts", "par_levels", "rollups"})
+# Versioned tables whose rows carry the change_seq that /api/sync pages on (see sync.py)
+SYNCED_TABLES = frozenset({"flavors", "production", "daily_counts", "par_levels"})
 
 class Base(DeclarativeBase):
     pass
@@ -24,5 +28,103 @@ def get_db():
         db.close()
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+# ===== DATA VERSION =====
+# Any session transaction that writes a versioned table bumps the data_versions
+# row of each store it touched as part of its commit, so every worker process
+# sees a store's new version exactly when it can see the new data, and the
+# other stores' caches stay valid. Rows it inserted or updated in a synced
+# table (change_seq NULL) are stamped with their store's new version, and rows
+# it deleted get a deleted_rows entry with it. Committing writers queue on
+# their stores' rows (locked in store order), so each store's versions become
+# visible in order.
+#
+# The stores touched are those of the flushed rows, those of the unstamped
+# synced rows, and for bulk statements on other versioned tables, the store_id
+# of the inserted rows or an execution option:
+#     db.query(Rollup).filter(...).execution_options(store_id=store_id).delete()
+# A bulk statement without either counts as a write to every store.
+
+ALL_STORES = None  # In session.info["changed_stores"]: a write whose store isn't known
+
+
+def _note_stores(session, store_ids):
+    session.info.setdefault("changed_stores", set()).update(store_ids)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _note_flushed_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = obj.__table__.name
+        if table in VERSIONED_TABLES:
+            session.info.setdefault("data_changed", set()).add(table)
+            _note_stores(session, [obj.id if table == "stores" else obj.store_id])
+    for obj in session.deleted:
+        if obj.__table__.name in SYNCED_TABLES:
+            session.info.setdefault("deleted_rows", []).append(
+                {"store_id": obj.store_id, "table_name": obj.__table__.name, "row_id": obj.id}
+            )
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _note_statement_changes(state):
+    # insert(Model.__table__), query(...).delete() and other bulk statements skip the flush
+    # (so bulk deletes from synced tables aren't reported to /api/sync; use db.delete())
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = state.statement.table.name
+    if table not in VERSIONED_TABLES:
+        return
+    state.session.info.setdefault("data_changed", set()).add(table)
+    if table in SYNCED_TABLES:
+        return  # Found from the unstamped rows at commit
+    store_id = state.execution_options.get("store_id")
+    params = state.parameters if isinstance(state.parameters, list) else [state.parameters or {}]
+    if store_id is not None:
+        _note_stores(state.session, [store_id])
+    elif state.is_insert and params and all("store_id" in row for row in params):
+        _note_stores(state.session, {row["store_id"] for row in params})
+    else:
+        _note_stores(state.session, [ALL_STORES])
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_data_version(session):
+    session.flush()  # Pending changes must be seen before deciding
+    changed = session.info.pop("data_changed", None)
+    stores = session.info.pop("changed_stores", set())
+    deleted = session.info.pop("deleted_rows", [])
+    if not changed:
+        return
+    conn = session.connection()
+    for table in changed & SYNCED_TABLES:
+        stores.update(conn.execute(text(f"SELECT DISTINCT store_id FROM {table} WHERE change_seq IS NULL")).scalars())
+    if ALL_STORES in stores:
+        stores.discard(ALL_STORES)
+        stores.update(conn.execute(text("SELECT id FROM stores")).scalars())
+
+    versions = {}
+    for store_id in sorted(stores):
+        params = {"store_id": store_id}
+        if conn.execute(text("UPDATE data_versions SET version = version + 1 WHERE store_id = :store_id"),
+                        params).rowcount == 0:
+            conn.execute(text("INSERT INTO data_versions (store_id, version) VALUES (:store_id, 1)"), params)
+        versions[store_id] = conn.execute(
+            text("SELECT version FROM data_versions WHERE store_id = :store_id"), params
+        ).scalar()
+        for table in sorted(changed & SYNCED_TABLES):
+            conn.execute(text(f"UPDATE {table} SET change_seq = :version "
+                              "WHERE change_seq IS NULL AND store_id = :store_id"),
+                         {"version": versions[store_id], **params})
+    if deleted:
+        conn.execute(
+            text("INSERT INTO deleted_rows (store_id, table_name, row_id, change_seq) "
+                 "VALUES (:store_id, :table_name, :row_id, :version)"),
+            [{**row, "version": versions[row["store_id"]]} for row in deleted],
+        )
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("data_changed", None)
+    session.info.pop("changed_stores", None)
+    session.info.pop("deleted_rows", None)
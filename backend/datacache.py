@@ -0,0 +1,99 @@
+"""In-process caches that stay coherent across worker processes.
+
+With several workers (gunicorn -w N) each process has its own caches, so a
+write served by one worker must invalidate the others. Every commit that
+changes a store's data bumps that store's data_versions row in the same
+transaction (see database.py), and a cached value for the store is only
+served while its version is unchanged: one primary-key lookup per cached
+request instead of recomputing the result. A write in one store leaves the
+other stores' cached values alone.
+
+Only one thread computes a given value at a time: a request that arrives
+while the warm-up thread (see warmup.py) or another request is computing it
+waits for that result instead of repeating the work.
+
+Values are shared between requests, so callers must not mutate them.
+
+Run this script:
+- Show each store's current version: python datacache.py
+- Check invalidation across workers: python worker_coherence.py
+"""
+
+import threading
+from sqlalchemy import select
+from models import DataVersion
+from metrics import cache_lookup
+
+MAX_ENTRIES = 256  # Per cache and store; oldest dropped first (custom report windows make many keys)
+WAIT_SECONDS = 30  # Longest wait for another thread's computation before doing it here
+
+# (cache name, store id) -> {key: (data version, value)}
+_caches = {}
+# (cache name, store id, key, data version) -> Event set when the thread computing it is done
+_inflight = {}
+_lock = threading.Lock()
+
+
+def current(db, store_id):
+    """The store's data version, or None while db has uncommitted changes (they aren't counted yet)."""
+    if db.info.get("data_changed"):
+        return None
+    return db.execute(select(DataVersion.version).where(DataVersion.store_id == store_id)).scalar() or 0
+
+
+def versions(db):
+    """{store id: data version}; stores missing from it are at version 0."""
+    return dict(db.execute(select(DataVersion.store_id, DataVersion.version)).all())
+
+
+def cached(db, store_id, name, key, compute):
+    """compute() for the store's (name, key), reused until the store's data version moves.
+
+    The version is read before compute() runs, so a write that commits in
+    between can only make the stored value newer than its version (and be
+    recomputed once more), never older.
+    """
+    version = current(db, store_id)
+    cache = (name, store_id)
+    flight_key = (name, store_id, key, version)
+    with _lock:
+        entry = _caches.get(cache, {}).get(key)
+        hit = version is not None and entry is not None and entry[0] == version
+        computing = None
+        if not hit and version is not None:
+            computing = _inflight.get(flight_key)
+            if computing is None:
+                _inflight[flight_key] = threading.Event()
+    if computing is not None and computing.wait(WAIT_SECONDS):
+        with _lock:
+            entry = _caches.get(cache, {}).get(key)
+        hit = entry is not None and entry[0] == version
+    cache_lookup(name, hit)
+    if hit:
+        return entry[1]
+
+    try:
+        value = compute()
+        if version is not None:
+            with _lock:
+                entries = {k: e for k, e in _caches.get(cache, {}).items() if e[0] == version}
+                entries[key] = (version, value)
+                while len(entries) > MAX_ENTRIES:
+                    del entries[next(iter(entries))]
+                _caches[cache] = entries
+    finally:
+        if computing is None and version is not None:
+            with _lock:
+                _inflight.pop(flight_key).set()
+    return value
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for store_id, version in sorted(versions(db).items()):
+            print(f"  store {store_id}: data version {version}")
+    finally:
+        db.close()
@@ -0,0 +1,125 @@
+"""Idempotency-Key support for POSTs that a client may retry.
+
+A phone on shop Wi-Fi often loses the response to a POST that the server
+did handle, and retrying would then log the production or counts twice. A
+client that sends an Idempotency-Key header (any unique string, e.g. a
+UUID, reused for every retry of the same request) gets the first response
+replayed instead, with an Idempotent-Replayed: true header.
+
+The key, a hash of the request (endpoint, store and body) and the response
+are stored in the idempotency_keys table in the same transaction as the
+write itself, so a response is only ever replayed for a write that
+committed, and a failed request (an error response, a crash) can be retried
+with the same key. Two copies of a request that arrive together both do the
+work, but only the first to commit keeps it: the other's insert of the key
+fails, its transaction is rolled back and it replays the first's response.
+
+Reusing a key for a different request is a 422. Keys expire after
+IDEMPOTENCY_TTL_HOURS; the purge_idempotency_keys job (see scheduler.py)
+deletes expired ones.
+
+Settings (environment):
+- IDEMPOTENCY_TTL_HOURS: default 24
+
+Run this script:
+- Show stored keys by age: python idempotency.py
+- Delete expired keys now: python idempotency.py --purge
+"""
+
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import Response
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.exc import IntegrityError
+from database import engine
+from models import IdempotencyKey
+from serialization import dumps
+
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+MAX_KEY_LENGTH = 255
+
+
+def _expired_before():
+    return datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+
+
+def _request_hash(endpoint, store_id, body):
+    request = {"endpoint": endpoint, "store_id": store_id, "body": body.model_dump(mode="json")}
+    return hashlib.sha256(orjson.dumps(request, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _replay(row, request_hash):
+    if row.request_hash != request_hash:
+        raise HTTPException(422, "Idempotency-Key was already used for a different request")
+    return Response(row.response, status_code=row.status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+def replay(db, key, endpoint, store_id, body):
+    """The stored response for a repeated key, or None to handle the request.
+
+    Call before doing any work. Does nothing without a key. An expired key is
+    deleted here, so the request is handled again under it.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    row = db.execute(select(IdempotencyKey.__table__).where(IdempotencyKey.key == key)).first()
+    if row is None:
+        return None
+    if row.created_at < _expired_before():
+        db.execute(delete(IdempotencyKey.__table__).where(IdempotencyKey.key == key))
+        return None
+    return _replay(row, _request_hash(endpoint, store_id, body))
+
+
+def save(db, key, endpoint, store_id, body, status_code, content):
+    """Store the response under the key as part of the request's transaction.
+
+    Call after the work, just before db.commit(). Returns None once stored;
+    if a concurrent copy of the request committed first, rolls this one's
+    work back and returns that copy's response to send instead.
+    """
+    if key is None:
+        return None
+    request_hash = _request_hash(endpoint, store_id, body)
+    try:
+        db.execute(insert(IdempotencyKey.__table__).values(
+            key=key, request_hash=request_hash, status_code=status_code,
+            response=dumps(content).decode(), created_at=datetime.utcnow(),
+        ))
+    except IntegrityError:
+        db.rollback()
+        row = db.execute(select(IdempotencyKey.__table__).where(IdempotencyKey.key == key)).first()
+        if row is None:
+            raise
+        return _replay(row, request_hash)
+    return None
+
+
+def purge_expired():
+    """Delete expired keys; returns how many."""
+    with engine.begin() as conn:
+        return conn.execute(
+            delete(IdempotencyKey.__table__).where(IdempotencyKey.created_at < _expired_before())
+        ).rowcount
+
+
+if __name__ == "__main__":
+    if "--purge" in sys.argv[1:]:
+        print(f"Deleted {purge_expired()} expired key(s)")
+    else:
+        with engine.connect() as conn:
+            total, oldest = conn.execute(
+                select(func.count(), func.min(IdempotencyKey.created_at)).select_from(IdempotencyKey.__table__)
+            ).one()
+            expired = conn.execute(
+                select(func.count()).select_from(IdempotencyKey.__table__)
+                .where(IdempotencyKey.created_at < _expired_before())
+            ).scalar()
+        print(f"{total} stored key(s), {expired} expired (TTL {IDEMPOTENCY_TTL_HOURS:g} h), oldest {oldest or '-'}")
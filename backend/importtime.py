@@ -0,0 +1,95 @@
+"""Import-time report and budget check for app startup.
+
+Imports app.py in a fresh interpreter under `python -X importtime` and
+reports the slowest modules by cumulative time, grouped by top-level
+package. The run fails (exit code 1) when importing the app takes longer
+than the budget (best of several runs, since a cold disk cache skews the
+first) or when a module that should load lazily on first use -- the voice
+and photo import parsers, the insights client, and the HTTP client and LLM
+SDKs behind them -- is in sys.modules after `import app`.
+
+Run this script:
+- Report: python importtime.py [--top 25]
+- Check: python importtime.py --budget 1500 [--runs 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 1500
+DEFAULT_RUNS = 3
+
+# Modules (and packages) only the AI-backed routes use; they must not load at startup
+LAZY_MODULES = ("voice_parse", "photo_parse", "ai_insights", "requests", "anthropic", "groq")
+
+
+def measure():
+    """Import app once in a fresh process.
+
+    Returns:
+        (total_ms, {module: (self_ms, cumulative_ms)}, names in sys.modules afterwards)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        # Startup imports don't touch the database, but the engine needs a URL
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'import.sqlite')}"}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app, sys; print('\\n'.join(sys.modules))"],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return modules["app"][1], modules, set(proc.stdout.split())
+
+
+def report(modules, top):
+    by_package = defaultdict(float)
+    for name, (self_ms, _) in modules.items():
+        by_package[name.split(".")[0]] += self_ms
+
+    print("\nSlowest modules (cumulative ms):")
+    slowest = sorted(modules.items(), key=lambda m: m[1][1], reverse=True)[:top]
+    for name, (self_ms, cumulative_ms) in slowest:
+        print(f"  {cumulative_ms:9.1f}  {self_ms:8.1f} self  {name}")
+
+    print("\nBy top-level package (self ms):")
+    for package, ms in sorted(by_package.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"  {ms:9.1f}  {package}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report app import time and check it against a budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_MS, help="Fail above this many ms")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    total_ms, modules, loaded = min(runs, key=lambda r: r[0])
+    report(modules, args.top)
+
+    print(f"\nimport app: {total_ms:.0f} ms (best of {args.runs}: "
+          f"{', '.join(f'{r[0]:.0f}' for r in runs)}), budget {args.budget:.0f} ms")
+    failures = []
+    if total_ms > args.budget:
+        failures.append(f"import time {total_ms:.0f} ms exceeds the {args.budget:.0f} ms budget")
+    eager = sorted({name.split(".")[0] for name in loaded} & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
@@ -0,0 +1,244 @@
+"""Closing-time load harness.
+
+Replays the closing-time mix against a running server: several tablets
+submitting overlapping count batches and logging production while others
+load smart defaults, the make list and inventory. Reports throughput and
+latency per operation, server errors, SQLite lock timeouts and duplicate
+rows created.
+
+By default it starts its own uvicorn server on a scratch copy of a
+generated benchmark database (see benchmark.py), so the server log can be
+scanned for "database is locked" and the database checked for duplicates
+afterwards. Pass --url to load an already running server instead (lock
+timeouts and duplicates are then not measured).
+
+Run this script:
+- python loadtest.py [--clients 8] [--duration 30] [--size small]
+- python loadtest.py --mix counts=5,smart-defaults=3,make-list=2
+- python loadtest.py --url http://127.0.0.1:8000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import requests
+from benchmark import BACKEND_DIR, SIZES, database_for, _percentile
+
+# Closing-time operation weights
+DEFAULT_MIX = {
+    "counts": 30,
+    "smart-defaults": 25,
+    "make-list": 20,
+    "production": 15,
+    "inventory": 10,
+}
+COUNT_BATCH_SIZE = 20       # Entries per count submission; tablets overlap on keys
+REQUEST_TIMEOUT = 60
+SERVER_START_TIMEOUT = 60
+
+READ_PATHS = {
+    "smart-defaults": "/api/counts/smart-defaults",
+    "make-list": "/api/dashboard/make-list",
+    "inventory": "/api/dashboard/inventory",
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown operation '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, workers, log_path):
+    """Start uvicorn on db_path and wait until /health answers.
+
+    Returns:
+        (process, base_url)
+    """
+    port = _free_port()
+    log = open(log_path, "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        # No scheduled jobs (rollup rebuilds etc.) competing with the measured load
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "SCHEDULER_ENABLED": "0"},
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited during startup; see {log_path}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return proc, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"Server did not start within {SERVER_START_TIMEOUT}s")
+
+
+def count_keys(url):
+    """(flavor_id, product_type) pairs tonight's count covers, from smart defaults."""
+    rows = requests.get(f"{url}/api/counts/smart-defaults", timeout=REQUEST_TIMEOUT).json()
+    return [(row["flavor_id"], row["product_type"]) for row in rows]
+
+
+def duplicate_counts(db_path):
+    """Number of extra daily_counts rows sharing a (store, flavor, type, date)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT COALESCE(SUM(n - 1), 0) FROM ("
+            " SELECT COUNT(*) AS n FROM daily_counts"
+            " GROUP BY store_id, flavor_id, product_type, date(counted_at) HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def production_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM production").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_load(url, keys, mix, clients, duration, seed=None):
+    """Drive the mix from `clients` threads for `duration` seconds.
+
+    Returns:
+        dict op -> list of (latency_ms, status_code or exception name)
+    """
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results = {name: [] for name in names}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(n):
+        rng = random.Random(None if seed is None else seed + n)
+        session = requests.Session()
+        employee = f"tablet-{n}"
+        while time.perf_counter() < stop_at:
+            op = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                if op == "counts":
+                    batch = rng.sample(keys, min(COUNT_BATCH_SIZE, len(keys)))
+                    r = session.post(f"{url}/api/counts", timeout=REQUEST_TIMEOUT, json={"entries": [
+                        {"flavor_id": fid, "product_type": ptype, "count": rng.choice([0.5, 1, 2, 3, 4]),
+                         "employee_name": employee}
+                        for fid, ptype in batch
+                    ]})
+                elif op == "production":
+                    fid, ptype = rng.choice(keys)
+                    r = session.post(f"{url}/api/production", timeout=REQUEST_TIMEOUT, json={
+                        "flavor_id": fid, "product_type": ptype, "quantity": rng.choice([1, 2, 2.5, 3]),
+                        "employee_name": employee,
+                    })
+                else:
+                    r = session.get(f"{url}{READ_PATHS[op]}", timeout=REQUEST_TIMEOUT)
+                outcome = r.status_code
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                results[op].append((elapsed, outcome))
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def summarize(results, duration):
+    print(f"\n  {'operation':<16} {'reqs':>6} {'ok':>6} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    total = ok_total = 0
+    for op, samples in results.items():
+        if not samples:
+            continue
+        latencies = [s[0] for s in samples]
+        ok = sum(1 for _ms, status in samples if isinstance(status, int) and status < 400)
+        total += len(samples)
+        ok_total += ok
+        print(f"  {op:<16} {len(samples):>6} {ok:>6} {len(samples) - ok:>7} "
+              f"{_percentile(latencies, 50):>8.1f} {_percentile(latencies, 95):>8.1f} "
+              f"{_percentile(latencies, 99):>8.1f} {max(latencies):>8.1f}")
+    print(f"\n  Throughput: {total / duration:.1f} req/s ({ok_total / duration:.1f} ok/s) over {duration}s")
+    errors = {}
+    for samples in results.values():
+        for _ms, status in samples:
+            if not (isinstance(status, int) and status < 400):
+                errors[status] = errors.get(status, 0) + 1
+    if errors:
+        print("  Errors by status: " + ", ".join(f"{k}: {v}" for k, v in sorted(errors.items(), key=str)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the closing-time request mix against a server.")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent tablets (default 8)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load (default 30)")
+    parser.add_argument("--mix", default=None, help="op=weight list, e.g. counts=3,make-list=1")
+    parser.add_argument("--size", default="small", choices=list(SIZES), help="generated database to load")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--url", default=None, help="load an already running server instead")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for the request stream")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    proc = db_path = None
+    url = args.url
+    if url is None:
+        source = database_for(args.size)
+        db_path = source.replace(".sqlite", ".load.sqlite")
+        shutil.copyfile(source, db_path)
+        log_path = db_path.replace(".sqlite", ".log")
+        proc, url = start_server(db_path, args.workers, log_path)
+
+    try:
+        keys = count_keys(url)
+        dup_before = duplicate_counts(db_path) if db_path else None
+        prod_before = production_rows(db_path) if db_path else None
+
+        print(f"Closing-time load: {args.clients} clients x {args.duration}s against {url}")
+        print("  Mix: " + ", ".join(f"{k}={v:g}" for k, v in mix.items()))
+        results = run_load(url, keys, mix, args.clients, args.duration, args.seed)
+        summarize(results, args.duration)
+
+        if db_path:
+            proc.terminate()
+            proc.wait(timeout=30)
+            with open(log_path) as f:
+                locked = f.read().count("database is locked")
+            logged = sum(1 for _ms, status in results.get("production", []) if status == 201)
+            print(f"  Lock timeouts (server log): {locked}")
+            print(f"  Duplicate count rows created: {duplicate_counts(db_path) - dup_before}")
+            print(f"  Production rows created: {production_rows(db_path) - prod_before} for {logged} successful logs")
+    finally:
+        if proc and proc.poll() is None:
+            proc.terminate()
+        if db_path and os.path.exists(db_path):
+            os.remove(db_path)
@@ -0,0 +1,220 @@
+"""Process metrics in Prometheus text format, served at GET /metrics.
+
+A small in-process registry (no client library): counters, gauges and
+histograms keyed by label values, plus collectors that read the DB pool and
+process RSS at scrape time. Values are per process; with several workers
+each one reports its own.
+
+Instrumented:
+- HTTP requests by method, route template and status; latency histogram
+  per route template; requests in flight
+- DB pool checkouts, connection acquire time, pool timeouts and live pool
+  occupancy
+- Outbound LLM calls per provider: latency and failures (track_llm_call)
+- Cache lookups by cache and hit/miss (cache_lookup), with hit ratios
+- Process resident memory
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.values = {} if self.labels else {(): 0}
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *label_values, value):
+        with _lock:
+            self.values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.labels, self.buckets = name, doc, tuple(labels), buckets
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, *label_values, value):
+        with _lock:
+            series = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, n in zip(self.buckets, series):
+                labels = _label_str(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {n}")
+            labels = _label_str(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {series[-1]}")
+        return lines
+
+
+# ===== METRICS =====
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by method, route template and status.",
+    ("method", "route", "status"),
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"),
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+db_checkouts = Counter("db_pool_checkouts_total", "Connections checked out of the pool.")
+db_acquire = Histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pooled connection.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+db_timeouts = Counter("db_pool_timeouts_total", "Requests that timed out waiting for a pooled connection.")
+
+llm_latency = Histogram(
+    "llm_call_duration_seconds", "Outbound LLM API call latency by provider.", ("provider",), LLM_BUCKETS,
+)
+llm_failures = Counter("llm_call_failures_total", "Failed outbound LLM API calls by provider.", ("provider",))
+
+cache_lookups = Counter("cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+_REGISTRY = [http_requests, http_latency, http_in_flight, db_checkouts, db_acquire, db_timeouts,
+             llm_latency, llm_failures, cache_lookups]
+_engine = None
+
+
+def install(engine):
+    """Count pool checkouts and time connection acquisition for an engine."""
+    global _engine
+    _engine = engine
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        db_checkouts.inc()
+
+    # Engine.raw_connection() goes through pool.connect(); time it to see pool waits
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            db_acquire.observe(value=time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def cache_lookup(cache, hit):
+    cache_lookups.inc(cache, "hit" if hit else "miss")
+
+
+@contextmanager
+def track_llm_call(provider):
+    """Time an outbound LLM call; exceptions (or call["ok"] = False) count as failures."""
+    call = {"ok": True}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call["ok"] = False
+        raise
+    finally:
+        llm_latency.observe(provider, value=time.perf_counter() - started)
+        if not call["ok"]:
+            llm_failures.inc(provider)
+
+
+def route_template(request):
+    """The matched route's path template (e.g. /api/flavors/{flavor_id}), never the raw path."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource  # Not Linux: fall back to peak RSS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _scrape_gauges():
+    lines = []
+
+    def gauge(name, doc, value, labels=""):
+        lines.extend([f"# HELP {name} {doc}", f"# TYPE {name} gauge", f"{name}{labels} {value}"])
+
+    gauge("process_resident_memory_bytes", "Resident memory size in bytes.", _rss_bytes())
+    pool = _engine.pool if _engine is not None else None
+    if pool is not None and hasattr(pool, "checkedout"):
+        gauge("db_pool_checked_out", "Connections currently checked out.", pool.checkedout())
+        if hasattr(pool, "size"):
+            gauge("db_pool_size", "Configured pool size.", pool.size())
+            gauge("db_pool_overflow", "Connections open beyond the pool size.", max(0, pool.overflow()))
+
+    with _lock:
+        totals = {}
+        for (cache, result), n in cache_lookups.values.items():
+            totals.setdefault(cache, {"hit": 0, "miss": 0})[result] += n
+    if totals:
+        lines += ["# HELP cache_hit_ratio Cache hits / lookups since start.", "# TYPE cache_hit_ratio gauge"]
+        for cache, t in sorted(totals.items()):
+            lines.append(f'cache_hit_ratio{{cache="{cache}"}} {t["hit"] / (t["hit"] + t["miss"]):.4f}')
+    return lines
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in _REGISTRY:
+            lines += metric.render()
+    lines += _scrape_gauges()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,272 @@
+"""Versioned schema migrations.
+
+The schema_version table records every migration applied to a database.
+Startup calls migrate(), which costs one query when the schema is current:
+
+- Fresh database: create_all() builds the current schema, which is then
+  stamped with the latest version (nothing below runs).
+- Older database: each pending migration runs in order on the configured
+  engine and is recorded. Migrations inspect the schema before changing it,
+  so databases that were patched by hand or by the old startup checks (and
+  so have no schema_version table yet) are brought up to date safely, and a
+  migration interrupted by a crash can simply run again.
+
+To change the schema: edit models.py, then append a migration to MIGRATIONS
+(never edit or reorder one that has shipped).
+
+Run this script:
+- Apply pending migrations: python migrations.py
+- Show version and pending: python migrations.py --status
+"""
+
+import sys
+from sqlalchemy import inspect, text, func, select
+from sqlalchemy.exc import DBAPIError
+from database import engine, Base
+from models import SchemaVersion, DataVersion, JobLease, JobRun, IdempotencyKey, DeletedRow, Flavor, Production, DailyCount, ParLevel, Rollup
+from stores import DEFAULT_STORE_ID, DEFAULT_STORE_NAME
+
+
+# ===== HELPERS =====
+
+def _columns(conn, table):
+    return {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table, name, extra=""):
+    """ALTER TABLE ADD COLUMN using the model's type for this dialect, if the column is missing."""
+    if name in _columns(conn, table):
+        return False
+    column_type = Base.metadata.tables[table].c[name].type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type} {extra}".rstrip()))
+    print(f"  + {table}.{name}")
+    return True
+
+
+# ===== MIGRATIONS =====
+
+def create_missing_tables(conn):
+    """Tables that older databases never had (stores, rollups, ...)."""
+    Base.metadata.create_all(conn)
+
+
+def add_variance_columns(conn):
+    for name in ("predicted_count", "variance", "variance_pct"):
+        _add_column(conn, "daily_counts", name)
+
+
+def add_employee_names(conn):
+    _add_column(conn, "daily_counts", "employee_name")
+    _add_column(conn, "production", "employee_name")
+
+
+def add_production_soft_delete(conn):
+    _add_column(conn, "production", "deleted_at")
+    _add_column(conn, "production", "deleted_by")
+
+
+def add_subsequent_batch_size(conn):
+    _add_column(conn, "par_levels", "subsequent_batch_size")
+
+
+def add_flavor_status(conn):
+    """Auto-discontinuation fields, with last_counted_at backfilled from counts."""
+    added = _add_column(conn, "flavors", "status", "DEFAULT 'active'")
+    _add_column(conn, "flavors", "discontinued_at")
+    if _add_column(conn, "flavors", "last_counted_at"):
+        conn.execute(text("""
+            UPDATE flavors
+            SET last_counted_at = (
+                SELECT MAX(counted_at) FROM daily_counts WHERE daily_counts.flavor_id = flavors.id
+            )
+        """))
+    _add_column(conn, "flavors", "manually_discontinued", "DEFAULT false")
+    if added:
+        conn.execute(text("UPDATE flavors SET status = 'active' WHERE status IS NULL OR status = ''"))
+
+
+def add_store_ids(conn):
+    """Multi-store: every row belongs to a store; existing rows go to the default store."""
+    if conn.dialect.name == "postgresql":
+        # The store_id foreign keys need the default store to exist first
+        conn.execute(
+            text("INSERT INTO stores (id, name) SELECT :id, :name WHERE NOT EXISTS (SELECT 1 FROM stores WHERE id = :id)"),
+            {"id": DEFAULT_STORE_ID, "name": DEFAULT_STORE_NAME},
+        )
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('stores', 'id'), (SELECT MAX(id) FROM stores))"))
+
+    flavor_columns = _columns(conn, "flavors")
+    if "store_id" not in flavor_columns:
+        print("  Moving flavors to the default store...")
+        if conn.dialect.name == "sqlite":
+            # Names are now unique per store; SQLite can't drop the old
+            # UNIQUE(name), so copy into a freshly created table
+            from sqlalchemy.schema import CreateTable
+            shared = ", ".join(c for c in flavor_columns if c in Flavor.__table__.columns)
+            ddl = str(CreateTable(Flavor.__table__).compile(dialect=conn.dialect))
+            conn.execute(text(ddl.replace("TABLE flavors", "TABLE flavors_new", 1)))
+            conn.execute(text(
+                f"INSERT INTO flavors_new ({shared}, store_id) SELECT {shared}, {DEFAULT_STORE_ID} FROM flavors"
+            ))
+            conn.execute(text("DROP TABLE flavors"))
+            conn.execute(text("ALTER TABLE flavors_new RENAME TO flavors"))
+        else:
+            _add_column(conn, "flavors", "store_id", f"NOT NULL DEFAULT {DEFAULT_STORE_ID} REFERENCES stores(id)")
+            conn.execute(text("ALTER TABLE flavors DROP CONSTRAINT IF EXISTS flavors_name_key"))
+            conn.execute(text("ALTER TABLE flavors ADD CONSTRAINT uq_flavor_store_name UNIQUE (store_id, name)"))
+
+    references = "" if conn.dialect.name == "sqlite" else " REFERENCES stores(id)"
+    for table in ("production", "daily_counts", "par_levels"):
+        _add_column(conn, table, "store_id", f"NOT NULL DEFAULT {DEFAULT_STORE_ID}{references}")
+
+    if "store_id" not in _columns(conn, "rollups"):
+        # Derived data: recreate empty; migrate() rebuilds it afterwards
+        print("  Recreating rollups with store_id...")
+        Rollup.__table__.drop(conn)
+        Rollup.__table__.create(conn)
+
+
+def add_store_indexes(conn):
+    """Store-leading indexes replace the single-store keyset indexes."""
+    conn.execute(text("DROP INDEX IF EXISTS ix_daily_counts_counted_at_id"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_production_logged_at_id"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_rollups_key_period"))
+    for model in (Flavor, Production, DailyCount, ParLevel, Rollup):
+        columns = _columns(conn, model.__tablename__)
+        for index in model.__table__.indexes:
+            # Indexes on columns that later migrations add are created by those migrations
+            if all(column.name in columns for column in index.columns):
+                index.create(conn, checkfirst=True)
+
+
+def add_data_version(conn):
+    """Counter that lets each worker process tell when its caches are stale."""
+    DataVersion.__table__.create(conn, checkfirst=True)
+
+
+def add_job_tables(conn):
+    """Leases and run history for the in-process scheduler."""
+    JobLease.__table__.create(conn, checkfirst=True)
+    JobRun.__table__.create(conn, checkfirst=True)
+
+
+def add_idempotency_keys(conn):
+    """Stored responses for retried POSTs."""
+    IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+def add_change_seq(conn):
+    """Change cursor for /api/sync; existing rows predate every cursor the server has issued."""
+    for model in (Flavor, Production, DailyCount, ParLevel):
+        table = model.__tablename__
+        _add_column(conn, table, "change_seq")
+        conn.execute(text(f"UPDATE {table} SET change_seq = 0 WHERE change_seq IS NULL"))
+        for index in model.__table__.indexes:
+            if "change_seq" in index.columns:
+                index.create(conn, checkfirst=True)
+    DeletedRow.__table__.create(conn, checkfirst=True)
+
+
+def add_rollup_store_index(conn):
+    """The rollup lookup index leads with store_id, like the other store-scoped indexes."""
+    conn.execute(text("DROP INDEX IF EXISTS ix_rollups_key_period"))
+    for index in Rollup.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def add_store_data_versions(conn):
+    """A data version per store, so a write in one store leaves the others' caches alone.
+
+    Each store starts from the old shared version, which is at or above every
+    change_seq already stamped, so sync cursors stay valid.
+    """
+    DataVersion.__table__.create(conn, checkfirst=True)
+    if inspect(conn).has_table("data_version"):
+        conn.execute(text(
+            "INSERT INTO data_versions (store_id, version) "
+            "SELECT stores.id, data_version.version FROM stores, data_version "
+            "WHERE data_version.id = 1 AND stores.id NOT IN (SELECT store_id FROM data_versions)"
+        ))
+        conn.execute(text("DROP TABLE data_version"))
+
+
+# (version, name, function) -- append only
+MIGRATIONS = [
+    (1, "create_missing_tables", create_missing_tables),
+    (2, "add_variance_columns", add_variance_columns),
+    (3, "add_employee_names", add_employee_names),
+    (4, "add_production_soft_delete", add_production_soft_delete),
+    (5, "add_subsequent_batch_size", add_subsequent_batch_size),
+    (6, "add_flavor_status", add_flavor_status),
+    (7, "add_store_ids", add_store_ids),
+    (8, "add_store_indexes", add_store_indexes),
+    (9, "add_data_version", add_data_version),
+    (10, "add_job_tables", add_job_tables),
+    (11, "add_idempotency_keys", add_idempotency_keys),
+    (12, "add_change_seq", add_change_seq),
+    (13, "add_rollup_store_index", add_rollup_store_index),
+    (14, "add_store_data_versions", add_store_data_versions),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ===== RUNNER =====
+
+def current_version(bind=engine):
+    """Highest applied migration, 0 if none were recorded, None if there is no schema_version table."""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except DBAPIError:
+        return None
+
+
+def migrate(bind=engine):
+    """Bring the database to LATEST_VERSION.
+
+    Returns:
+        list of migration names applied (empty when already current)
+    """
+    version = current_version(bind)
+    if version == LATEST_VERSION:
+        return []
+
+    if version is None and not inspect(bind).has_table("flavors"):
+        # Fresh database: the models already describe the latest schema
+        Base.metadata.create_all(bind)
+        with bind.begin() as conn:
+            conn.execute(SchemaVersion.__table__.insert(), [
+                {"version": v, "name": name} for v, name, _ in MIGRATIONS
+            ])
+        applied = ["create_all"]
+    else:
+        SchemaVersion.__table__.create(bind, checkfirst=True)
+        applied = []
+        for v, name, step in MIGRATIONS:
+            if v <= (version or 0):
+                continue
+            print(f"Migration {v}: {name}...")
+            with bind.begin() as conn:
+                step(conn)
+                conn.execute(SchemaVersion.__table__.insert().values(version=v, name=name))
+            applied.append(name)
+        print(f"✓ Schema at version {LATEST_VERSION}")
+
+    # One-time data setup for newly created or upgraded databases
+    from stores import ensure_default_store
+    from rollups import ensure_rollups
+    ensure_default_store()
+    ensure_rollups()
+    return applied
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv[1:]:
+        version = current_version()
+        print(f"Current version: {version if version is not None else 'unversioned'}")
+        for v, name, _ in MIGRATIONS:
+            if v > (version or 0):
+                print(f"  pending {v}: {name}")
+    else:
+        applied = migrate()
+        print(f"Applied: {', '.join(applied)}" if applied else "Already at the latest version")
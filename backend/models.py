@@ -1,12 +1,106 @@
-from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, ForeignKey, UniqueConstraint, func
+from sqlalchemy import Column, Integer, Float, String, Text, Boolean, Date, DateTime, ForeignKey, UniqueConstraint, Index, func, null, text
 from database import Base
 
 
+def _change_seq_indexes(table):
+    """Indexes for a synced table's change_seq (see sync.py).
+
+    One serves a store's sync as a range scan; the other, partial, lets the
+    commit find the rows it must stamp (change_seq still NULL) without a scan.
+    """
+    unstamped = text("change_seq IS NULL")
+    return (
+        Index(f"ix_{table}_store_change_seq", "store_id", "change_seq"),
+        Index(f"ix_{table}_unstamped", "change_seq", sqlite_where=unstamped, postgresql_where=unstamped),
+    )
+
+
+class SchemaVersion(Base):
+    """One row per applied migration (see migrations.py)."""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, server_default=func.now())
+
+
+class DataVersion(Base):
+    """Per-store counter moved by every commit that changes the store's data (see datacache.py)."""
+    __tablename__ = "data_versions"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class JobLease(Base):
+    """Which worker holds a scheduled job and when it last ran (see scheduler.py)."""
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)          # host:pid of the worker running it
+    expires_at = Column(DateTime, nullable=True)    # Another worker may take over after this
+    last_run_at = Column(DateTime, nullable=True)
+
+
+class JobRun(Base):
+    """One run of a scheduled job."""
+    __tablename__ = "job_runs"
+    __table_args__ = (Index("ix_job_runs_name_started", "name", "started_at"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    worker = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    status = Column(String, nullable=False)         # running | ok | error
+    result = Column(Text, nullable=True)            # JSON returned by the job
+    error = Column(Text, nullable=True)
+
+
+class IdempotencyKey(Base):
+    """Response stored for a client's Idempotency-Key, replayed on retries (see idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_created_at", "created_at"),)
+
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)   # sha256 of endpoint, store and body
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)         # JSON body as sent
+    created_at = Column(DateTime, nullable=False)
+
+
+class DeletedRow(Base):
+    """A row deleted outright from a synced table, reported by /api/sync (see sync.py)."""
+    __tablename__ = "deleted_rows"
+    __table_args__ = (Index("ix_deleted_rows_store_change_seq", "store_id", "change_seq"),)
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, nullable=False)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+
+
+class Store(Base):
+    __tablename__ = "stores"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class Flavor(Base):
     __tablename__ = "flavors"
+    __table_args__ = (
+        UniqueConstraint("store_id", "name", name="uq_flavor_store_name"),
+        Index("ix_flavors_store_status", "store_id", "status"),
+        *_change_seq_indexes("flavors"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False, unique=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=1)
+    name = Column(String, nullable=False)
     category = Column(String, nullable=False, default="classics")
     active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
@@ -16,12 +110,19 @@ class Flavor(Base):
     discontinued_at = Column(DateTime, nullable=True)
     last_counted_at = Column(DateTime, nullable=True)
     manually_discontinued = Column(Boolean, default=False)
+    change_seq = Column(Integer, nullable=True, onupdate=null())  # Change cursor (see sync.py)
 
 
 class Production(Base):
     __tablename__ = "production"
+    __table_args__ = (
+        Index("ix_production_store_logged_at_id", "store_id", "logged_at", "id"),  # keyset pagination
+        Index("ix_production_store_key_logged_at", "store_id", "flavor_id", "product_type", "logged_at"),
+        *_change_seq_indexes("production"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=1)
     flavor_id = Column(Integer, ForeignKey("flavors.id"), nullable=False)
     product_type = Column(String, nullable=False)  # tub, pint, quart
     quantity = Column(Float, nullable=False)  # Changed to Float for fractional tubs
@@ -29,12 +130,19 @@ class Production(Base):
     employee_name = Column(String, nullable=True)  # Who logged this production
     deleted_at = Column(DateTime, nullable=True)   # Soft delete timestamp
     deleted_by = Column(String, nullable=True)     # Who deleted this entry
+    change_seq = Column(Integer, nullable=True, onupdate=null())  # Change cursor (see sync.py)
 
 
 class DailyCount(Base):
     __tablename__ = "daily_counts"
+    __table_args__ = (
+        Index("ix_daily_counts_store_counted_at_id", "store_id", "counted_at", "id"),  # keyset pagination
+        Index("ix_daily_counts_store_key_counted_at", "store_id", "flavor_id", "product_type", "counted_at"),
+        *_change_seq_indexes("daily_counts"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=1)
     flavor_id = Column(Integer, ForeignKey("flavors.id"), nullable=False)
     product_type = Column(String, nullable=False)  # tub, pint, quart
     count = Column(Float, nullable=False)
@@ -43,15 +151,19 @@ class DailyCount(Base):
     variance = Column(Float, nullable=True)         # actual - predicted
     variance_pct = Column(Float, nullable=True)     # (variance / predicted) * 100
     employee_name = Column(String, nullable=True)   # Who submitted this count
+    change_seq = Column(Integer, nullable=True, onupdate=null())  # Change cursor (see sync.py)
 
 
 class ParLevel(Base):
     __tablename__ = "par_levels"
     __table_args__ = (
         UniqueConstraint("flavor_id", "product_type", name="uq_par_flavor_type"),
+        Index("ix_par_levels_store_key", "store_id", "flavor_id", "product_type"),
+        *_change_seq_indexes("par_levels"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=1)
     flavor_id = Column(Integer, ForeignKey("flavors.id"), nullable=False)
     product_type = Column(String, nullable=False)  # tub, pint, quart
     target = Column(Integer, nullable=False, default=0)          # "Ready at open"
@@ -59,3 +171,30 @@ class ParLevel(Base):
     batch_size = Column(Float, nullable=False, default=1)        # "One batch makes"
     subsequent_batch_size = Column(Float, nullable=True)         # "Additional batches make"
     weekend_target = Column(Integer, nullable=True)              # "Weekend target" (Fri-Sun)
+    change_seq = Column(Integer, nullable=True, onupdate=null())  # Change cursor (see sync.py)
+
+
+class Rollup(Base):
+    """Pre-aggregated consumption, production and variance per flavor/product type.
+
+    One row per (store, period, period_start, flavor, product_type), where period is
+    "day", "week" (starting Monday) or "month". Maintained by rollups.py.
+    """
+    __tablename__ = "rollups"
+    __table_args__ = (
+        UniqueConstraint("store_id", "period", "period_start", "flavor_id", "product_type", name="uq_rollup_period_key"),
+        Index("ix_rollups_store_key_period", "store_id", "flavor_id", "product_type", "period", "period_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=1)
+    period = Column(String, nullable=False)                    # day | week | month
+    period_start = Column(Date, nullable=False)
+    flavor_id = Column(Integer, ForeignKey("flavors.id"), nullable=False)
+    product_type = Column(String, nullable=False)              # tub, pint, quart
+    consumed = Column(Float, nullable=False, default=0)        # Sum of consumption between consecutive counts
+    consumption_days = Column(Integer, nullable=False, default=0)  # Days with a consumption observation
+    produced = Column(Float, nullable=False, default=0)
+    variance_count = Column(Integer, nullable=False, default=0)    # Counts with a prediction
+    variance_abs_sum = Column(Float, nullable=False, default=0)    # Sum of |variance_pct|
+    high_variance_count = Column(Integer, nullable=False, default=0)  # |variance_pct| > 25
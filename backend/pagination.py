@@ -0,0 +1,89 @@
+"""Keyset (cursor) pagination helpers for list endpoints.
+
+Pages are ordered newest-first on a (timestamp, id) pair. The cursor is an
+opaque token encoding the last row of the previous page, so each page is a
+single index range scan no matter how deep the client pages.
+
+keyset_slice pages oldest-first on any (key, id) pair and leaves the
+position to the caller, for endpoints that page several statements under
+one cursor (see sync.py).
+"""
+
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, desc
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    """Encode a (timestamp, id) position as an opaque URL-safe token."""
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor produced by encode_cursor.
+
+    Raises:
+        HTTPException(400) if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts_str, id_str = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(ts_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def keyset_page(db, stmt, ts_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE, key=None):
+    """Fetch one newest-first page of `stmt`.
+
+    Args:
+        db: Session to execute the statement on
+        stmt: Core select() with filters already applied (no ordering), see reads.py
+        ts_col: Timestamp column to page on (e.g. DailyCount.counted_at)
+        id_col: Primary key column used as tie-breaker
+        cursor: Token from a previous page's next_cursor, or None for page one
+        limit: Page size
+        key: Function mapping a result row to its (timestamp, id) pair
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            ts_col < cursor_ts,
+            and_(ts_col == cursor_ts, id_col < cursor_id),
+        ))
+
+    rows = db.execute(stmt.order_by(desc(ts_col), desc(id_col)).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        ts, row_id = key(rows[-1])
+        next_cursor = encode_cursor(ts, row_id)
+    return rows, next_cursor
+
+
+def keyset_slice(db, stmt, key_col, id_col, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Fetch up to `limit` rows of `stmt` in ascending (key, id) order after a position.
+
+    Args:
+        after: (key, id) of the last row already returned, or None to start
+
+    Returns:
+        (rows, has_more)
+    """
+    if after:
+        after_key, after_id = after
+        stmt = stmt.where(or_(
+            key_col > after_key,
+            and_(key_col == after_key, id_col > after_id),
+        ))
+    rows = db.execute(stmt.order_by(key_col, id_col).limit(limit + 1)).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,175 @@
+"""On-demand request profiling for admins.
+
+A sampling profiler: while a request runs, a background thread snapshots
+the Python stacks of every thread that is executing backend code (idle
+threadpool workers and the event loop's select() are skipped) and the
+samples are exported in speedscope's file format
+(https://www.speedscope.app -- drag the file in, or `npx speedscope file`).
+Concurrent requests in the same process can show up in a profile; profile
+on a quiet worker when the numbers matter.
+
+- One request: add `?__profile=1` and an `X-Admin-Token` header matching
+  ADMIN_TOKEN. The response body is the profile instead of the normal
+  payload; the original status and DB timing come back as X-Profiled-Status,
+  Server-Timing and X-DB-Queries headers.
+- Background recording: PROFILE_RECORD_RATE (0-1, default 0) is the
+  fraction of ordinary requests profiled and written to PROFILE_DIR. The
+  newest PROFILE_KEEP files are kept; list and download them from
+  GET /api/admin/profiles.
+
+Profiling is unavailable unless ADMIN_TOKEN is set.
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from fastapi import Header, HTTPException
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BACKEND_DIR, "profiles"))
+PROFILE_RECORD_RATE = float(os.environ.get("PROFILE_RECORD_RATE", "0"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))
+SAMPLE_INTERVAL = 0.001    # Seconds between stack snapshots
+MAX_STACK_DEPTH = 200
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+_NOT_RECORDED = ("/api/admin", "/static", "/assets", "/metrics")
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency: 403 unless X-Admin-Token matches ADMIN_TOKEN."""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def profile_mode(request):
+    """How to profile this request: "respond" (return the profile), "record" (save it) or None."""
+    if request.query_params.get("__profile") and is_admin_token(request.headers.get("x-admin-token")):
+        return "respond"
+    if (PROFILE_RECORD_RATE > 0 and not request.url.path.startswith(_NOT_RECORDED)
+            and random.random() < PROFILE_RECORD_RATE):
+        return "record"
+    return None
+
+
+class Sampler:
+    """Context manager that samples thread stacks until exit."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.frames = []        # speedscope frame dicts
+        self._frame_index = {}  # (name, file, line) -> index into frames
+        self.samples = []       # lists of frame indices, outermost first
+        self.weights = []       # seconds each sample stands for
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return False
+
+    def _frame_id(self, frame):
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                in_backend = False
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    filename = frame.f_code.co_filename
+                    if filename.startswith(BACKEND_DIR) and not filename.endswith("profiling.py"):
+                        in_backend = True
+                    stack.append(frame)
+                    frame = frame.f_back
+                if in_backend:
+                    self.samples.append([self._frame_id(f) for f in reversed(stack)])
+                    self.weights.append(now - last)
+            last = now
+
+    def speedscope(self, name):
+        """The samples as a speedscope JSON document."""
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "scoop profiling.py",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.duration, 6),
+                "samples": self.samples,
+                "weights": [round(w, 6) for w in self.weights],
+            }],
+        }
+
+
+def save(profile, method, route):
+    """Write a recorded profile to PROFILE_DIR and prune the oldest beyond PROFILE_KEEP."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+    filename = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{method}-{slug}.speedscope.json"
+    with open(os.path.join(PROFILE_DIR, filename), "w") as f:
+        json.dump(profile, f)
+    for old in list_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old["name"]))
+        except OSError:
+            pass
+    return filename
+
+
+def list_profiles():
+    """Recorded profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".speedscope.json"):
+            st = os.stat(os.path.join(PROFILE_DIR, name))
+            entries.append({
+                "name": name,
+                "bytes": st.st_size,
+                "recorded_at": datetime.utcfromtimestamp(st.st_mtime).isoformat(),
+            })
+    entries.sort(key=lambda e: e["name"], reverse=True)
+    return entries
+
+
+def profile_path(name):
+    """Absolute path of a recorded profile, or None if there is no such file."""
+    if os.path.basename(name) != name or not name.endswith(".speedscope.json"):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,180 @@
+"""Per-request SQL instrumentation.
+
+SQLAlchemy cursor events time every statement and charge it to the request
+that issued it (tracked with a context variable, which follows the request
+into the threadpool). Each response gets a Server-Timing header with total
+DB time and an X-DB-Queries header with the statement count, and a summary
+of the last REQUEST_LOG_SIZE requests -- including each one's slowest
+statement -- is kept in memory for GET /api/admin/requests (admin token
+required, like every /api/admin route).
+
+Statements slower than SLOW_QUERY_MS (env, default 100) also go to a slow
+query log with their parameters, the route that issued them and the
+database's plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL),
+browsable at GET /api/admin/slow-queries. Queries outside a request (CLI
+scripts, startup) are logged with route None.
+
+Queries issued while a StreamingResponse body is sent (after the headers)
+are not counted.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy import event
+
+REQUEST_LOG_SIZE = 500
+MAX_STATEMENT_CHARS = 1000
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_LOG_SIZE = 200
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_current = ContextVar("query_stats", default=None)
+_recent = deque(maxlen=REQUEST_LOG_SIZE)
+_recent_lock = threading.Lock()
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+
+
+def install(engine):
+    """Attach the timing listeners to an engine (once, at app import)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        if ms >= SLOW_QUERY_MS:
+            _log_slow(conn, cursor, statement, parameters, executemany, ms, stats)
+        if stats is None:
+            return
+        stats["queries"] += 1
+        stats["db_ms"] += ms
+        if ms > stats["slowest_ms"]:
+            stats["slowest_ms"] = ms
+            stats["slowest_sql"] = statement
+
+
+def _explain(conn, cursor, statement, parameters):
+    """The plan for a statement, run on the same DBAPI connection (no events fire)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        rows = explain_cursor.fetchall()
+    finally:
+        explain_cursor.close()
+    if dialect == "postgresql":
+        return "\n".join(row[0] for row in rows)
+    # SQLite rows are (id, parent, notused, detail); indent children under parents
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def _log_slow(conn, cursor, statement, parameters, executemany, ms, stats):
+    plan = None
+    if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+        try:
+            plan = _explain(conn, cursor, statement, parameters)
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+    route = None
+    if stats is not None:
+        route = getattr(stats["scope"].get("route"), "path", None) or stats["scope"].get("path")
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "ms": round(ms, 2),
+        "route": route,
+        "sql": " ".join(statement.split())[:MAX_STATEMENT_CHARS],
+        "parameters": repr(parameters)[:MAX_STATEMENT_CHARS],
+        "executemany": executemany,
+        "plan": plan,
+    }
+    with _recent_lock:
+        _slow.append(entry)
+
+
+def start_request(scope=None):
+    """Begin collecting for the current request.
+
+    Returns:
+        (stats, token) -- pass both to finish_request()
+    """
+    stats = {"queries": 0, "db_ms": 0.0, "slowest_ms": 0.0, "slowest_sql": None, "scope": scope or {}}
+    return stats, _current.set(stats)
+
+
+def finish_request(stats, token, method, path, status, total_ms, record=True):
+    """Stop collecting and (optionally) add the request to the ring buffer."""
+    _current.reset(token)
+    if not record:
+        return
+    sql = stats["slowest_sql"]
+    entry = {
+        "at": datetime.utcnow().isoformat(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "total_ms": round(total_ms, 2),
+        "queries": stats["queries"],
+        "db_ms": round(stats["db_ms"], 2),
+        "slowest_ms": round(stats["slowest_ms"], 2),
+        "slowest_sql": " ".join(sql.split())[:MAX_STATEMENT_CHARS] if sql else None,
+    }
+    with _recent_lock:
+        _recent.append(entry)
+
+
+def response_headers(stats, total_ms):
+    """Headers summarizing the request's database work."""
+    return {
+        "Server-Timing": (
+            f'db;dur={stats["db_ms"]:.2f};desc="{stats["queries"]} queries", total;dur={total_ms:.2f}'
+        ),
+        "X-DB-Queries": str(stats["queries"]),
+    }
+
+
+def recent_requests(limit=100, sort="recent", path=None):
+    """Newest-first (or costliest-first) request summaries from the ring buffer."""
+    with _recent_lock:
+        entries = list(_recent)
+    if path:
+        entries = [e for e in entries if e["path"].startswith(path)]
+    if sort == "recent":
+        entries.reverse()
+    else:
+        entries.sort(key=lambda e: e[sort], reverse=True)
+    return entries[:limit]
+
+
+def slow_queries(limit=100, sort="recent", route=None):
+    """Slow query log entries, newest (or slowest) first."""
+    with _recent_lock:
+        entries = list(_slow)
+    if route:
+        entries = [e for e in entries if e["route"] and e["route"].startswith(route)]
+    if sort == "recent":
+        entries.reverse()
+    else:
+        entries.sort(key=lambda e: e["ms"], reverse=True)
+    return entries[:limit]
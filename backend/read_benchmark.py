@@ -0,0 +1,180 @@
+"""Per-row cost of ORM entity loading vs column-projected reads.
+
+For each list endpoint's read, fetches the same rows against a generated
+database both ways:
+- orm: db.query(Entity, ...) loading full mapped instances, as the endpoints
+  used to
+- projected: the Core select() from reads.py naming only the needed columns
+
+and reports CPU time (median over repeats) and peak allocated memory
+(tracemalloc) per row. Each run uses a fresh session so the identity map
+starts empty, as it does per request.
+
+Run this script:
+- python read_benchmark.py [--size large] [--days 90] [--repeats 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from benchmark import BACKEND_DIR, SIZES, database_for, _percentile
+
+
+def _reads(store_id, since):
+    """(label, orm fetch, projected fetch) per endpoint; each fetch takes a session."""
+    from sqlalchemy import desc
+    from models import DailyCount, Flavor, Production
+    import reads
+
+    def orm_counts(db):
+        return (
+            db.query(DailyCount, Flavor.name)
+            .join(Flavor, DailyCount.flavor_id == Flavor.id)
+            .filter(DailyCount.store_id == store_id, DailyCount.counted_at >= since)
+            .order_by(desc(DailyCount.counted_at))
+            .all()
+        )
+
+    def orm_production(db):
+        return (
+            db.query(Production, Flavor.name)
+            .join(Flavor, Production.flavor_id == Flavor.id)
+            .filter(Production.store_id == store_id, Production.logged_at >= since,
+                    Production.deleted_at == None)
+            .order_by(desc(Production.logged_at))
+            .all()
+        )
+
+    variance_window = (
+        DailyCount.store_id == store_id,
+        DailyCount.counted_at >= since,
+        DailyCount.predicted_count.isnot(None),
+        Flavor.active == True,
+    )
+
+    def orm_variance(db):
+        return (
+            db.query(DailyCount, Flavor.name, Flavor.category)
+            .join(Flavor, DailyCount.flavor_id == Flavor.id)
+            .filter(*variance_window)
+            .order_by(desc(DailyCount.counted_at))
+            .all()
+        )
+
+    def orm_employee(db):
+        counts = db.query(DailyCount).filter(
+            DailyCount.store_id == store_id, DailyCount.counted_at >= since,
+            DailyCount.employee_name.isnot(None), DailyCount.predicted_count.isnot(None),
+        ).all()
+        production = db.query(Production).filter(
+            Production.store_id == store_id, Production.logged_at >= since,
+            Production.employee_name.isnot(None),
+        ).all()
+        return counts + production
+
+    def projected_employee(db):
+        return (db.execute(reads.employee_counts(store_id, since)).all()
+                + db.execute(reads.employee_production(store_id, since)).all())
+
+    return [
+        ("GET /api/flavors",
+         lambda db: db.query(Flavor).filter(Flavor.store_id == store_id)
+                      .order_by(Flavor.category, Flavor.name).all(),
+         lambda db: db.execute(reads.flavors(store_id)).all()),
+        ("GET /api/counts/history", orm_counts,
+         lambda db: db.execute(reads.count_history(store_id, since)
+                               .order_by(desc(DailyCount.counted_at))).all()),
+        ("GET /api/production", orm_production,
+         lambda db: db.execute(reads.production_log(store_id, since)
+                               .order_by(desc(Production.logged_at))).all()),
+        ("GET /api/reports/variance", orm_variance,
+         lambda db: db.execute(reads.variance_items(*variance_window)
+                               .order_by(desc(DailyCount.counted_at))).all()),
+        ("GET /api/reports/employee-performance", orm_employee, projected_employee),
+    ]
+
+
+def _measure(fetch, repeats):
+    """(rows, median ms, peak bytes) of fetch over fresh sessions."""
+    from database import SessionLocal
+
+    samples = []
+    for _ in range(repeats):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            rows = fetch(db)
+            samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        rows = fetch(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        db.close()
+    return len(rows), _percentile(samples, 50), peak
+
+
+def run_worker(days, repeats):
+    from datetime import datetime, timedelta
+
+    since = datetime.utcnow() - timedelta(days=days)
+    results = []
+    for label, orm, projected in _reads(1, since):
+        orm_rows, orm_ms, orm_peak = _measure(orm, repeats)
+        rows, projected_ms, projected_peak = _measure(projected, repeats)
+        results.append({
+            "endpoint": label,
+            "rows": rows,
+            "same_rows": rows == orm_rows,
+            "orm_us": orm_ms * 1000 / max(rows, 1),
+            "projected_us": projected_ms * 1000 / max(rows, 1),
+            "orm_bytes": orm_peak / max(rows, 1),
+            "projected_bytes": projected_peak / max(rows, 1),
+        })
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM entity loading with projected reads.")
+    parser.add_argument("--size", choices=list(SIZES), default="large")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.days, args.repeats)
+        sys.exit(0)
+
+    path = database_for(args.size, args.regenerate)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker",
+         "--days", str(args.days), "--repeats", str(args.repeats)],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    results = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"\n{args.size}, last {args.days} days: per-row cost (median of {args.repeats} runs, peak memory)")
+    print(f"  {'endpoint':40} {'rows':>7} {'orm us':>7} {'proj us':>8} {'cpu':>6}"
+          f" {'orm B':>7} {'proj B':>7} {'memory':>7}")
+    for r in results:
+        cpu = r["orm_us"] / r["projected_us"] if r["projected_us"] else float("inf")
+        memory = r["orm_bytes"] / r["projected_bytes"] if r["projected_bytes"] else float("inf")
+        note = "" if r["same_rows"] else "  ROW COUNT DIFFERS"
+        print(f"  {r['endpoint']:40} {r['rows']:7} {r['orm_us']:7.2f} {r['projected_us']:8.2f} {cpu:5.1f}x"
+              f" {r['orm_bytes']:7.0f} {r['projected_bytes']:7.0f} {memory:6.1f}x{note}")
+    if not all(r["same_rows"] for r in results):
+        sys.exit(1)
@@ -0,0 +1,111 @@
+"""Column-projected reads for list endpoints.
+
+Core select() statements naming exactly the columns a response needs. Run
+through the session, they come back as lightweight Row tuples (attribute
+access by column name), skipping what loading ORM entities costs per row:
+identity-map lookups, instance state and attribute instrumentation. Use
+them on read-only paths that just copy fields into dicts; writes keep
+using ORM entities.
+
+read_benchmark.py measures the per-row CPU and memory difference.
+"""
+
+from sqlalchemy import select
+from models import DailyCount, DeletedRow, Flavor, Production
+from serialization import HIDDEN_COLUMNS
+
+
+def api_columns(model):
+    """A table's columns less bookkeeping ones, in the keys the API has always returned."""
+    return tuple(column for column in model.__table__.columns if column.key not in HIDDEN_COLUMNS)
+
+
+FLAVOR_COLUMNS = api_columns(Flavor)
+
+
+def flavors(store_id, statuses=None):
+    """Flavors of a store ordered by category and name, optionally limited to some statuses."""
+    stmt = select(*FLAVOR_COLUMNS).where(Flavor.store_id == store_id)
+    if statuses:
+        stmt = stmt.where(Flavor.status.in_(statuses))
+    return stmt.order_by(Flavor.category, Flavor.name)
+
+
+def count_history(store_id, since):
+    """Counts since a time with their flavor name (unordered; callers sort or page)."""
+    return (
+        select(
+            DailyCount.id, DailyCount.flavor_id, Flavor.name.label("flavor_name"),
+            DailyCount.product_type, DailyCount.count, DailyCount.counted_at,
+        )
+        .join(Flavor, DailyCount.flavor_id == Flavor.id)
+        .where(DailyCount.store_id == store_id, DailyCount.counted_at >= since)
+    )
+
+
+def production_log(store_id, since, include_deleted=False):
+    """Production entries since a time with their flavor name (unordered)."""
+    stmt = (
+        select(
+            Production.id, Production.flavor_id, Flavor.name.label("flavor_name"),
+            Production.product_type, Production.quantity, Production.logged_at,
+            Production.employee_name, Production.deleted_at, Production.deleted_by,
+        )
+        .join(Flavor, Production.flavor_id == Flavor.id)
+        .where(Production.store_id == store_id, Production.logged_at >= since)
+    )
+    if not include_deleted:
+        stmt = stmt.where(Production.deleted_at.is_(None))
+    return stmt
+
+
+def variance_items(*criteria):
+    """Counts with their prediction, flavor name and category, filtered by criteria (unordered)."""
+    return (
+        select(
+            DailyCount.id, DailyCount.flavor_id, Flavor.name.label("flavor_name"),
+            Flavor.category, DailyCount.product_type, DailyCount.predicted_count,
+            DailyCount.count, DailyCount.variance, DailyCount.variance_pct,
+            DailyCount.counted_at, DailyCount.employee_name,
+        )
+        .join(Flavor, DailyCount.flavor_id == Flavor.id)
+        .where(*criteria)
+    )
+
+
+def employee_counts(store_id, since):
+    """(employee_name, variance_pct, counted_at) of predicted counts with an employee."""
+    return select(DailyCount.employee_name, DailyCount.variance_pct, DailyCount.counted_at).where(
+        DailyCount.store_id == store_id,
+        DailyCount.counted_at >= since,
+        DailyCount.employee_name.isnot(None),
+        DailyCount.predicted_count.isnot(None),
+    )
+
+
+def employee_production(store_id, since):
+    """(employee_name, logged_at) of production entries with an employee."""
+    return select(Production.employee_name, Production.logged_at).where(
+        Production.store_id == store_id,
+        Production.logged_at >= since,
+        Production.employee_name.isnot(None),
+    )
+
+
+def changed_rows(model, store_id, since, until):
+    """A synced table's rows with since < change_seq <= until (since None: all), with change_seq (unordered)."""
+    stmt = select(*api_columns(model), model.change_seq).where(
+        model.store_id == store_id, model.change_seq <= until,
+    )
+    if since is not None:
+        stmt = stmt.where(model.change_seq > since)
+    return stmt
+
+
+def deleted_rows(store_id, since, until):
+    """Deletions with since < change_seq <= until: id, table_name, row_id and change_seq (unordered)."""
+    return select(DeletedRow.id, DeletedRow.table_name, DeletedRow.row_id, DeletedRow.change_seq).where(
+        DeletedRow.store_id == store_id,
+        DeletedRow.change_seq > since,
+        DeletedRow.change_seq <= until,
+    )
@@ -0,0 +1,354 @@
+"""Daily, weekly and monthly rollups for long-range reports.
+
+Consumption is measured the same way as /api/dashboard/consumption:
+previous_count + produced_between - current_count, clipped at 0 and dated by
+the later count. Daily rows are recomputed for just the affected
+(flavor, product_type, day range) whenever counts or production change, and
+the week/month rows covering those days are re-summed from the daily rows.
+
+Reports read the coarsest rows that tile the requested window: whole months,
+then whole Monday-start weeks, then single days at the edges.
+
+Run this script:
+- Manually: python rollups.py  (full rebuild)
+- Via API: POST /api/reports/admin/rebuild-rollups (with X-Admin-Token)
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, or_, func, insert
+from database import SessionLocal
+from models import DailyCount, Flavor, Production, Rollup
+
+PERIODS = ("day", "week", "month")
+HIGH_VARIANCE_PCT = 25
+# Longest window the rollup-backed reports accept (five years)
+MAX_WINDOW_DAYS = 1830
+
+_ROLLUP_FIELDS = (
+    "consumed", "consumption_days", "produced",
+    "variance_count", "variance_abs_sum", "high_variance_count",
+)
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def month_end(d: date) -> date:
+    next_month = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def _tile_weeks(plan, day_from, day_to):
+    d = day_from
+    while d <= day_to:
+        if d.weekday() == 0 and d + timedelta(days=6) <= day_to:
+            plan["week"].append(d)
+            d += timedelta(days=7)
+        else:
+            plan["day"].append(d)
+            d += timedelta(days=1)
+
+
+def period_plan(day_from: date, day_to: date):
+    """Tile [day_from, day_to] with the coarsest whole periods.
+
+    Whole calendar months first, then whole Monday-start weeks in the gaps
+    on either side, then single days.
+
+    Returns:
+        dict period -> list of period_start dates
+    """
+    plan = {p: [] for p in PERIODS}
+    m = day_from if day_from.day == 1 else month_end(day_from) + timedelta(days=1)
+    while month_end(m) <= day_to:
+        plan["month"].append(m)
+        m = month_end(m) + timedelta(days=1)
+
+    if plan["month"]:
+        _tile_weeks(plan, day_from, plan["month"][0] - timedelta(days=1))
+        _tile_weeks(plan, m, day_to)
+    else:
+        _tile_weeks(plan, day_from, day_to)
+    return plan
+
+
+def window_filter(day_from: date, day_to: date):
+    """SQL filter selecting the rollup rows that exactly cover [day_from, day_to]."""
+    plan = period_plan(day_from, day_to)
+    clauses = [
+        and_(Rollup.period == period, Rollup.period_start.in_(starts))
+        for period, starts in plan.items() if starts
+    ]
+    return or_(*clauses) if clauses else False
+
+
+def resolve_window(days, date_from=None, date_to=None):
+    """Inclusive (day_from, day_to) for a report: explicit dates win over `days`."""
+    day_to = date_to or datetime.utcnow().date()
+    day_from = date_from or day_to - timedelta(days=days - 1)
+    return day_from, day_to
+
+
+def rollup_totals(db, store_id, day_from, day_to):
+    """Query summing a store's rollups over [day_from, day_to] per (flavor, product_type).
+
+    Columns: flavor_id, flavor_name, category, active, product_type,
+    consumed, consumption_days, produced. Callers add their own filters.
+    """
+    return (
+        db.query(
+            Rollup.flavor_id,
+            Flavor.name.label("flavor_name"),
+            Flavor.category,
+            Flavor.active,
+            Rollup.product_type,
+            func.sum(Rollup.consumed).label("consumed"),
+            func.sum(Rollup.consumption_days).label("consumption_days"),
+            func.sum(Rollup.produced).label("produced"),
+        )
+        .join(Flavor, Rollup.flavor_id == Flavor.id)
+        .filter(Rollup.store_id == store_id, window_filter(day_from, day_to))
+        .group_by(Rollup.flavor_id, Flavor.name, Flavor.category, Flavor.active, Rollup.product_type)
+    )
+
+
+def _empty_row():
+    return dict.fromkeys(_ROLLUP_FIELDS, 0)
+
+
+def _insert_rows(db, store_id, period, flavor_id, product_type, rows_by_start):
+    if rows_by_start:
+        db.execute(insert(Rollup.__table__), [
+            {"store_id": store_id, "period": period, "period_start": start,
+             "flavor_id": flavor_id, "product_type": product_type, **vals}
+            for start, vals in rows_by_start.items()
+        ])
+
+
+def _refresh_days(db, store_id, flavor_id, product_type, day_from, day_to):
+    """Recompute daily rollups for one key over [day_from, day_to].
+
+    The range is widened to include the next count after day_to, because a
+    changed count (or production before it) alters that count's consumption.
+
+    Returns:
+        The (possibly widened) day_to
+    """
+    # store_id leads the per-key count and production indexes
+    key_filter = (
+        DailyCount.store_id == store_id,
+        DailyCount.flavor_id == flavor_id,
+        DailyCount.product_type == product_type,
+    )
+    start = datetime.combine(day_from, time.min)
+
+    prev = (
+        db.query(DailyCount.count, DailyCount.counted_at)
+        .filter(*key_filter, DailyCount.counted_at < start)
+        .order_by(DailyCount.counted_at.desc(), DailyCount.id.desc())
+        .first()
+    )
+    next_at = (
+        db.query(func.min(DailyCount.counted_at))
+        .filter(*key_filter, DailyCount.counted_at >= datetime.combine(day_to + timedelta(days=1), time.min))
+        .scalar()
+    )
+    if next_at:
+        day_to = max(day_to, next_at.date())
+    end = datetime.combine(day_to + timedelta(days=1), time.min)
+
+    counts = (
+        db.query(DailyCount.count, DailyCount.counted_at, DailyCount.predicted_count, DailyCount.variance_pct)
+        .filter(*key_filter, DailyCount.counted_at >= start, DailyCount.counted_at < end)
+        .order_by(DailyCount.counted_at, DailyCount.id)
+        .all()
+    )
+    prods = (
+        db.query(Production.quantity, Production.logged_at)
+        .filter(
+            Production.store_id == store_id,
+            Production.flavor_id == flavor_id,
+            Production.product_type == product_type,
+            Production.logged_at > (prev.counted_at if prev else start),
+            Production.logged_at < end,
+        )
+        .order_by(Production.logged_at)
+        .all()
+    )
+
+    rows = defaultdict(_empty_row)
+    for p in prods:
+        if p.logged_at >= start:
+            rows[p.logged_at.date()]["produced"] += p.quantity
+
+    observed_days = set()
+    prev_count, prev_at = (prev.count, prev.counted_at) if prev else (None, None)
+    i = 0
+    for c in counts:
+        # Production between the previous count and this one (prods are sorted)
+        prod_between = 0
+        while i < len(prods) and prods[i].logged_at <= c.counted_at:
+            prod_between += prods[i].quantity
+            i += 1
+
+        day = c.counted_at.date()
+        row = rows[day]
+        if prev_at is not None:
+            row["consumed"] += max(0, prev_count + prod_between - c.count)
+            observed_days.add(day)
+        prev_count, prev_at = c.count, c.counted_at
+
+        if c.predicted_count is not None:
+            row["variance_count"] += 1
+            if c.variance_pct is not None:
+                row["variance_abs_sum"] += abs(c.variance_pct)
+                if abs(c.variance_pct) > HIGH_VARIANCE_PCT:
+                    row["high_variance_count"] += 1
+
+    for day in observed_days:
+        rows[day]["consumption_days"] = 1
+
+    db.query(Rollup).filter(
+        Rollup.store_id == store_id,
+        Rollup.flavor_id == flavor_id,
+        Rollup.product_type == product_type,
+        Rollup.period == "day",
+        Rollup.period_start >= day_from,
+        Rollup.period_start <= day_to,
+    ).execution_options(store_id=store_id).delete(synchronize_session=False)
+    _insert_rows(db, store_id, "day", flavor_id, product_type, rows)
+    return day_to
+
+
+def _refresh_coarse(db, store_id, flavor_id, product_type, day_from, day_to):
+    """Re-sum week and month rollups covering [day_from, day_to] from daily rows."""
+    bounds = {
+        "week": (week_start(day_from), week_start(day_to)),
+        "month": (month_start(day_from), month_start(day_to)),
+    }
+    lo = min(bounds["week"][0], bounds["month"][0])
+    hi = max(bounds["week"][1] + timedelta(days=6), month_end(day_to))
+
+    day_rows = (
+        db.query(Rollup.period_start, *(getattr(Rollup, field) for field in _ROLLUP_FIELDS))
+        .filter(
+            Rollup.store_id == store_id,
+            Rollup.flavor_id == flavor_id,
+            Rollup.product_type == product_type,
+            Rollup.period == "day",
+            Rollup.period_start >= lo,
+            Rollup.period_start <= hi,
+        )
+        .all()
+    )
+
+    for period, to_start in (("week", week_start), ("month", month_start)):
+        first, last = bounds[period]
+        sums = defaultdict(_empty_row)
+        for r in day_rows:
+            start = to_start(r.period_start)
+            if first <= start <= last:
+                for field in _ROLLUP_FIELDS:
+                    sums[start][field] += getattr(r, field)
+
+        db.query(Rollup).filter(
+            Rollup.store_id == store_id,
+            Rollup.flavor_id == flavor_id,
+            Rollup.product_type == product_type,
+            Rollup.period == period,
+            Rollup.period_start >= first,
+            Rollup.period_start <= last,
+        ).execution_options(store_id=store_id).delete(synchronize_session=False)
+        _insert_rows(db, store_id, period, flavor_id, product_type, sums)
+
+
+def refresh_rollups(db, changes):
+    """Bring rollups up to date after counts or production changed.
+
+    Args:
+        db: Database session (caller commits)
+        changes: Iterable of (flavor_id, product_type, datetime) for every
+            count or production row that was added, edited or removed
+    """
+    ranges = {}
+    for flavor_id, product_type, when in changes:
+        if when is None:
+            continue
+        day = when.date() if isinstance(when, datetime) else when
+        key = (flavor_id, product_type)
+        lo, hi = ranges.get(key, (day, day))
+        ranges[key] = (min(lo, day), max(hi, day))
+
+    if not ranges:
+        return
+    # Rollups carry their flavor's store so reports can filter without a join
+    store_of = dict(
+        db.query(Flavor.id, Flavor.store_id)
+        .filter(Flavor.id.in_({flavor_id for flavor_id, _ in ranges}))
+    )
+
+    for (flavor_id, product_type), (day_from, day_to) in ranges.items():
+        store_id = store_of.get(flavor_id)
+        if store_id is None:
+            continue
+        day_to = _refresh_days(db, store_id, flavor_id, product_type, day_from, day_to)
+        _refresh_coarse(db, store_id, flavor_id, product_type, day_from, day_to)
+
+
+def rebuild_rollups(db=None):
+    """Recompute every rollup from raw counts and production.
+
+    Returns:
+        dict with the number of keys and rollup rows written
+    """
+    close_db = False
+    if db is None:
+        db = SessionLocal()
+        close_db = True
+
+    try:
+        db.query(Rollup).delete(synchronize_session=False)
+
+        spans = defaultdict(list)
+        for model, ts in ((DailyCount, DailyCount.counted_at), (Production, Production.logged_at)):
+            for fid, ptype, lo, hi in (
+                db.query(model.flavor_id, model.product_type, func.min(ts), func.max(ts))
+                .group_by(model.flavor_id, model.product_type)
+            ):
+                spans[(fid, ptype)] += [(fid, ptype, lo), (fid, ptype, hi)]
+
+        refresh_rollups(db, (change for key_changes in spans.values() for change in key_changes))
+        db.commit()
+        return {"keys": len(spans), "rows": db.query(func.count(Rollup.id)).scalar()}
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if close_db:
+            db.close()
+
+
+def ensure_rollups():
+    """Build rollups once for databases that predate them."""
+    db = SessionLocal()
+    try:
+        if db.query(Rollup.id).first() is None and db.query(DailyCount.id).first() is not None:
+            print("Building report rollups...")
+            result = rebuild_rollups(db)
+            print(f"✓ Built {result['rows']} rollup rows for {result['keys']} flavor/type pairs")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("Rebuilding report rollups...")
+    result = rebuild_rollups()
+    print(f"  Keys: {result['keys']}")
+    print(f"  Rows: {result['rows']}")
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from query_stats import recent_requests, slow_queries, REQUEST_LOG_SIZE, SLOW_LOG_SIZE
+from profiling import require_admin, list_profiles, profile_path
+from scheduler import JOBS, job_status, job_runs
+from serialization import FastJSONRoute
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=FastJSONRoute)
+
+
+@router.get("/requests", dependencies=[Depends(require_admin)])
+def list_recent_requests(
+    limit: int = Query(100, ge=1, le=REQUEST_LOG_SIZE),
+    sort: str = Query("recent", pattern="^(recent|queries|db_ms|total_ms)$"),
+    path: Optional[str] = None,
+):
+    """Recent requests with their SQL query count, DB time and slowest statement.
+
+    `sort` orders by recency or cost; `path` filters by path prefix. Statements
+    can contain shop data, so this needs the admin token.
+    """
+    return recent_requests(limit=limit, sort=sort, path=path)
+
+
+@router.get("/slow-queries", dependencies=[Depends(require_admin)])
+def list_slow_queries(
+    limit: int = Query(100, ge=1, le=SLOW_LOG_SIZE),
+    sort: str = Query("recent", pattern="^(recent|ms)$"),
+    route: Optional[str] = None,
+):
+    """Statements slower than SLOW_QUERY_MS with parameters, calling route and plan.
+
+    Look for "SCAN <table>" (SQLite) or "Seq Scan" (PostgreSQL) in `plan`.
+    Parameters can contain shop data, so this needs the admin token.
+    """
+    return slow_queries(limit=limit, sort=sort, route=route)
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+def get_recorded_profiles():
+    """Profiles recorded by PROFILE_RECORD_RATE sampling, newest first."""
+    return list_profiles()
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_admin)])
+def download_profile(name: str):
+    """One recorded profile as speedscope JSON."""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@router.get("/jobs", dependencies=[Depends(require_admin)])
+def get_jobs():
+    """Scheduled jobs: daily time (UTC), next run, current lease holder, last run and mean duration."""
+    return job_status()
+
+
+@router.get("/jobs/runs", dependencies=[Depends(require_admin)])
+def get_job_runs(
+    name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Job run history, newest first, with duration, status, result and error."""
+    if name is not None and name not in JOBS:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_runs(name=name, limit=limit)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, and_
 from pydantic import BaseModel
@@ -7,8 +7,16 @@ from typing import List, Optional
 from database import get_db
 from models import DailyCount, Production, Flavor, ParLevel
 from utils import update_last_counted_cache
+from rollups import refresh_rollups
+from stores import get_store_id
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+import reads
+import datacache
+import idempotency
+import warmup
+from serialization import FastJSONRoute
 
-router = APIRouter(prefix="/api/counts", tags=["counts"])
+router = APIRouter(prefix="/api/counts", tags=["counts"], route_class=FastJSONRoute)
 
 
 class CountEntry(BaseModel):
@@ -25,13 +33,30 @@ class CountBatch(BaseModel):
 
 
 @router.post("", status_code=201)
-def submit_counts(batch: CountBatch, db: Session = Depends(get_db)):
+def submit_counts(
+    batch: CountBatch,
+    idempotency_key: Optional[str] = Header(None),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Save a batch of counts, replacing any for the same flavor, type and day.
+
+    A retry sent with the same Idempotency-Key gets the first response back
+    (see idempotency.py).
+    """
+    replayed = idempotency.replay(db, idempotency_key, "POST /api/counts", store_id, batch)
+    if replayed is not None:
+        return replayed
+
     saved = []
     flavor_ids_to_update = set()
+    store_flavor_ids = {fid for (fid,) in db.query(Flavor.id).filter(Flavor.store_id == store_id)}
 
     for entry in batch.entries:
         if entry.product_type not in ("tub", "pint", "quart"):
             raise HTTPException(400, f"Invalid product_type: {entry.product_type}")
+        if entry.flavor_id not in store_flavor_ids:
+            raise HTTPException(404, f"Flavor {entry.flavor_id} not found")
 
         # Calculate variance if prediction was provided
         variance = None
@@ -48,6 +73,7 @@ def submit_counts(batch: CountBatch, db: Session = Depends(get_db)):
         existing = (
             db.query(DailyCount)
             .filter(
+                DailyCount.store_id == store_id,
                 DailyCount.flavor_id == entry.flavor_id,
                 DailyCount.product_type == entry.product_type,
                 func.date(DailyCount.counted_at) == count_date,
@@ -65,6 +91,7 @@ def submit_counts(batch: CountBatch, db: Session = Depends(get_db)):
             record = existing
         else:
             record = DailyCount(
+                store_id=store_id,
                 flavor_id=entry.flavor_id,
                 product_type=entry.product_type,
                 count=entry.count,
@@ -79,27 +106,37 @@ def submit_counts(batch: CountBatch, db: Session = Depends(get_db)):
         saved.append(record)
         flavor_ids_to_update.add(entry.flavor_id)
 
+    db.flush()
+    update_last_counted_cache(db, flavor_ids_to_update)
+    refresh_rollups(db, [(r.flavor_id, r.product_type, r.counted_at) for r in saved])
+    result = {"message": f"Saved {len(saved)} count entries"}
+    replayed = idempotency.save(db, idempotency_key, "POST /api/counts", store_id, batch, 201, result)
+    if replayed is not None:
+        return replayed
     db.commit()
 
-    # Update last_counted_at cache for affected flavors
-    for flavor_id in flavor_ids_to_update:
-        update_last_counted_cache(db, flavor_id)
-
-    return {"message": f"Saved {len(saved)} count entries"}
+    warmup.request()
+    return result
 
 
 @router.get("/smart-defaults")
-def get_smart_defaults(db: Session = Depends(get_db)):
+def get_smart_defaults(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Calculate smart defaults for tonight's count.
 
     Formula: estimated = last_count + produced_since - avg_daily_consumption
-    Only includes active (non-discontinued) flavors.
+    Only includes active (non-discontinued) flavors. Cached per day until data
+    changes, so the 7-day window is anchored at the first computation after a write.
     """
-    flavors = db.query(Flavor).filter(Flavor.status == 'active').all()
+    today = datetime.utcnow().date()
+    return datacache.cached(db, store_id, "smart_defaults", today, lambda: _smart_defaults(db, store_id))
+
+
+def _smart_defaults(db, store_id):
+    flavors = db.query(Flavor).filter(Flavor.store_id == store_id, Flavor.status == 'active').all()
 
     # Build set of (flavor_id, product_type) with par target > 0
     active_pars = set()
-    for par in db.query(ParLevel).all():
+    for par in db.query(ParLevel).filter(ParLevel.store_id == store_id).all():
         if par.target > 0:
             active_pars.add((par.flavor_id, par.product_type))
 
@@ -116,6 +153,7 @@ def get_smart_defaults(db: Session = Depends(get_db)):
             last_count_row = (
                 db.query(DailyCount)
                 .filter(
+                    DailyCount.store_id == store_id,
                     DailyCount.flavor_id == flavor.id,
                     DailyCount.product_type == ptype,
                 )
@@ -133,6 +171,7 @@ def get_smart_defaults(db: Session = Depends(get_db)):
             produced = (
                 db.query(func.coalesce(func.sum(Production.quantity), 0))
                 .filter(
+                    Production.store_id == store_id,
                     Production.flavor_id == flavor.id,
                     Production.product_type == ptype,
                     Production.logged_at > last_count_time,
@@ -145,6 +184,7 @@ def get_smart_defaults(db: Session = Depends(get_db)):
             recent_counts = (
                 db.query(DailyCount)
                 .filter(
+                    DailyCount.store_id == store_id,
                     DailyCount.flavor_id == flavor.id,
                     DailyCount.product_type == ptype,
                     DailyCount.counted_at >= week_ago,
@@ -165,6 +205,7 @@ def get_smart_defaults(db: Session = Depends(get_db)):
                     prod_between = (
                         db.query(func.coalesce(func.sum(Production.quantity), 0))
                         .filter(
+                            Production.store_id == store_id,
                             Production.flavor_id == flavor.id,
                             Production.product_type == ptype,
                             Production.logged_at > prev.counted_at,
@@ -198,7 +239,7 @@ def get_smart_defaults(db: Session = Depends(get_db)):
 
 
 @router.patch("/set-employee")
-def set_employee_name(data: dict, db: Session = Depends(get_db)):
+def set_employee_name(data: dict, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Bulk update employee_name on count entries by date range."""
     name = data.get("employee_name", "")
     date_from = data.get("date_from")
@@ -206,6 +247,7 @@ def set_employee_name(data: dict, db: Session = Depends(get_db)):
     if not name or not date_from or not date_to:
         raise HTTPException(status_code=400, detail="Need employee_name, date_from, date_to")
     rows = db.query(DailyCount).filter(
+        DailyCount.store_id == store_id,
         func.date(DailyCount.counted_at) >= date_from,
         func.date(DailyCount.counted_at) <= date_to,
     ).all()
@@ -216,21 +258,32 @@ def set_employee_name(data: dict, db: Session = Depends(get_db)):
 
 
 @router.delete("/{count_id}")
-def delete_count(count_id: int, db: Session = Depends(get_db)):
-    record = db.query(DailyCount).filter(DailyCount.id == count_id).first()
+def delete_count(count_id: int, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
+    record = (
+        db.query(DailyCount)
+        .filter(DailyCount.id == count_id, DailyCount.store_id == store_id)
+        .first()
+    )
     if not record:
         raise HTTPException(status_code=404, detail="Count not found")
     db.delete(record)
+    db.flush()
+    refresh_rollups(db, [(record.flavor_id, record.product_type, record.counted_at)])
     db.commit()
     return {"message": f"Deleted count {count_id}"}
 
 
 @router.post("/dedup")
-def dedup_counts(db: Session = Depends(get_db)):
+def dedup_counts(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Remove duplicate daily_counts entries, keeping the one with the lowest id."""
     from sqlalchemy import text
     # Find all duplicates grouped by (flavor_id, product_type, date)
-    all_counts = db.query(DailyCount).order_by(DailyCount.id).all()
+    all_counts = (
+        db.query(DailyCount)
+        .filter(DailyCount.store_id == store_id)
+        .order_by(DailyCount.id)
+        .all()
+    )
     seen = {}
     to_delete = []
     for c in all_counts:
@@ -242,28 +295,50 @@ def dedup_counts(db: Session = Depends(get_db)):
             seen[key] = c
     for c in to_delete:
         db.delete(c)
+    db.flush()
+    refresh_rollups(db, [(c.flavor_id, c.product_type, c.counted_at) for c in to_delete])
     db.commit()
     return {"message": f"Removed {len(to_delete)} duplicate entries"}
 
 
 @router.get("/history")
-def count_history(days: int = 7, db: Session = Depends(get_db)):
+def count_history(
+    days: int = 7,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Count history, newest first.
+
+    Without `limit`/`cursor` the whole window is returned as a list. With
+    either, returns {"items": [...], "next_cursor": ...}; pass next_cursor
+    back to fetch the following page.
+    """
     since = datetime.utcnow() - timedelta(days=days)
-    rows = (
-        db.query(DailyCount, Flavor.name)
-        .join(Flavor, DailyCount.flavor_id == Flavor.id)
-        .filter(DailyCount.counted_at >= since)
-        .order_by(desc(DailyCount.counted_at))
-        .all()
-    )
-    return [
+    stmt = reads.count_history(store_id, since)
+
+    paginate = limit is not None or cursor is not None
+    if paginate:
+        rows, next_cursor = keyset_page(
+            db, stmt, DailyCount.counted_at, DailyCount.id,
+            cursor=cursor, limit=limit or DEFAULT_PAGE_SIZE,
+            key=lambda row: (row.counted_at, row.id),
+        )
+    else:
+        rows = db.execute(stmt.order_by(desc(DailyCount.counted_at))).all()
+
+    items = [
         {
             "id": c.id,
             "flavor_id": c.flavor_id,
-            "flavor_name": name,
+            "flavor_name": c.flavor_name,
             "product_type": c.product_type,
             "count": c.count,
             "counted_at": c.counted_at.isoformat() if c.counted_at else None,
         }
-        for c, name in rows
+        for c in rows
     ]
+    if paginate:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
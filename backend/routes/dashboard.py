@@ -2,19 +2,38 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_
 from collections import defaultdict
-from datetime import datetime, timedelta
-import math
+from datetime import datetime, timedelta, date
+from typing import Optional
+import numpy as np
 from database import get_db
-from models import Flavor, Production, DailyCount, ParLevel
+from models import Flavor, Production, DailyCount, ParLevel, Rollup
+from rollups import rollup_totals, resolve_window, MAX_WINDOW_DAYS
+from forecast import get_forecasts, days_of_cover
+from stores import get_store_id
+from par_engine import (
+    ParColumns, STATUS_LABELS, URGENCY_LABELS, WEEKEND_DAYS,
+    URG_CRITICAL, URG_WARNING, NO_ALERT,
+)
+from serialization import FastJSONRoute
+import datacache
 
-router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"], route_class=FastJSONRoute)
 
 
 @router.get("/inventory")
-def current_inventory(db: Session = Depends(get_db)):
+def current_inventory(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Current on-hand inventory per flavor per product type,
     based on last count + production since last count."""
-    flavors = db.query(Flavor).filter(Flavor.status == 'active').order_by(Flavor.category, Flavor.name).all()
+    return datacache.cached(db, store_id, "inventory", None, lambda: _current_inventory(db, store_id))
+
+
+def _current_inventory(db, store_id):
+    flavors = (
+        db.query(Flavor)
+        .filter(Flavor.store_id == store_id, Flavor.status == 'active')
+        .order_by(Flavor.category, Flavor.name)
+        .all()
+    )
     if not flavors:
         return []
 
@@ -27,7 +46,7 @@ def current_inventory(db: Session = Depends(get_db)):
             DailyCount.product_type,
             func.max(DailyCount.counted_at).label('max_at')
         )
-        .filter(DailyCount.flavor_id.in_(flavor_ids))
+        .filter(DailyCount.store_id == store_id, DailyCount.flavor_id.in_(flavor_ids))
         .group_by(DailyCount.flavor_id, DailyCount.product_type)
         .subquery()
     )
@@ -48,7 +67,7 @@ def current_inventory(db: Session = Depends(get_db)):
     # Bulk: all production for active flavors, filter in Python — 1 query
     all_prod = (
         db.query(Production.flavor_id, Production.product_type, Production.quantity, Production.logged_at)
-        .filter(Production.flavor_id.in_(flavor_ids))
+        .filter(Production.store_id == store_id, Production.flavor_id.in_(flavor_ids))
         .all()
     )
     prod_map = {}
@@ -80,10 +99,23 @@ def current_inventory(db: Session = Depends(get_db)):
     return inventory
 
 
+def _demand_today(forecasts):
+    return {key: model["demand"][0] for key, model in forecasts["keys"].items()}
+
+
+def _is_weekend():
+    return datetime.utcnow().weekday() in WEEKEND_DAYS
+
+
 @router.get("/make-list")
-def morning_make_list(db: Session = Depends(get_db)):
+def morning_make_list(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Morning make list: what to produce based on par levels vs current on-hand."""
-    inv = current_inventory(db=db)
+    today = datetime.utcnow().date()
+    return datacache.cached(db, store_id, "make_list", today, lambda: _make_list(db, store_id))
+
+
+def _make_list(db, store_id):
+    inv = current_inventory(store_id=store_id, db=db)
 
     # Build on-hand lookup: (flavor_id, product_type) -> on_hand
     on_hand_map = {}
@@ -91,99 +123,51 @@ def morning_make_list(db: Session = Depends(get_db)):
         for ptype in ("tub", "pint", "quart"):
             on_hand_map[(item["flavor_id"], ptype)] = item["products"][ptype]["on_hand"]
 
-    # Check if today is a weekend (Fri=4, Sat=5, Sun=6)
-    today = datetime.utcnow().weekday()
-    is_weekend = today in (4, 5, 6)
+    is_weekend = _is_weekend()
+    demand_today = _demand_today(get_forecasts(db, store_id))
 
     # Get all par levels for active flavors
     par_levels = (
         db.query(ParLevel, Flavor.name, Flavor.category)
         .join(Flavor, ParLevel.flavor_id == Flavor.id)
-        .filter(Flavor.status == 'active')
+        .filter(ParLevel.store_id == store_id, Flavor.status == 'active')
         .all()
     )
-
-    # Build per-flavor, per-type deficit info
-    # Key: flavor_id -> { info + products: { tub/pint/quart: {...} } }
-    flavor_map = {}
-    for par, flavor_name, category in par_levels:
-        on_hand = on_hand_map.get((par.flavor_id, par.product_type), 0)
-        target = par.weekend_target if (is_weekend and par.weekend_target) else par.target
-
-        if par.flavor_id not in flavor_map:
-            flavor_map[par.flavor_id] = {
-                "flavor_id": par.flavor_id,
-                "flavor_name": flavor_name,
-                "category": category,
-                "is_weekend": is_weekend,
-                "products": {},
-            }
-
-        if target <= 0:
-            continue
-
-        deficit = max(0, target - on_hand)
-        batch = max(0.25, par.batch_size)
-        subsequent = par.subsequent_batch_size
-
-        # Stepping yield: first batch makes `batch`, subsequent batches make `subsequent`
-        if deficit <= 0:
-            batches_needed = 0
-        elif subsequent and subsequent > 0:
-            if deficit <= batch:
-                batches_needed = 1
-            else:
-                batches_needed = 1 + math.ceil((deficit - batch) / subsequent)
-        else:
-            batches_needed = deficit / batch  # original flat behavior
-
-        flavor_map[par.flavor_id]["products"][par.product_type] = {
-            "on_hand": on_hand,
-            "target": target,
+    pars = [par for par, _name, _category in par_levels]
+    flavor_info = {par.flavor_id: (name, category) for par, name, category in par_levels}
+    cols = ParColumns.from_rows(pars, on_hand_map, demand_today).evaluate(is_weekend)
+
+    # Per-flavor, per-type deficit info for product types with a target
+    listed = cols.open_target > 0
+    products = defaultdict(dict)
+    for i in np.flatnonzero(listed):
+        par = pars[i]
+        products[par.flavor_id][par.product_type] = {
+            "on_hand": on_hand_map.get((par.flavor_id, par.product_type), 0),
+            "target": int(cols.open_target[i]),
+            "forecast_demand": demand_today.get((par.flavor_id, par.product_type)),
             "minimum": par.minimum,
             "batch_size": par.batch_size,
-            "subsequent_batch_size": subsequent,
-            "deficit": deficit,
-            "batches_needed": batches_needed,
-            "status": "critical" if on_hand <= par.minimum and deficit > 0
-                      else "below_par" if deficit > 0
-                      else "stocked",
+            "subsequent_batch_size": par.subsequent_batch_size,
+            "deficit": float(cols.deficit[i]),
+            "batches_needed": cols.batches_value(i),
+            "status": STATUS_LABELS[cols.status[i]],
         }
 
-    # Build final list: one row per flavor with combined batch count
+    # One row per flavor: fractional batch needs summed across product types and
+    # rounded to the nearest 0.5 (one batch can be split between tubs, pints and
+    # quarts); status is the worst across product types
     make_list = []
-    for fid, fdata in flavor_map.items():
-        products = fdata["products"]
-        if not products:
-            continue
-
-        # Sum fractional batch needs across all product types, then round to nearest 0.5
-        # (One batch can be split between tubs, pints, and quarts; half batches allowed)
-        total_batch_need = 0.0
-        for ptype in ["tub", "pint", "quart"]:
-            p = products.get(ptype)
-            if p and p["batches_needed"] > 0:
-                total_batch_need += p["batches_needed"]
-        # Round to nearest 0.5 batch (production can make half batches)
-        total_batches = round(total_batch_need * 2) / 2 if total_batch_need > 0 else 0
-
-        # Overall status: worst status across product types
-        statuses = [p["status"] for p in products.values()]
-        if "critical" in statuses:
-            status = "critical"
-        elif "below_par" in statuses:
-            status = "below_par"
-        else:
-            status = "stocked"
-
+    for fid, (total_batches, status) in cols.flavor_totals(listed).items():
+        flavor_name, category = flavor_info[fid]
         make_list.append({
-            "flavor_id": fdata["flavor_id"],
-            "flavor_name": fdata["flavor_name"],
-            "category": fdata["category"],
-            "is_weekend": fdata["is_weekend"],
-            "products": products,
+            "flavor_id": fid,
+            "flavor_name": flavor_name,
+            "category": category,
+            "is_weekend": is_weekend,
+            "products": products[fid],
             "total_batches": total_batches,
-            "status": status,
+            "status": STATUS_LABELS[status],
         })
 
     # Sort: critical first, then below_par, then stocked; within each by batches desc
@@ -197,13 +181,17 @@ def morning_make_list(db: Session = Depends(get_db)):
 
 
 @router.get("/consumption")
-def daily_consumption(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
+def daily_consumption(
+    days: int = Query(7, ge=1, le=90),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Calculate daily consumption per flavor per product type.
 
     Consumed = previous_count + produced_between - current_count
     """
     since = datetime.utcnow() - timedelta(days=days)
-    flavors = db.query(Flavor).filter(Flavor.active == True).all()
+    flavors = db.query(Flavor).filter(Flavor.store_id == store_id, Flavor.active == True).all()
     if not flavors:
         return []
 
@@ -213,7 +201,11 @@ def daily_consumption(days: int = Query(7, ge=1, le=90), db: Session = Depends(g
     # Bulk: all counts since date — 1 query
     all_counts = (
         db.query(DailyCount)
-        .filter(DailyCount.flavor_id.in_(flavor_ids), DailyCount.counted_at >= since)
+        .filter(
+            DailyCount.store_id == store_id,
+            DailyCount.flavor_id.in_(flavor_ids),
+            DailyCount.counted_at >= since,
+        )
         .order_by(DailyCount.flavor_id, DailyCount.product_type, DailyCount.counted_at)
         .all()
     )
@@ -224,7 +216,11 @@ def daily_consumption(days: int = Query(7, ge=1, le=90), db: Session = Depends(g
     # Bulk: all production since date — 1 query
     all_prod = (
         db.query(Production.flavor_id, Production.product_type, Production.quantity, Production.logged_at)
-        .filter(Production.flavor_id.in_(flavor_ids), Production.logged_at >= since)
+        .filter(
+            Production.store_id == store_id,
+            Production.flavor_id.in_(flavor_ids),
+            Production.logged_at >= since,
+        )
         .all()
     )
     prod_by_key = defaultdict(list)
@@ -255,103 +251,102 @@ def daily_consumption(days: int = Query(7, ge=1, le=90), db: Session = Depends(g
 
 
 @router.get("/popularity")
-def flavor_popularity(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
-    """Rank flavors by total consumption over the period."""
-    data = daily_consumption(days=days, db=db)
+def flavor_popularity(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Rank flavors by total consumption over the period (read from rollups)."""
+    day_from, day_to = resolve_window(days, date_from, date_to)
+    return datacache.cached(
+        db, store_id, "popularity", (day_from, day_to),
+        lambda: _flavor_popularity(db, store_id, day_from, day_to),
+    )
+
+
+def _flavor_popularity(db, store_id, day_from, day_to):
+    rows = (
+        rollup_totals(db, store_id, day_from, day_to)
+        .filter(Flavor.active == True)
+        .having(func.sum(Rollup.consumption_days) > 0)
+        .all()
+    )
     totals = {}
-    for row in data:
-        key = row["flavor_name"]
+    for row in rows:
+        key = row.flavor_name
         if key not in totals:
-            totals[key] = {"flavor_name": key, "flavor_id": row["flavor_id"], "total": 0, "by_type": {}}
-        totals[key]["total"] += row["consumed"]
-        ptype = row["product_type"]
-        totals[key]["by_type"][ptype] = totals[key]["by_type"].get(ptype, 0) + row["consumed"]
+            totals[key] = {"flavor_name": key, "flavor_id": row.flavor_id, "total": 0, "by_type": {}}
+        totals[key]["total"] += row.consumed
+        totals[key]["by_type"][row.product_type] = row.consumed
 
     ranked = sorted(totals.values(), key=lambda x: x["total"], reverse=True)
     return ranked
 
 
 @router.get("/alerts")
-def low_stock_alerts(db: Session = Depends(get_db)):
-    """Generate alerts based on par levels (if set) with consumption-based fallback."""
-    inv = current_inventory(db=db)
-
-    # Build par level lookup
-    par_rows = db.query(ParLevel).all()
-    par_map = {}
-    for p in par_rows:
-        par_map[(p.flavor_id, p.product_type)] = p
-
-    # Check weekend
-    today = datetime.utcnow().weekday()
-    is_weekend = today in (4, 5, 6)
-
-    # Consumption-based fallback data
-    consumption = daily_consumption(days=7, db=db)
-    avg_consumption = {}
-    count_map = {}
-    for row in consumption:
-        key = (row["flavor_id"], row["product_type"])
-        avg_consumption[key] = avg_consumption.get(key, 0) + row["consumed"]
-        count_map[key] = count_map.get(key, 0) + 1
-    for key in avg_consumption:
-        if count_map[key] > 0:
-            avg_consumption[key] = round(avg_consumption[key] / count_map[key], 1)
+def low_stock_alerts(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
+    """Generate alerts based on par levels (if set) with forecast-based fallback."""
+    today = datetime.utcnow().date()
+    return datacache.cached(db, store_id, "alerts", today, lambda: _low_stock_alerts(db, store_id))
+
+
+def _low_stock_alerts(db, store_id):
+    inv = current_inventory(store_id=store_id, db=db)
+    on_hand_map = {
+        (item["flavor_id"], ptype): item["products"][ptype]["on_hand"]
+        for item in inv
+        for ptype in ("tub", "pint", "quart")
+    }
+
+    # Forecast demand per day, starting today
+    fc = get_forecasts(db, store_id)
+    forecasts = fc["keys"]
+    demand_today = _demand_today(fc)
+
+    # Evaluate all par levels at once
+    pars = db.query(ParLevel).filter(ParLevel.store_id == store_id).all()
+    cols = ParColumns.from_rows(pars, on_hand_map, demand_today).evaluate(_is_weekend())
+    par_index = {(p.flavor_id, p.product_type): i for i, p in enumerate(pars)}
 
     alerts = []
     for item in inv:
         for ptype in ("tub", "pint", "quart"):
             on_hand = item["products"][ptype]["on_hand"]
             key = (item["flavor_id"], ptype)
-            par = par_map.get(key)
+            i = par_index.get(key)
+            demand = forecasts[key]["demand"] if key in forecasts else []
+            avg = round(demand[0], 1) if demand else 0
 
-            if par and par.target > 0:
+            if i is not None and cols.target[i] > 0:
                 # Par-level based alerts
-                target = par.weekend_target if (is_weekend and par.weekend_target) else par.target
-                avg = avg_consumption.get(key, 0)
-
-                if on_hand <= par.minimum:
-                    alerts.append({
-                        "flavor_name": item["name"],
-                        "flavor_id": item["flavor_id"],
-                        "product_type": ptype,
-                        "on_hand": on_hand,
-                        "target": target,
-                        "minimum": par.minimum,
-                        "avg_daily": avg,
-                        "urgency": "critical",
-                        "message": f"MAKE NOW - only {on_hand} left (minimum is {par.minimum})",
-                    })
-                elif on_hand < target:
-                    deficit = target - on_hand
-                    alerts.append({
-                        "flavor_name": item["name"],
-                        "flavor_id": item["flavor_id"],
-                        "product_type": ptype,
-                        "on_hand": on_hand,
-                        "target": target,
-                        "minimum": par.minimum,
-                        "avg_daily": avg,
-                        "urgency": "warning",
-                        "message": f"Below target - have {on_hand}, want {target} (need {deficit} more)",
-                    })
-                elif target > 0 and on_hand > target * 1.5:
-                    alerts.append({
-                        "flavor_name": item["name"],
-                        "flavor_id": item["flavor_id"],
-                        "product_type": ptype,
-                        "on_hand": on_hand,
-                        "target": target,
-                        "minimum": par.minimum,
-                        "avg_daily": avg,
-                        "urgency": "overstocked",
-                        "message": f"Overstocked - have {on_hand}, target is {target} (waste risk)",
-                    })
+                urgency = cols.urgency[i]
+                if urgency == NO_ALERT:
+                    continue
+                target = int(cols.open_target[i])
+                minimum = pars[i].minimum
+                if urgency == URG_CRITICAL:
+                    message = f"MAKE NOW - only {on_hand} left (minimum is {minimum})"
+                elif urgency == URG_WARNING:
+                    message = f"Below target - have {on_hand}, want {target} (need {target - on_hand} more)"
+                else:
+                    message = f"Overstocked - have {on_hand}, target is {target} (waste risk)"
+                alerts.append({
+                    "flavor_name": item["name"],
+                    "flavor_id": item["flavor_id"],
+                    "product_type": ptype,
+                    "on_hand": on_hand,
+                    "target": target,
+                    "minimum": minimum,
+                    "avg_daily": avg,
+                    "urgency": URGENCY_LABELS[urgency],
+                    "message": message,
+                })
             else:
-                # Fallback: consumption-based alerts (original logic)
-                avg = avg_consumption.get(key, 0)
-                if avg > 0:
-                    days_left = round(on_hand / avg, 1)
+                # Fallback: forecast-based alerts
+                if any(d > 0 for d in demand):
+                    days_left = days_of_cover(on_hand, demand)
                 elif on_hand == 0:
                     days_left = 0
                 else:
@@ -374,7 +369,7 @@ def low_stock_alerts(db: Session = Depends(get_db)):
                     "avg_daily": avg,
                     "days_left": days_left,
                     "urgency": urgency,
-                    "message": f"{on_hand} left · avg {avg}/day · ~{days_left} days",
+                    "message": f"{on_hand} left · expect {avg} today · ~{days_left} days",
                 })
 
     # Sort: critical first, then warning, then low/overstocked
@@ -384,33 +379,25 @@ def low_stock_alerts(db: Session = Depends(get_db)):
 
 
 @router.get("/production-vs-consumption")
-def production_vs_consumption(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
-    """Compare total production to total consumption per flavor."""
-    since = datetime.utcnow() - timedelta(days=days)
-
-    # Total production per flavor
-    prod_rows = (
-        db.query(
-            Flavor.name,
-            Production.product_type,
-            func.sum(Production.quantity).label("total_produced"),
-        )
-        .join(Flavor, Production.flavor_id == Flavor.id)
-        .filter(Production.logged_at >= since)
-        .group_by(Flavor.name, Production.product_type)
-        .all()
-    )
+def production_vs_consumption(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Compare total production to total consumption per flavor (read from rollups)."""
+    day_from, day_to = resolve_window(days, date_from, date_to)
 
     production_map = {}
-    for name, ptype, total in prod_rows:
-        production_map[(name, ptype)] = total
-
-    # Total consumption
-    consumption = daily_consumption(days=days, db=db)
     consumption_map = {}
-    for row in consumption:
-        key = (row["flavor_name"], row["product_type"])
-        consumption_map[key] = consumption_map.get(key, 0) + row["consumed"]
+    for row in rollup_totals(db, store_id, day_from, day_to).all():
+        key = (row.flavor_name, row.product_type)
+        if row.produced > 0:
+            production_map[key] = row.produced
+        # Consumption is only tracked for active flavors
+        if row.active and row.consumption_days > 0:
+            consumption_map[key] = row.consumed
 
     all_keys = set(production_map.keys()) | set(consumption_map.keys())
     result = []
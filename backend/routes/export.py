@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date, datetime, timedelta
+import csv
+import io
+import json
+from database import SessionLocal
+from models import DailyCount, Production, Flavor
+from stores import get_store_id
+from serialization import FastJSONRoute
+
+router = APIRouter(prefix="/api/export", tags=["export"], route_class=FastJSONRoute)
+
+# Rows fetched per round trip (server-side cursor on Postgres) and rows per
+# chunk written to the client. Both bound memory regardless of export size.
+FETCH_SIZE = 1000
+CHUNK_ROWS = 500
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+COUNT_FIELDS = [
+    "id", "flavor_id", "flavor_name", "product_type", "count", "counted_at",
+    "predicted_count", "variance", "variance_pct", "employee_name",
+]
+
+PRODUCTION_FIELDS = [
+    "id", "flavor_id", "flavor_name", "product_type", "quantity", "logged_at",
+    "employee_name", "deleted_at", "deleted_by",
+]
+
+
+def _date_filters(column, date_from: Optional[date], date_to: Optional[date]):
+    """Inclusive date range filters on a timestamp column."""
+    filters = []
+    if date_from:
+        filters.append(column >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filters.append(column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return filters
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _stream_rows(build_query, fields, fmt):
+    """Yield encoded chunks for every row of build_query(db).
+
+    Opens its own session so the cursor stays valid for the whole response,
+    independent of the request-scoped get_db session.
+    """
+    db = SessionLocal()
+    try:
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(fields)
+
+        pending = 0
+        for row in build_query(db).yield_per(FETCH_SIZE):
+            values = [_serialize(v) for v in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                buf.write(json.dumps(dict(zip(fields, values))))
+                buf.write("\n")
+            pending += 1
+            if pending >= CHUNK_ROWS:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+def _export_response(build_query, fields, fmt, name):
+    filename = f"{name}-{date.today().isoformat()}.{fmt}"
+    return StreamingResponse(
+        _stream_rows(build_query, fields, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/counts")
+def export_counts(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    store_id: int = Depends(get_store_id),
+):
+    """Stream all daily counts in an inclusive date range as CSV or NDJSON."""
+    def build_query(db):
+        return (
+            db.query(
+                DailyCount.id, DailyCount.flavor_id, Flavor.name, DailyCount.product_type,
+                DailyCount.count, DailyCount.counted_at, DailyCount.predicted_count,
+                DailyCount.variance, DailyCount.variance_pct, DailyCount.employee_name,
+            )
+            .join(Flavor, DailyCount.flavor_id == Flavor.id)
+            .filter(DailyCount.store_id == store_id, *_date_filters(DailyCount.counted_at, date_from, date_to))
+            .order_by(DailyCount.counted_at, DailyCount.id)
+        )
+
+    return _export_response(build_query, COUNT_FIELDS, format, "counts")
+
+
+@router.get("/production")
+def export_production(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_deleted: bool = False,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    store_id: int = Depends(get_store_id),
+):
+    """Stream all production entries in an inclusive date range as CSV or NDJSON."""
+    def build_query(db):
+        query = (
+            db.query(
+                Production.id, Production.flavor_id, Flavor.name, Production.product_type,
+                Production.quantity, Production.logged_at, Production.employee_name,
+                Production.deleted_at, Production.deleted_by,
+            )
+            .join(Flavor, Production.flavor_id == Flavor.id)
+            .filter(Production.store_id == store_id, *_date_filters(Production.logged_at, date_from, date_to))
+        )
+        if not include_deleted:
+            query = query.filter(Production.deleted_at == None)
+        return query.order_by(Production.logged_at, Production.id)
+
+    return _export_response(build_query, PRODUCTION_FIELDS, format, "production")
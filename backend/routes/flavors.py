@@ -6,8 +6,11 @@ from datetime import datetime
 from database import get_db
 from models import Flavor, ParLevel
 from auto_discontinue import get_at_risk_flavors, auto_discontinue_specialties
+from stores import get_store_id
+from serialization import FastJSONRoute, row_dict
+import reads
 
-router = APIRouter(prefix="/api/flavors", tags=["flavors"])
+router = APIRouter(prefix="/api/flavors", tags=["flavors"], route_class=FastJSONRoute)
 
 
 class FlavorCreate(BaseModel):
@@ -48,6 +51,7 @@ def list_flavors(
     active_only: bool = True,
     include_discontinued: bool = False,
     status_filter: Optional[str] = None,
+    store_id: int = Depends(get_store_id),
     db: Session = Depends(get_db)
 ):
     """List flavors with optional filtering.
@@ -57,31 +61,37 @@ def list_flavors(
         include_discontinued: Include discontinued flavors in results
         status_filter: Filter by specific status ("active", "discontinued", "archived")
     """
-    query = db.query(Flavor)
-
     # Handle status filtering
+    statuses = None
     if status_filter:
-        query = query.filter(Flavor.status == status_filter)
+        statuses = [status_filter]
     elif active_only and not include_discontinued:
-        query = query.filter(Flavor.status == 'active')
+        statuses = ['active']
     elif include_discontinued:
-        query = query.filter(Flavor.status.in_(['active', 'discontinued']))
+        statuses = ['active', 'discontinued']
 
-    return query.order_by(Flavor.category, Flavor.name).all()
+    return [dict(row._mapping) for row in db.execute(reads.flavors(store_id, statuses))]
 
 
 @router.post("", status_code=201)
-def create_flavor(flavor: FlavorCreate, db: Session = Depends(get_db)):
-    existing = db.query(Flavor).filter(Flavor.name == flavor.name).first()
+def create_flavor(
+    flavor: FlavorCreate, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
+    existing = (
+        db.query(Flavor)
+        .filter(Flavor.store_id == store_id, Flavor.name == flavor.name)
+        .first()
+    )
     if existing:
         raise HTTPException(400, "Flavor already exists")
-    db_flavor = Flavor(name=flavor.name, category=flavor.category)
+    db_flavor = Flavor(store_id=store_id, name=flavor.name, category=flavor.category)
     db.add(db_flavor)
     db.flush()  # assign ID
 
     # Auto-create default par levels for all product types
     for ptype in ("tub", "pint", "quart"):
         db.add(ParLevel(
+            store_id=store_id,
             flavor_id=db_flavor.id,
             product_type=ptype,
             target=0,
@@ -92,19 +102,19 @@ def create_flavor(flavor: FlavorCreate, db: Session = Depends(get_db)):
 
     db.commit()
     db.refresh(db_flavor)
-    return db_flavor
+    return row_dict(db_flavor)
 
 
 # ===== PAR LEVELS (before parameterized routes to avoid conflicts) =====
 
 @router.get("/par-levels")
-def get_all_par_levels(db: Session = Depends(get_db)):
+def get_all_par_levels(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Get par levels for all active flavors."""
     levels = (
         db.query(ParLevel, Flavor.name, Flavor.category)
         .join(Flavor, ParLevel.flavor_id == Flavor.id)
-        .filter(Flavor.active == True)
-        .order_by(Flavor.category, Flavor.name)
+        .filter(ParLevel.store_id == store_id, Flavor.active == True)
+        .order_by(Flavor.category, Flavor.name, ParLevel.product_type)
         .all()
     )
     return [
@@ -125,19 +135,24 @@ def get_all_par_levels(db: Session = Depends(get_db)):
 
 
 @router.put("/par-levels/bulk")
-def bulk_update_par_levels(data: ParLevelBulkUpdate, db: Session = Depends(get_db)):
+def bulk_update_par_levels(
+    data: ParLevelBulkUpdate, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
     """Bulk update par levels."""
+    store_flavor_ids = {fid for (fid,) in db.query(Flavor.id).filter(Flavor.store_id == store_id)}
     updated = 0
     for item in data.levels:
         if item.product_type not in ("tub", "pint", "quart"):
             continue
+        if item.flavor_id not in store_flavor_ids:
+            continue
         par = (
             db.query(ParLevel)
             .filter(ParLevel.flavor_id == item.flavor_id, ParLevel.product_type == item.product_type)
             .first()
         )
         if not par:
-            par = ParLevel(flavor_id=item.flavor_id, product_type=item.product_type)
+            par = ParLevel(store_id=store_id, flavor_id=item.flavor_id, product_type=item.product_type)
             db.add(par)
 
         par.target = item.target
@@ -154,9 +169,9 @@ def bulk_update_par_levels(data: ParLevelBulkUpdate, db: Session = Depends(get_d
 # ===== AUTO-DISCONTINUATION ENDPOINTS (before parameterized routes) =====
 
 @router.get("/at-risk")
-def get_at_risk(db: Session = Depends(get_db)):
+def get_at_risk(store_id: int = Depends(get_store_id), db: Session = Depends(get_db)):
     """Get specialty flavors at risk of auto-discontinuation."""
-    return get_at_risk_flavors(db)
+    return get_at_risk_flavors(db, store_id=store_id)
 
 
 @router.post("/admin/auto-discontinue")
@@ -168,9 +183,15 @@ def run_auto_discontinue(db: Session = Depends(get_db)):
 
 # ===== FLAVOR CRUD (parameterized routes) =====
 
+def _get_store_flavor(db: Session, store_id: int, flavor_id: int):
+    return db.query(Flavor).filter(Flavor.id == flavor_id, Flavor.store_id == store_id).first()
+
+
 @router.put("/{flavor_id}")
-def update_flavor(flavor_id: int, update: FlavorUpdate, db: Session = Depends(get_db)):
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+def update_flavor(
+    flavor_id: int, update: FlavorUpdate, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
+    flavor = _get_store_flavor(db, store_id, flavor_id)
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     if update.name is not None:
@@ -181,12 +202,14 @@ def update_flavor(flavor_id: int, update: FlavorUpdate, db: Session = Depends(ge
         flavor.active = update.active
     db.commit()
     db.refresh(flavor)
-    return flavor
+    return row_dict(flavor)
 
 
 @router.delete("/{flavor_id}")
-def archive_flavor(flavor_id: int, db: Session = Depends(get_db)):
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+def archive_flavor(
+    flavor_id: int, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
+    flavor = _get_store_flavor(db, store_id, flavor_id)
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     flavor.active = False
@@ -196,9 +219,11 @@ def archive_flavor(flavor_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{flavor_id}/discontinue")
-def discontinue_flavor(flavor_id: int, db: Session = Depends(get_db)):
+def discontinue_flavor(
+    flavor_id: int, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
     """Manually mark a flavor as discontinued (typically for sold-out specialties)."""
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+    flavor = _get_store_flavor(db, store_id, flavor_id)
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     if flavor.status == 'discontinued':
@@ -210,13 +235,15 @@ def discontinue_flavor(flavor_id: int, db: Session = Depends(get_db)):
     flavor.active = False  # Backward compatibility
     db.commit()
     db.refresh(flavor)
-    return {"message": f"'{flavor.name}' marked as discontinued", "flavor": flavor}
+    return {"message": f"'{flavor.name}' marked as discontinued", "flavor": row_dict(flavor)}
 
 
 @router.put("/{flavor_id}/reactivate")
-def reactivate_flavor(flavor_id: int, db: Session = Depends(get_db)):
+def reactivate_flavor(
+    flavor_id: int, store_id: int = Depends(get_store_id), db: Session = Depends(get_db)
+):
     """Reactivate a discontinued flavor."""
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+    flavor = _get_store_flavor(db, store_id, flavor_id)
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     if flavor.status == 'active':
@@ -228,15 +255,16 @@ def reactivate_flavor(flavor_id: int, db: Session = Depends(get_db)):
     flavor.active = True  # Backward compatibility
     db.commit()
     db.refresh(flavor)
-    return {"message": f"'{flavor.name}' reactivated", "flavor": flavor}
+    return {"message": f"'{flavor.name}' reactivated", "flavor": row_dict(flavor)}
 
 
 @router.put("/{flavor_id}/par-levels/{product_type}")
 def set_par_level(
-    flavor_id: int, product_type: str, data: ParLevelUpdate, db: Session = Depends(get_db)
+    flavor_id: int, product_type: str, data: ParLevelUpdate,
+    store_id: int = Depends(get_store_id), db: Session = Depends(get_db),
 ):
     """Set par level for a specific flavor + product type."""
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+    flavor = _get_store_flavor(db, store_id, flavor_id)
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     if product_type not in ("tub", "pint", "quart"):
@@ -248,7 +276,7 @@ def set_par_level(
         .first()
     )
     if not par:
-        par = ParLevel(flavor_id=flavor_id, product_type=product_type)
+        par = ParLevel(store_id=store_id, flavor_id=flavor_id, product_type=product_type)
         db.add(par)
 
     par.target = data.target
@@ -258,4 +286,4 @@ def set_par_level(
     par.weekend_target = data.weekend_target
     db.commit()
     db.refresh(par)
-    return par
+    return row_dict(par)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from datetime import timedelta
+from database import get_db
+from stores import get_store_id
+from forecast import get_forecasts, MAX_HORIZON, WEEKDAYS
+from serialization import FastJSONRoute
+
+router = APIRouter(prefix="/api/forecast", tags=["forecast"], route_class=FastJSONRoute)
+
+
+@router.get("")
+def demand_forecast(
+    horizon: int = Query(7, ge=1, le=MAX_HORIZON),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Forecast daily consumption per active flavor and product type, starting today."""
+    fc = get_forecasts(db, store_id)
+    dates = [(fc["start"] + timedelta(days=i)).isoformat() for i in range(horizon)]
+
+    result = []
+    for (flavor_id, ptype), model in fc["keys"].items():
+        result.append({
+            "flavor_id": flavor_id,
+            "flavor_name": model["flavor_name"],
+            "product_type": ptype,
+            "forecast": [
+                {"date": d, "demand": demand}
+                for d, demand in zip(dates, model["demand"])
+            ],
+            "weekday_factors": dict(zip(WEEKDAYS, model["seasonal"])),
+            "alpha": model["alpha"],
+            "mae": model["mae"],
+        })
+
+    result.sort(key=lambda x: (x["flavor_name"], x["product_type"]))
+    return {
+        "start": fc["start"].isoformat(),
+        "horizon": horizon,
+        "fit_ms": fc["fit_ms"],
+        "forecasts": result,
+    }
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, UploadFile, File
+from sqlalchemy.orm import Session
+from typing import List
+import io
+from database import get_db
+from bulk_import import import_counts
+from stores import get_store_id
+from serialization import FastJSONRoute
+import warmup
+
+router = APIRouter(prefix="/api/import", tags=["import"], route_class=FastJSONRoute)
+
+
+@router.post("/counts")
+def import_count_sheets(
+    files: List[UploadFile] = File(...),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Bulk upsert daily counts from one or more CSV uploads.
+
+    Files are parsed as a stream; invalid rows are skipped and reported by
+    file and line number. Existing counts for the same flavor, product type
+    and date are updated rather than duplicated.
+    """
+    sources = (
+        (f.filename, io.TextIOWrapper(f.file, encoding="utf-8-sig", newline=""))
+        for f in files
+    )
+    result = import_counts(sources, db=db, store_id=store_id)
+    warmup.request()
+    return result
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from pydantic import BaseModel
@@ -6,8 +6,14 @@ from typing import Optional
 from datetime import datetime, timedelta
 from database import get_db
 from models import Production, Flavor
+from rollups import refresh_rollups
+from stores import get_store_id
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+import idempotency
+import reads
+from serialization import FastJSONRoute, row_dict
 
-router = APIRouter(prefix="/api/production", tags=["production"])
+router = APIRouter(prefix="/api/production", tags=["production"], route_class=FastJSONRoute)
 
 
 class ProductionCreate(BaseModel):
@@ -19,8 +25,26 @@ class ProductionCreate(BaseModel):
 
 
 @router.post("", status_code=201)
-def log_production(entry: ProductionCreate, db: Session = Depends(get_db)):
-    flavor = db.query(Flavor).filter(Flavor.id == entry.flavor_id).first()
+def log_production(
+    entry: ProductionCreate,
+    idempotency_key: Optional[str] = Header(None),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Log a production entry.
+
+    A retry sent with the same Idempotency-Key gets the first response back
+    (see idempotency.py).
+    """
+    replayed = idempotency.replay(db, idempotency_key, "POST /api/production", store_id, entry)
+    if replayed is not None:
+        return replayed
+
+    flavor = (
+        db.query(Flavor)
+        .filter(Flavor.id == entry.flavor_id, Flavor.store_id == store_id)
+        .first()
+    )
     if not flavor:
         raise HTTPException(404, "Flavor not found")
     if entry.product_type not in ("tub", "pint", "quart"):
@@ -28,6 +52,7 @@ def log_production(entry: ProductionCreate, db: Session = Depends(get_db)):
     if entry.quantity <= 0:
         raise HTTPException(400, "Quantity must be greater than 0")
     record = Production(
+        store_id=store_id,
         flavor_id=entry.flavor_id,
         product_type=entry.product_type,
         quantity=entry.quantity,
@@ -36,35 +61,50 @@ def log_production(entry: ProductionCreate, db: Session = Depends(get_db)):
     if entry.logged_at:
         record.logged_at = datetime.fromisoformat(entry.logged_at.replace("Z", "+00:00"))
     db.add(record)
+    db.flush()
+    db.refresh(record)  # load server-default logged_at
+    refresh_rollups(db, [(record.flavor_id, record.product_type, record.logged_at)])
+    result = row_dict(record)
+    replayed = idempotency.save(db, idempotency_key, "POST /api/production", store_id, entry, 201, result)
+    if replayed is not None:
+        return replayed
     db.commit()
-    db.refresh(record)
-    return record
+    return result
 
 
 @router.get("")
 def list_production(
     days: int = Query(7, ge=1, le=90),
     include_deleted: bool = Query(False),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    store_id: int = Depends(get_store_id),
     db: Session = Depends(get_db),
 ):
-    since = datetime.utcnow() - timedelta(days=days)
-    query = (
-        db.query(Production, Flavor.name)
-        .join(Flavor, Production.flavor_id == Flavor.id)
-        .filter(Production.logged_at >= since)
-    )
+    """Production log, newest first.
 
-    # Filter out deleted entries unless explicitly requested
-    if not include_deleted:
-        query = query.filter(Production.deleted_at == None)
+    Without `limit`/`cursor` the whole window is returned as a list. With
+    either, returns {"items": [...], "next_cursor": ...}.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    # Deleted entries are filtered out unless explicitly requested
+    stmt = reads.production_log(store_id, since, include_deleted)
 
-    rows = query.order_by(desc(Production.logged_at)).all()
+    paginate = limit is not None or cursor is not None
+    if paginate:
+        rows, next_cursor = keyset_page(
+            db, stmt, Production.logged_at, Production.id,
+            cursor=cursor, limit=limit or DEFAULT_PAGE_SIZE,
+            key=lambda row: (row.logged_at, row.id),
+        )
+    else:
+        rows = db.execute(stmt.order_by(desc(Production.logged_at))).all()
 
-    return [
+    items = [
         {
             "id": p.id,
             "flavor_id": p.flavor_id,
-            "flavor_name": name,
+            "flavor_name": p.flavor_name,
             "product_type": p.product_type,
             "quantity": p.quantity,
             "logged_at": p.logged_at.isoformat() if p.logged_at else None,
@@ -72,16 +112,28 @@ def list_production(
             "deleted_at": p.deleted_at.isoformat() if p.deleted_at else None,
             "deleted_by": p.deleted_by,
         }
-        for p, name in rows
+        for p in rows
     ]
+    if paginate:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
 
 
 @router.delete("/{entry_id}")
-def delete_production(entry_id: int, employee_name: str = None, db: Session = Depends(get_db)):
+def delete_production(
+    entry_id: int,
+    employee_name: str = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Soft delete production entry with employee tracking"""
     from datetime import datetime
 
-    entry = db.query(Production).filter(Production.id == entry_id).first()
+    entry = (
+        db.query(Production)
+        .filter(Production.id == entry_id, Production.store_id == store_id)
+        .first()
+    )
     if not entry:
         raise HTTPException(404, "Production entry not found")
 
@@ -1,36 +1,48 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, case
+from typing import Optional
 from datetime import datetime, timedelta, date
 from database import get_db
 from models import Flavor, Production, DailyCount, ParLevel
-from routes.dashboard import daily_consumption
+from rollups import rollup_totals, resolve_window, rebuild_rollups, MAX_WINDOW_DAYS
+from par_engine import par_accuracy_columns, ACCURACY_LABELS
+from stores import get_store_id
+from profiling import require_admin
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from serialization import FastJSONRoute
+import reads
+import datacache
 
-router = APIRouter(prefix="/api/reports", tags=["reports"])
+router = APIRouter(prefix="/api/reports", tags=["reports"], route_class=FastJSONRoute)
 
 
 @router.get("/waste")
-def waste_report(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
+def waste_report(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Production summary: per-flavor production volumes and consumption patterns."""
-    since = datetime.utcnow() - timedelta(days=days)
-
-    # Total production per flavor (aggregated across product types)
-    prod_rows = (
-        db.query(Flavor.name, func.sum(Production.quantity).label("total"))
-        .join(Flavor, Production.flavor_id == Flavor.id)
-        .filter(Production.logged_at >= since, Flavor.active == True)
-        .group_by(Flavor.name)
-        .all()
+    day_from, day_to = resolve_window(days, date_from, date_to)
+    return datacache.cached(
+        db, store_id, "waste", (day_from, day_to),
+        lambda: _waste_report(db, store_id, day_from, day_to),
     )
-    production_map = {name: total for name, total in prod_rows}
 
-    # Total consumption per flavor
-    consumption = daily_consumption(days=days, db=db)
+
+def _waste_report(db, store_id, day_from, day_to):
+    # Production and consumption per flavor (aggregated across product types)
+    production_map = {}
     consumption_map = {}
-    for row in consumption:
-        consumption_map[row["flavor_name"]] = (
-            consumption_map.get(row["flavor_name"], 0) + row["consumed"]
-        )
+    for row in rollup_totals(db, store_id, day_from, day_to).filter(Flavor.active == True).all():
+        name = row.flavor_name
+        if row.produced > 0:
+            production_map[name] = production_map.get(name, 0) + row.produced
+        if row.consumption_days > 0:
+            consumption_map[name] = consumption_map.get(name, 0) + row.consumed
 
     all_flavors = set(production_map.keys()) | set(consumption_map.keys())
     result = []
@@ -53,61 +65,47 @@ def waste_report(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db
 
 
 @router.get("/par-accuracy")
-def par_accuracy(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db)):
+def par_accuracy(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Compare average daily consumption to par level targets and suggest adjustments."""
-    consumption = daily_consumption(days=days, db=db)
+    day_from, day_to = resolve_window(days, date_from, date_to)
 
-    # Average daily consumption per flavor per product type
+    # Total consumption and number of days with consumption per flavor/product type
     totals = {}
-    day_counts = {}
-    for row in consumption:
-        key = (row["flavor_id"], row["flavor_name"], row["product_type"])
-        totals[key] = totals.get(key, 0) + row["consumed"]
-        # Count unique dates for proper averaging
-        date_key = (row["flavor_id"], row["product_type"], row["date"])
-        if date_key not in day_counts:
-            day_counts[date_key] = True
-
     date_count_per_key = {}
-    for (fid, ptype, _date) in day_counts:
-        k = (fid, ptype)
-        date_count_per_key[k] = date_count_per_key.get(k, 0) + 1
+    for row in rollup_totals(db, store_id, day_from, day_to).filter(Flavor.active == True).all():
+        key = (row.flavor_id, row.product_type)
+        totals[key] = row.consumed
+        date_count_per_key[key] = row.consumption_days
 
     # Get par levels with flavor info
     par_rows = (
         db.query(ParLevel, Flavor.name, Flavor.category)
         .join(Flavor, ParLevel.flavor_id == Flavor.id)
-        .filter(Flavor.active == True)
+        .filter(ParLevel.store_id == store_id, Flavor.active == True, ParLevel.target > 0)
         .all()
     )
+    keys = [(par.flavor_id, par.product_type) for par, _name, _category in par_rows]
+    avg_daily, suggested, status = par_accuracy_columns(
+        [par.target for par, _name, _category in par_rows],
+        [totals.get(k, 0) for k in keys],
+        [date_count_per_key.get(k, 0) for k in keys],
+    )
 
     result = []
-    for par, flavor_name, category in par_rows:
-        if par.target <= 0:
-            continue
-
-        key = (par.flavor_id, flavor_name, par.product_type)
-        total_consumed = totals.get(key, 0)
-        num_days = date_count_per_key.get((par.flavor_id, par.product_type), 0)
-        avg_daily = round(total_consumed / num_days, 1) if num_days > 0 else 0
-
-        # Suggest target = avg daily use * 1.2 (20% buffer), rounded up
-        suggested = max(1, round(avg_daily * 1.2)) if avg_daily > 0 else par.target
-
-        # Determine status
-        if par.target > 0 and avg_daily > 0:
-            ratio = par.target / avg_daily
-            if ratio > 1.5:
-                status = "too_high"
-                action = f"Lower to {suggested}"
-            elif ratio < 0.8:
-                status = "too_low"
-                action = f"Raise to {suggested}"
-            else:
-                status = "well_set"
-                action = None
+    for i, (par, flavor_name, category) in enumerate(par_rows):
+        label = ACCURACY_LABELS[status[i]]
+        suggested_target = int(suggested[i])
+        if label == "too_high":
+            action = f"Lower to {suggested_target}"
+        elif label == "too_low":
+            action = f"Raise to {suggested_target}"
         else:
-            status = "well_set"
             action = None
 
         result.append({
@@ -116,9 +114,9 @@ def par_accuracy(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db
             "category": category,
             "product_type": par.product_type,
             "current_target": par.target,
-            "avg_daily_use": avg_daily,
-            "suggested_target": suggested,
-            "status": status,
+            "avg_daily_use": float(avg_daily[i]),
+            "suggested_target": suggested_target,
+            "status": label,
             "action": action,
         })
 
@@ -128,110 +126,124 @@ def par_accuracy(days: int = Query(7, ge=1, le=90), db: Session = Depends(get_db
     return result
 
 
+def _variance_item(count):
+    return {
+        "id": count.id,
+        "flavor_id": count.flavor_id,
+        "flavor_name": count.flavor_name,
+        "category": count.category,
+        "product_type": count.product_type,
+        "predicted": count.predicted_count,
+        "actual": count.count,
+        "variance": count.variance,
+        "variance_pct": count.variance_pct,
+        "counted_at": count.counted_at.isoformat(),
+        "date": count.counted_at.date().isoformat(),
+        "employee_name": count.employee_name,
+    }
+
+
 @router.get("/variance")
-def variance_report(days: int = Query(1, ge=1, le=90), db: Session = Depends(get_db)):
-    """Variance tracking report: shows discrepancies between predicted and actual counts."""
+def variance_report(
+    days: int = Query(1, ge=1, le=90),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Variance tracking report: shows discrepancies between predicted and actual counts.
+
+    Summary, trend and top high-variance items are aggregated in SQL over the
+    whole window. `all_items` holds every row unless `limit`/`cursor` is
+    passed, in which case it holds one page and `next_cursor` points at the next.
+    """
     since = datetime.utcnow() - timedelta(days=days)
+    window = (
+        DailyCount.store_id == store_id,
+        DailyCount.counted_at >= since,
+        DailyCount.predicted_count.isnot(None),
+        Flavor.active == True,
+    )
+    abs_pct = func.abs(DailyCount.variance_pct)
+    is_high = case((abs_pct > 25, 1), else_=0)
 
-    # Get all counts with variance data
-    counts = (
-        db.query(DailyCount, Flavor.name, Flavor.category)
+    # Summary stats
+    total_items, high_variance_count, avg_variance = (
+        db.query(func.count(DailyCount.id), func.coalesce(func.sum(is_high), 0), func.avg(abs_pct))
         .join(Flavor, DailyCount.flavor_id == Flavor.id)
-        .filter(
-            DailyCount.counted_at >= since,
-            DailyCount.predicted_count.isnot(None),
-            Flavor.active == True
-        )
-        .order_by(desc(DailyCount.counted_at))
-        .all()
+        .filter(*window)
+        .one()
     )
 
-    # Build response data
-    all_items = []
-    high_variance_items = []
-    variance_by_date = {}
-
-    for count, flavor_name, category in counts:
-        count_date = count.counted_at.date().isoformat()
-
-        item = {
-            "id": count.id,
-            "flavor_id": count.flavor_id,
-            "flavor_name": flavor_name,
-            "category": category,
-            "product_type": count.product_type,
-            "predicted": count.predicted_count,
-            "actual": count.count,
-            "variance": count.variance,
-            "variance_pct": count.variance_pct,
-            "counted_at": count.counted_at.isoformat(),
-            "date": count_date,
-            "employee_name": count.employee_name,
+    # Trend data: one row per day
+    count_date = func.date(DailyCount.counted_at)
+    trend_rows = (
+        db.query(count_date, func.count(DailyCount.id), func.coalesce(func.sum(is_high), 0), func.avg(abs_pct))
+        .join(Flavor, DailyCount.flavor_id == Flavor.id)
+        .filter(*window)
+        .group_by(count_date)
+        .order_by(count_date)
+        .all()
+    )
+    trend_data = [
+        {
+            "date": str(day),
+            "total_items": total,
+            "high_variance_count": high,
+            "avg_variance_pct": round(avg_pct, 1) if avg_pct is not None else 0,
         }
+        for day, total, high, avg_pct in trend_rows
+    ]
+
+    # Top 20 high variance items (>25%) by absolute variance percentage
+    high_rows = db.execute(
+        reads.variance_items(*window, abs_pct > 25)
+        .order_by(desc(abs_pct), desc(DailyCount.counted_at))
+        .limit(20)
+    ).all()
+    high_variance_items = [_variance_item(row) for row in high_rows]
+
+    items_stmt = reads.variance_items(*window)
+    paginate = limit is not None or cursor is not None
+    next_cursor = None
+    if paginate:
+        rows, next_cursor = keyset_page(
+            db, items_stmt, DailyCount.counted_at, DailyCount.id,
+            cursor=cursor, limit=limit or DEFAULT_PAGE_SIZE,
+            key=lambda row: (row.counted_at, row.id),
+        )
+    else:
+        rows = db.execute(items_stmt.order_by(desc(DailyCount.counted_at))).all()
+    all_items = [_variance_item(row) for row in rows]
 
-        all_items.append(item)
-
-        # Track high variance items (>25%)
-        if count.variance_pct is not None and abs(count.variance_pct) > 25:
-            high_variance_items.append(item)
-
-        # Aggregate variance by date for trend
-        if count_date not in variance_by_date:
-            variance_by_date[count_date] = {
-                "date": count_date,
-                "total_items": 0,
-                "high_variance_count": 0,
-                "avg_variance_pct": []
-            }
-        variance_by_date[count_date]["total_items"] += 1
-        if count.variance_pct is not None:
-            variance_by_date[count_date]["avg_variance_pct"].append(abs(count.variance_pct))
-            if abs(count.variance_pct) > 25:
-                variance_by_date[count_date]["high_variance_count"] += 1
-
-    # Calculate summary stats
-    total_items = len(all_items)
-    high_variance_count = len(high_variance_items)
-    avg_variance = 0
-    if all_items:
-        valid_variances = [abs(item["variance_pct"]) for item in all_items if item["variance_pct"] is not None]
-        avg_variance = round(sum(valid_variances) / len(valid_variances), 1) if valid_variances else 0
-
-    # Build trend data
-    trend_data = []
-    for date_key in sorted(variance_by_date.keys()):
-        data = variance_by_date[date_key]
-        avg_pct = sum(data["avg_variance_pct"]) / len(data["avg_variance_pct"]) if data["avg_variance_pct"] else 0
-        trend_data.append({
-            "date": data["date"],
-            "total_items": data["total_items"],
-            "high_variance_count": data["high_variance_count"],
-            "avg_variance_pct": round(avg_pct, 1)
-        })
-
-    # Sort high variance items by absolute variance percentage
-    high_variance_items.sort(key=lambda x: abs(x["variance_pct"]) if x["variance_pct"] else 0, reverse=True)
-
-    return {
+    result = {
         "summary": {
             "total_items": total_items,
             "high_variance_count": high_variance_count,
-            "avg_variance_pct": avg_variance,
+            "avg_variance_pct": round(avg_variance, 1) if avg_variance is not None else 0,
             "days": days,
         },
-        "high_variance_items": high_variance_items[:20],  # Top 20
+        "high_variance_items": high_variance_items,
         "trend_data": trend_data,
         "all_items": all_items,
     }
+    if paginate:
+        result["next_cursor"] = next_cursor
+    return result
 
 
 @router.get("/variance/flavor/{flavor_id}")
-def variance_by_flavor(flavor_id: int, days: int = Query(30, ge=1, le=90), db: Session = Depends(get_db)):
+def variance_by_flavor(
+    flavor_id: int,
+    days: int = Query(30, ge=1, le=90),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Get variance history for a specific flavor across all product types."""
     since = datetime.utcnow() - timedelta(days=days)
 
     # Get flavor info
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
+    flavor = db.query(Flavor).filter(Flavor.id == flavor_id, Flavor.store_id == store_id).first()
     if not flavor:
         return {"error": "Flavor not found"}
 
@@ -239,6 +251,7 @@ def variance_by_flavor(flavor_id: int, days: int = Query(30, ge=1, le=90), db: S
     counts = (
         db.query(DailyCount)
         .filter(
+            DailyCount.store_id == store_id,
             DailyCount.flavor_id == flavor_id,
             DailyCount.counted_at >= since,
             DailyCount.predicted_count.isnot(None)
@@ -270,30 +283,17 @@ def variance_by_flavor(flavor_id: int, days: int = Query(30, ge=1, le=90), db: S
 
 
 @router.get("/employee-performance")
-def employee_performance(days: int = Query(30, ge=1, le=90), db: Session = Depends(get_db)):
+def employee_performance(
+    days: int = Query(30, ge=1, le=90),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
     """Employee performance analytics: accuracy, activity, and variance trends."""
     since = datetime.utcnow() - timedelta(days=days)
 
-    # Get all counts with employee names
-    counts = (
-        db.query(DailyCount)
-        .filter(
-            DailyCount.counted_at >= since,
-            DailyCount.employee_name.isnot(None),
-            DailyCount.predicted_count.isnot(None)
-        )
-        .all()
-    )
-
-    # Get all production with employee names
-    production = (
-        db.query(Production)
-        .filter(
-            Production.logged_at >= since,
-            Production.employee_name.isnot(None)
-        )
-        .all()
-    )
+    # Only the columns the aggregation reads: employee, variance and time
+    counts = db.execute(reads.employee_counts(store_id, since)).all()
+    production = db.execute(reads.employee_production(store_id, since)).all()
 
     # Aggregate by employee
     employee_stats = {}
@@ -377,3 +377,9 @@ def employee_performance(days: int = Query(30, ge=1, le=90), db: Session = Depen
         "days": days,
         "total_employees": len(result),
     }
+
+
+@router.post("/admin/rebuild-rollups", dependencies=[Depends(require_admin)])
+def run_rebuild_rollups(db: Session = Depends(get_db)):
+    """Recompute all report rollups from raw counts and production (needs the admin token)."""
+    return rebuild_rollups(db)
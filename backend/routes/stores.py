@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from database import get_db
+from models import Store
+from serialization import FastJSONRoute
+
+router = APIRouter(prefix="/api/stores", tags=["stores"], route_class=FastJSONRoute)
+
+
+class StoreCreate(BaseModel):
+    name: str
+
+
+@router.get("")
+def list_stores(db: Session = Depends(get_db)):
+    stores = db.query(Store).order_by(Store.id).all()
+    return [{"id": s.id, "name": s.name} for s in stores]
+
+
+@router.post("", status_code=201)
+def create_store(store: StoreCreate, db: Session = Depends(get_db)):
+    """Add a shop location. Scope other requests to it with ?store_id= or X-Store-Id."""
+    if db.query(Store).filter(Store.name == store.name).first():
+        raise HTTPException(400, "Store already exists")
+    record = Store(name=store.name)
+    db.add(record)
+    db.commit()
+    db.refresh(record)
+    return {"id": record.id, "name": record.name}
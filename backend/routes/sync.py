@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from database import get_db
+from stores import get_store_id
+from sync import changes, decode_cursor, SYNC_PAGE_SIZE, MAX_SYNC_PAGE_SIZE
+from serialization import FastJSONRoute
+
+router = APIRouter(prefix="/api/sync", tags=["sync"], route_class=FastJSONRoute)
+
+
+@router.get("")
+def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE),
+    store_id: int = Depends(get_store_id),
+    db: Session = Depends(get_db),
+):
+    """Flavors, par levels, counts and production changed since a cursor from an earlier sync.
+
+    Without `since`, starts a full sync ("full": true). At most `limit` rows
+    per table: while "has_more" is true, call again with the returned
+    `cursor`; once it is false, keep that cursor for the next sync.
+    """
+    return changes(db, store_id, decode_cursor(since) if since else None, limit)
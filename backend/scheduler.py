@@ -0,0 +1,332 @@
+"""In-process scheduler for maintenance and precompute jobs.
+
+Each worker process runs a scheduler thread. Every SCHEDULER_POLL_SECONDS it
+starts the jobs that are due. Each job runs once a day at a fixed UTC time,
+and a missed run (the app was down at that time) happens at the next poll.
+A newly added job first runs at its next scheduled time, not at the first
+poll after deploy.
+
+Jobs that change or precompute shared data are leased through the
+job_leases table, so only one worker runs each of them. A worker claims a
+lease with a single UPDATE that only succeeds if the lease is free or
+expired and the job hasn't run since its scheduled time. If a worker dies
+mid-run, its lease expires after the job's timeout and the next worker to
+poll runs the job again. Jobs that fill per-process caches run in every
+worker instead.
+
+Every run is recorded in job_runs with its duration and result. See
+GET /api/admin/jobs and GET /api/admin/jobs/runs.
+
+Jobs (UTC):
+- auto_discontinue 09:00: discontinue specialty flavors not counted lately
+- refresh_rollups 09:30: rebuild report rollups from raw counts and production
+- purge_idempotency_keys 10:00: delete expired Idempotency-Key responses (see idempotency.py)
+- insights 12:00: AI insights per store, served by /api/insights until data changes
+- warm_caches 12:30, every worker: first-screen caches (see warmup.py)
+
+Settings (environment):
+- SCHEDULER_ENABLED: 0 runs no jobs in this process (default 1)
+- SCHEDULER_POLL_SECONDS: default 30
+
+Run this script:
+- List jobs and their last runs: python scheduler.py
+- Run one job now, ignoring its lease: python scheduler.py <job>
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, engine
+from models import JobLease, JobRun, Store
+from auto_discontinue import auto_discontinue_specialties
+from rollups import rebuild_rollups
+import datacache
+import idempotency
+import warmup
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "1") != "0"
+SCHEDULER_POLL_SECONDS = float(os.environ.get("SCHEDULER_POLL_SECONDS", "30"))
+JOB_HISTORY_DAYS = 30      # Older runs are deleted
+DURATION_SAMPLE = 10       # Recent successful runs averaged for avg_duration_ms
+
+_stop = threading.Event()
+_thread = None
+_started_at = None
+_local_runs = {}           # every-worker job -> last run in this process
+
+
+# ===== JOBS =====
+
+def _store_ids(db):
+    return [store_id for (store_id,) in db.query(Store.id).order_by(Store.id)]
+
+
+def run_auto_discontinue():
+    return auto_discontinue_specialties()
+
+
+def run_refresh_rollups():
+    return rebuild_rollups()
+
+
+def run_purge_idempotency_keys():
+    return {"deleted": idempotency.purge_expired()}
+
+
+def run_insights():
+    """AI insights for every store, tagged with the data versions and date they describe."""
+    if not os.environ.get("ANTHROPIC_API_KEY"):
+        return {"skipped": "ANTHROPIC_API_KEY is not set"}
+    from ai_insights import get_client, request_insights, shop_data
+
+    client = get_client()
+    db = SessionLocal()
+    try:
+        versions = datacache.versions(db)  # Read first: a write during the run only makes it stale
+        store_ids = _store_ids(db)
+        stores = {str(store_id): request_insights(client, *shop_data(db, store_id)) for store_id in store_ids}
+    finally:
+        db.close()
+    return {"data_versions": {str(store_id): versions.get(store_id, 0) for store_id in store_ids},
+            "date": datetime.utcnow().date().isoformat(), "stores": stores}
+
+
+def run_warm_caches():
+    return warmup.warm()
+
+
+# name -> daily UTC time, function, lease timeout, and whether every worker runs it
+JOBS = {
+    "auto_discontinue": {"at": "09:00", "run": run_auto_discontinue, "timeout": 600, "every_worker": False},
+    "refresh_rollups": {"at": "09:30", "run": run_refresh_rollups, "timeout": 1800, "every_worker": False},
+    "purge_idempotency_keys": {"at": "10:00", "run": run_purge_idempotency_keys, "timeout": 300, "every_worker": False},
+    "insights": {"at": "12:00", "run": run_insights, "timeout": 600, "every_worker": False},
+    "warm_caches": {"at": "12:30", "run": run_warm_caches, "timeout": 600, "every_worker": True},
+}
+
+
+# ===== SCHEDULING =====
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def last_slot(at, now):
+    """The most recent time of day `at` ("HH:MM") at or before now."""
+    hour, minute = map(int, at.split(":"))
+    slot = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return slot if slot <= now else slot - timedelta(days=1)
+
+
+def _claim(name, slot, timeout):
+    """Take the job's lease if it is free and the job hasn't run since slot.
+
+    A job without a lease row yet (just deployed) counts as run now, so its
+    first run is at its next scheduled time rather than at the first poll.
+    """
+    now = datetime.utcnow()
+    with engine.connect() as conn:
+        lease = conn.execute(select(JobLease.last_run_at).where(JobLease.name == name)).first()
+    if lease is None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(JobLease.__table__).values(name=name, last_run_at=now))
+        except IntegrityError:
+            pass  # Another worker created it first
+        return False
+    if lease.last_run_at is None:  # Lease rows created before new jobs were held back
+        with engine.begin() as conn:
+            conn.execute(update(JobLease.__table__)
+                         .where(JobLease.name == name, JobLease.last_run_at.is_(None))
+                         .values(last_run_at=now))
+        return False
+    with engine.begin() as conn:
+        return conn.execute(
+            update(JobLease.__table__)
+            .where(
+                JobLease.name == name,
+                or_(JobLease.expires_at.is_(None), JobLease.expires_at < now),
+                JobLease.last_run_at < slot,
+            )
+            .values(holder=worker_id(), expires_at=now + timedelta(seconds=timeout))
+        ).rowcount == 1
+
+
+def _release(name):
+    with engine.begin() as conn:
+        conn.execute(
+            update(JobLease.__table__)
+            .where(JobLease.name == name, JobLease.holder == worker_id())
+            .values(holder=None, expires_at=None, last_run_at=datetime.utcnow())
+        )
+
+
+def run_job(name):
+    """Run a job now in this thread and record the run (no lease is taken).
+
+    Returns:
+        the recorded run as a dict (see job_runs)
+    """
+    started_at = datetime.utcnow()
+    with engine.begin() as conn:
+        run_id = conn.execute(insert(JobRun.__table__).values(
+            name=name, worker=worker_id(), started_at=started_at, status="running",
+        )).inserted_primary_key[0]
+
+    started = time.perf_counter()
+    status, result, error = "ok", None, None
+    try:
+        result = JOBS[name]["run"]()
+    except Exception:
+        status, error = "error", traceback.format_exc()
+        print(f"Job {name} failed:\n{error}")
+    values = {
+        "finished_at": datetime.utcnow(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "status": status,
+        "result": json.dumps(result, default=str) if result is not None else None,
+        "error": error,
+    }
+    with engine.begin() as conn:
+        conn.execute(update(JobRun.__table__).where(JobRun.id == run_id).values(**values))
+        conn.execute(delete(JobRun.__table__).where(
+            JobRun.name == name, JobRun.started_at < started_at - timedelta(days=JOB_HISTORY_DAYS),
+        ))
+    return {"id": run_id, "name": name, "worker": worker_id(), "started_at": started_at.isoformat(),
+            **values, "finished_at": values["finished_at"].isoformat(), "result": result}
+
+
+def _poll():
+    now = datetime.utcnow()
+    for name, job in JOBS.items():
+        if _stop.is_set():
+            return
+        slot = last_slot(job["at"], now)
+        if job["every_worker"]:
+            if _local_runs.get(name, _started_at) < slot:
+                _local_runs[name] = now
+                run_job(name)
+        elif _claim(name, slot, job["timeout"]):
+            try:
+                run_job(name)
+            finally:
+                _release(name)
+
+
+def _loop():
+    while True:
+        try:
+            _poll()
+        except Exception:
+            print(f"Scheduler poll failed:\n{traceback.format_exc()}")
+        if _stop.wait(SCHEDULER_POLL_SECONDS):
+            return
+
+
+def start():
+    """Start this process's scheduler thread (no-op when disabled or already running)."""
+    global _thread, _started_at
+    if not SCHEDULER_ENABLED or (_thread is not None and _thread.is_alive()):
+        return
+    _started_at = datetime.utcnow()  # Every-worker jobs wait for their next time
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="scheduler", daemon=True)
+    _thread.start()
+
+
+def stop():
+    """Stop after the running job, if any (an unfinished job's lease expires)."""
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+
+
+# ===== HISTORY =====
+
+def _run_dict(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "worker": row.worker,
+        "started_at": row.started_at.isoformat(),
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+        "duration_ms": row.duration_ms,
+        "status": row.status,
+        "result": json.loads(row.result) if row.result else None,
+        "error": row.error,
+    }
+
+
+def job_runs(name=None, limit=50):
+    """Recorded runs, newest first, optionally of one job."""
+    stmt = select(JobRun.__table__).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+    if name:
+        stmt = stmt.where(JobRun.name == name)
+    with engine.connect() as conn:
+        return [_run_dict(row) for row in conn.execute(stmt)]
+
+
+def job_status():
+    """Each job's schedule, lease and last run, with the mean duration of recent successful runs."""
+    now = datetime.utcnow()
+    with engine.connect() as conn:
+        leases = {row.name: row for row in conn.execute(select(JobLease.__table__))}
+    status = []
+    for name, job in JOBS.items():
+        runs = job_runs(name, DURATION_SAMPLE)
+        durations = [run["duration_ms"] for run in runs if run["status"] == "ok"]
+        lease = leases.get(name)
+        status.append({
+            "name": name,
+            "at": job["at"],
+            "every_worker": job["every_worker"],
+            "next_run_at": (last_slot(job["at"], now) + timedelta(days=1)).isoformat(),
+            "lease_holder": lease.holder if lease else None,
+            "lease_expires_at": lease.expires_at.isoformat() if lease and lease.expires_at else None,
+            "last_run": runs[0] if runs else None,
+            "avg_duration_ms": round(sum(durations) / len(durations), 1) if durations else None,
+        })
+    return status
+
+
+def latest_result(name):
+    """Result of the job's most recent successful run, or None."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(JobRun.result)
+            .where(JobRun.name == name, JobRun.status == "ok")
+            .order_by(JobRun.started_at.desc())
+            .limit(1)
+        ).first()
+    return json.loads(row.result) if row and row.result else None
+
+
+def precomputed_insights(db, store_id):
+    """Insights from the insights job if nothing has changed since it ran today, else None."""
+    result = latest_result("insights")
+    if (not result or "data_versions" not in result
+            or result["date"] != datetime.utcnow().date().isoformat()
+            or result["data_versions"].get(str(store_id)) != datacache.current(db, store_id)):
+        return None
+    return result["stores"].get(str(store_id))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        if sys.argv[1] not in JOBS:
+            sys.exit(f"Unknown job '{sys.argv[1]}' (choose from {', '.join(JOBS)})")
+        run = run_job(sys.argv[1])
+        print(f"{run['name']}: {run['status']} in {run['duration_ms']} ms")
+        print(run["error"] or json.dumps(run["result"], indent=2, default=str))
+    else:
+        for job in job_status():
+            last = job["last_run"]
+            summary = f"{last['status']} at {last['started_at']} ({last['duration_ms']} ms)" if last else "never run"
+            print(f"  {job['name']:18} {job['at']} UTC{' (every worker)' if job['every_worker'] else '':16}  last: {summary}")
@@ -1,19 +1,38 @@
-"""Seed the database with real flavors and sample data for demo."""
+"""Seed the database with real flavors and simulated history.
+
+With no arguments this builds the demo database: one store, the 25 flavors
+from the real inventory sheets and 5 days of production and counts. The
+same generator scales up to N stores x F flavors x D days for load and
+benchmark work; flavors beyond the real list get synthetic names.
+
+The simulation runs day by day over every (store, flavor, product_type) at
+once: demand follows day-of-week and summer seasonality, production follows
+par levels with stepping-yield batches, and counts carry predicted counts,
+variance, occasional miscounts and soft-deleted production mistakes. Rows
+are written with executemany in chunks.
+
+Run this script:
+- Demo data: python seed.py
+- Load data: python seed.py --stores 5 --flavors 60 --days 730 --seed 7
+"""
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
+import argparse
+import math
+import time
 from datetime import datetime, timedelta
-import random
-from database import engine, SessionLocal, init_db, Base
-from models import Flavor, Production, DailyCount, ParLevel
-
-# Wipe and recreate
-Base.metadata.drop_all(bind=engine)
-init_db()
+import numpy as np
+from sqlalchemy import insert
+from database import engine, SessionLocal, Base
+from models import Store, Flavor, Production, DailyCount, ParLevel
+from stores import ensure_default_store, DEFAULT_STORE_ID
+from migrations import migrate
 
-db = SessionLocal()
+# Rows per executemany round trip
+CHUNK_SIZE = 20000
 
 # ===== FLAVORS (from actual inventory sheets) =====
 FLAVORS = [
@@ -51,25 +70,48 @@ FLAVORS = [
     ("Horchata", "Specialty"),
 ]
 
-flavor_objs = []
-for name, cat in FLAVORS:
-    f = Flavor(name=name, category=cat, active=True)
-    db.add(f)
-    flavor_objs.append(f)
-
-db.flush()  # assign IDs
-
-print(f"Seeded {len(flavor_objs)} flavors")
-
-# ===== SAMPLE DATA: 5 days of production + counts =====
-# Simulate a week: Feb 7-11
-
 # Popularity tiers (higher = more produced/sold)
 HIGH = ["Vanilla", "Chocolate", "Strawberry", "Cookie Dough", "Cookies n Cream", "Mint Chip"]
 MED = ["Sweet Cream", "Coffee", "Chocolate Chip", "PB Cup", "Rocky Road", "Chocolate PB Swirl",
        "Caramel Swirl", "Black Cherry", "Cookie Monster", "German Choc Brownie"]
-LOW = ["Banana Marshmallow", "Horchata", "Black Raspberry", "Creamcicle", "Peaches n Cream",
-       "Razzmanian Devil", "Toasted Almond", "Butter Pecan", "Funfetti"]
+
+# Product types each flavor is tracked in
+# All flavors get tubs; most get pints & quarts too
+# (Sweet Cream, Creamcicle, Peaches n Cream, Funfetti are tub-only per the sheets)
+TUB_ONLY = {"Sweet Cream", "Creamcicle", "Peaches n Cream", "Funfetti"}
+
+# Mean daily demand per (product_type, tier) on an average day
+BASE_DEMAND = {
+    ("tub", "high"): 2.2, ("tub", "med"): 1.3, ("tub", "low"): 0.7,
+    ("pint", "high"): 6.0, ("pint", "med"): 3.5, ("pint", "low"): 1.8,
+    ("quart", "high"): 3.5, ("quart", "med"): 2.0, ("quart", "low"): 1.0,
+}
+
+# Par levels: (target, minimum, batch, subsequent batch, weekend target)
+PAR_DEFAULTS = {
+    ("tub", "high"): (4, 2, 2.5, 2, 6),
+    ("tub", "med"): (3, 1, 2.5, 2, 4),
+    ("tub", "low"): (2, 1, 2.5, 2, 3),
+    ("pint", "high"): (10, 4, 6, 5, 14),
+    ("pint", "med"): (6, 2, 6, 5, 8),
+    ("pint", "low"): (4, 1, 4, 3, 6),
+    ("quart", "high"): (6, 2, 3, 2.5, 8),
+    ("quart", "med"): (4, 1, 3, 2.5, 5),
+    ("quart", "low"): (2, 1, 2, 1.5, 3),
+}
+
+# Demand multiplier by weekday (Mon..Sun); weekends are busiest
+DOW_DEMAND = np.array([0.75, 0.7, 0.8, 0.9, 1.2, 1.55, 1.4])
+SUMMER_SWING = 0.35        # Demand +/- this share between mid-July and mid-January
+TUB_SHAPE = 4.0            # Gamma shape for scooped tub demand (lower = noisier)
+
+SKIP_PRODUCTION_RATE = 0.08   # Mornings a below-par key isn't made anyway
+PREDICTED_RATE = 0.85         # Counts submitted with a smart-default prediction
+MISCOUNT_RATE = 0.03          # Counts off by a unit or two
+DELETED_PRODUCTION_RATE = 0.02  # Production entries logged by mistake and soft-deleted
+
+EMPLOYEES = ["Alex", "Jordan", "Sam", "Taylor", "Casey", "Riley", "Morgan", "Jamie"]
+
 
 def tier(name):
     if name in HIGH:
@@ -78,141 +120,249 @@ def tier(name):
         return "med"
     return "low"
 
-# Product types each flavor is tracked in
-# All flavors get tubs; most get pints & quarts too
-# (Sweet Cream, Creamcicle, Peaches n Cream, Funfetti are tub-only per the sheets)
-TUB_ONLY = {"Sweet Cream", "Creamcicle", "Peaches n Cream", "Funfetti"}
 
-now = datetime.utcnow()
-base_date = now.replace(hour=21, minute=0, second=0, microsecond=0) - timedelta(days=5)
-
-production_count = 0
-count_count = 0
-
-for day_offset in range(5):
-    day = base_date + timedelta(days=day_offset)
-    prod_time = day.replace(hour=8 + random.randint(0, 2))
-    count_time = day.replace(hour=21, minute=random.randint(0, 30))
-
-    for f in flavor_objs:
-        t = tier(f.name)
-        ptypes = ["tub"]
-        if f.name not in TUB_ONLY:
-            ptypes += ["pint", "quart"]
-
-        for ptype in ptypes:
-            # Production: not every flavor every day
-            if ptype == "tub":
-                if t == "high":
-                    make = random.choice([2, 3, 3, 4])
-                elif t == "med":
-                    make = random.choice([0, 1, 2, 2])
-                else:
-                    make = random.choice([0, 0, 1, 1])
-            elif ptype == "pint":
-                if t == "high":
-                    make = random.choice([6, 8, 10, 12])
-                elif t == "med":
-                    make = random.choice([0, 4, 6, 6])
-                else:
-                    make = random.choice([0, 0, 2, 4])
-            else:  # quart
-                if t == "high":
-                    make = random.choice([3, 4, 5, 6])
-                elif t == "med":
-                    make = random.choice([0, 2, 3, 3])
-                else:
-                    make = random.choice([0, 0, 1, 2])
-
-            if make > 0:
-                db.add(Production(
+def flavor_catalog(n_flavors, rng):
+    """(name, category, tier, product_types) for n flavors; the real list first."""
+    catalog = []
+    for i in range(n_flavors):
+        if i < len(FLAVORS):
+            name, cat = FLAVORS[i]
+            t = tier(name)
+            tub_only = name in TUB_ONLY
+        else:
+            name, cat = f"Test Flavor {i + 1:04d}", FLAVORS[i % len(FLAVORS)][1]
+            t = str(rng.choice(["high", "med", "low", "low"]))
+            tub_only = rng.random() < 0.15
+        ptypes = ["tub"] if tub_only else ["tub", "pint", "quart"]
+        catalog.append((name, cat, t, ptypes))
+    return catalog
+
+
+def seasonal_multiplier(day):
+    """Demand multiplier for a date: weekday pattern times a yearly summer peak."""
+    summer = 1 + SUMMER_SWING * math.cos(2 * math.pi * (day.timetuple().tm_yday - 196) / 365.25)
+    return DOW_DEMAND[day.weekday()] * summer
+
+
+def create_catalog(db, n_stores, n_flavors, rng):
+    """Create stores, flavors and par levels.
+
+    Returns:
+        dict of parallel arrays, one element per (store, flavor, product_type)
+    """
+    ensure_default_store()
+    store_ids = [DEFAULT_STORE_ID]
+    for n in range(2, n_stores + 1):
+        store = Store(name=f"Store {n}")
+        db.add(store)
+        db.flush()
+        store_ids.append(store.id)
+
+    keys = {
+        "store_id": [], "flavor_id": [], "product_type": [], "demand": [],
+        "target": [], "weekend_target": [], "batch": [], "subsequent": [],
+    }
+    for store_id in store_ids:
+        # Busier and quieter shops
+        store_scale = float(rng.lognormal(0, 0.3)) if store_id != DEFAULT_STORE_ID else 1.0
+        catalog = flavor_catalog(n_flavors, rng)
+        flavors = [Flavor(store_id=store_id, name=name, category=cat, active=True)
+                   for name, cat, _t, _p in catalog]
+        db.add_all(flavors)
+        db.flush()  # assign IDs
+
+        for f, (_name, _cat, t, ptypes) in zip(flavors, catalog):
+            for ptype in ptypes:
+                target, minimum, batch, subseq, wknd = PAR_DEFAULTS[(ptype, t)]
+                db.add(ParLevel(
+                    store_id=store_id,
                     flavor_id=f.id,
                     product_type=ptype,
-                    quantity=make,
-                    logged_at=prod_time + timedelta(minutes=random.randint(0, 60)),
+                    target=target,
+                    minimum=minimum,
+                    batch_size=batch,
+                    subsequent_batch_size=subseq,
+                    weekend_target=wknd,
                 ))
-                production_count += 1
-
-            # Daily count: simulate end-of-day remaining
-            # Tubs can be partial (scooped throughout the day)
-            if ptype == "tub":
-                if t == "high":
-                    remaining = random.choice([0.5, 1, 1.25, 1.5, 2, 2.75, 3])
-                elif t == "med":
-                    remaining = random.choice([1, 1.5, 2, 2.25, 2.5, 3, 3])
-                else:
-                    remaining = random.choice([2, 2.5, 3, 3.25, 3.5, 3.75, 4])
-            elif ptype == "pint":
-                if t == "high":
-                    remaining = random.choice([2, 4, 5, 6])
-                elif t == "med":
-                    remaining = random.choice([3, 5, 6, 8])
-                else:
-                    remaining = random.choice([4, 6, 8, 10])
-            else:  # quart
-                if t == "high":
-                    remaining = random.choice([1, 2, 3, 4])
-                elif t == "med":
-                    remaining = random.choice([2, 3, 4, 5])
-                else:
-                    remaining = random.choice([3, 4, 5, 6])
-
-            db.add(DailyCount(
-                flavor_id=f.id,
-                product_type=ptype,
-                count=remaining,
-                counted_at=count_time + timedelta(minutes=random.randint(0, 15)),
-            ))
-            count_count += 1
-
-db.commit()
-
-# ===== PAR LEVELS (sensible defaults based on popularity tiers) =====
-par_count = 0
-for f in flavor_objs:
-    t = tier(f.name)
-    ptypes = ["tub"]
-    if f.name not in TUB_ONLY:
-        ptypes += ["pint", "quart"]
-
-    for ptype in ptypes:
-        if ptype == "tub":
-            if t == "high":
-                target, minimum, batch, subseq, wknd = 4, 2, 2.5, 2, 6
-            elif t == "med":
-                target, minimum, batch, subseq, wknd = 3, 1, 2.5, 2, 4
-            else:
-                target, minimum, batch, subseq, wknd = 2, 1, 2.5, 2, 3
-        elif ptype == "pint":
-            if t == "high":
-                target, minimum, batch, subseq, wknd = 10, 4, 6, 5, 14
-            elif t == "med":
-                target, minimum, batch, subseq, wknd = 6, 2, 6, 5, 8
-            else:
-                target, minimum, batch, subseq, wknd = 4, 1, 4, 3, 6
-        else:  # quart
-            if t == "high":
-                target, minimum, batch, subseq, wknd = 6, 2, 3, 2.5, 8
-            elif t == "med":
-                target, minimum, batch, subseq, wknd = 4, 1, 3, 2.5, 5
-            else:
-                target, minimum, batch, subseq, wknd = 2, 1, 2, 1.5, 3
-
-        db.add(ParLevel(
-            flavor_id=f.id,
-            product_type=ptype,
-            target=target,
-            minimum=minimum,
-            batch_size=batch,
-            subsequent_batch_size=subseq,
-            weekend_target=wknd,
-        ))
-        par_count += 1
-
-db.commit()
-db.close()
-
-print(f"Seeded {production_count} production entries")
-print(f"Seeded {count_count} daily count entries")
-print(f"Seeded {par_count} par level entries")
-print("Done! Database ready at inventory.db")
+                keys["store_id"].append(store_id)
+                keys["flavor_id"].append(f.id)
+                keys["product_type"].append(ptype)
+                keys["demand"].append(BASE_DEMAND[(ptype, t)] * store_scale)
+                keys["target"].append(target)
+                keys["weekend_target"].append(wknd)
+                keys["batch"].append(batch)
+                keys["subsequent"].append(subseq)
+    db.flush()
+
+    cols = {k: np.array(v) for k, v in keys.items()}
+    cols["is_tub"] = cols["product_type"] == "tub"
+    return cols
+
+
+def _round_stock(values, is_tub):
+    """Tubs are counted to the quarter tub, pints and quarts whole."""
+    return np.where(is_tub, np.round(values * 4) / 4, np.round(values))
+
+
+def _write(db, model, rows, totals, name, force=False):
+    if rows and (force or len(rows) >= CHUNK_SIZE):
+        db.execute(insert(model.__table__), rows)
+        totals[name] += len(rows)
+        rows.clear()
+
+
+def simulate(db, cols, n_days, rng):
+    """Simulate n_days ending yesterday and bulk insert counts and production.
+
+    Returns:
+        dict of rows written per table and the last count time
+    """
+    K = len(cols["flavor_id"])
+    is_tub = cols["is_tub"]
+    store_ids = cols["store_id"].tolist()
+    flavor_ids = cols["flavor_id"].tolist()
+    ptypes = cols["product_type"].tolist()
+
+    # Open with stock at par so the first days aren't all production
+    stock = cols["target"].astype(float)
+    prev_count = None
+
+    totals = {"counts": 0, "production": 0, "deleted_production": 0}
+    count_rows, prod_rows = [], []
+    now = datetime.utcnow()
+    first_day = (now - timedelta(days=n_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    last_count_at = None
+
+    for d in range(n_days):
+        day = first_day + timedelta(days=d)
+        weekend = day.weekday() in (4, 5, 6)
+        mean = cols["demand"] * seasonal_multiplier(day)
+
+        # Morning production up to today's par, in stepping-yield batches
+        open_target = np.where(weekend, cols["weekend_target"], cols["target"])
+        deficit = np.maximum(0, open_target - stock)
+        make = (deficit > 0) & (rng.random(K) >= SKIP_PRODUCTION_RATE)
+        extra_batches = np.ceil(np.maximum(0, deficit - cols["batch"]) / cols["subsequent"])
+        produced = np.where(make, cols["batch"] + extra_batches * cols["subsequent"], 0)
+        stock = stock + produced
+
+        prod_minutes = rng.integers(0, 180, K).tolist()
+        prod_staff = rng.integers(0, len(EMPLOYEES), K).tolist()
+        deleted = make & (rng.random(K) < DELETED_PRODUCTION_RATE)
+        for i in np.flatnonzero(make).tolist():
+            logged_at = day + timedelta(hours=8, minutes=prod_minutes[i])
+            prod_rows.append({
+                "store_id": store_ids[i], "flavor_id": flavor_ids[i], "product_type": ptypes[i],
+                "quantity": float(produced[i]), "logged_at": logged_at,
+                "employee_name": EMPLOYEES[prod_staff[i]], "deleted_at": None, "deleted_by": None,
+            })
+            if deleted[i]:
+                # Fat-fingered duplicate entry, caught and soft-deleted a few minutes later
+                prod_rows.append({
+                    "store_id": store_ids[i], "flavor_id": flavor_ids[i], "product_type": ptypes[i],
+                    "quantity": float(produced[i]), "logged_at": logged_at + timedelta(minutes=1),
+                    "employee_name": EMPLOYEES[prod_staff[i]],
+                    "deleted_at": logged_at + timedelta(minutes=5), "deleted_by": EMPLOYEES[prod_staff[i]],
+                })
+                totals["deleted_production"] += 1
+
+        # Sales through the day, capped by what's on hand
+        demand = np.where(
+            is_tub,
+            rng.gamma(TUB_SHAPE, mean / TUB_SHAPE),
+            rng.poisson(mean),
+        )
+        stock = _round_stock(np.maximum(0, stock - demand), is_tub)
+
+        # Closing count, occasionally miscounted; the true stock carries over
+        miscount = rng.random(K) < MISCOUNT_RATE
+        error = rng.choice([-2, -1, 1, 2], K) * np.where(is_tub, 0.25, 1)
+        count = np.where(miscount, np.maximum(0, stock + error), stock)
+
+        # Smart-default prediction: last count + produced - expected use
+        if prev_count is None:
+            predicted = np.full(K, np.nan)
+        else:
+            predicted = _round_stock(np.maximum(0, prev_count + produced - mean), is_tub)
+            predicted[rng.random(K) >= PREDICTED_RATE] = np.nan
+        has_prediction = predicted > 0
+        variance = np.where(has_prediction, np.round(count - predicted, 2), np.nan)
+        variance_pct = np.where(
+            has_prediction, np.round(variance / np.where(has_prediction, predicted, 1) * 100, 2), np.nan
+        )
+
+        count_minutes = rng.integers(0, 45, K).tolist()
+        count_staff = rng.integers(0, len(EMPLOYEES), K).tolist()
+        for i, (c, p, v, vp) in enumerate(zip(count.tolist(), predicted.tolist(),
+                                              variance.tolist(), variance_pct.tolist())):
+            count_rows.append({
+                "store_id": store_ids[i], "flavor_id": flavor_ids[i], "product_type": ptypes[i],
+                "count": c, "counted_at": day + timedelta(hours=21, minutes=count_minutes[i]),
+                "predicted_count": None if p != p else p,
+                "variance": None if v != v else v,
+                "variance_pct": None if vp != vp else vp,
+                "employee_name": EMPLOYEES[count_staff[i]],
+            })
+        last_count_at = day + timedelta(hours=21, minutes=45)
+        prev_count = count
+        _write(db, DailyCount, count_rows, totals, "counts")
+        _write(db, Production, prod_rows, totals, "production")
+
+    _write(db, DailyCount, count_rows, totals, "counts", force=True)
+    _write(db, Production, prod_rows, totals, "production", force=True)
+    totals["last_count_at"] = last_count_at
+    return totals
+
+
+def seed(n_stores=1, n_flavors=len(FLAVORS), n_days=5, seed=None, build_rollups=True):
+    """Drop all tables and generate a fresh database.
+
+    Returns:
+        dict with rows written and elapsed seconds
+    """
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    # Wipe and recreate
+    Base.metadata.drop_all(bind=engine)
+    migrate()
+
+    db = SessionLocal()
+    try:
+        cols = create_catalog(db, n_stores, n_flavors, rng)
+        result = simulate(db, cols, n_days, rng)
+        if result["last_count_at"]:
+            db.query(Flavor).update({"last_counted_at": result["last_count_at"]})
+        db.commit()
+
+        result.update(stores=n_stores, flavors=n_stores * n_flavors, par_levels=len(cols["flavor_id"]))
+        result["seconds"] = round(time.perf_counter() - started, 1)
+        if build_rollups:
+            from rollups import rebuild_rollups
+            result["rollups"] = rebuild_rollups(db)["rows"]
+            result["seconds_with_rollups"] = round(time.perf_counter() - started, 1)
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wipe the database and generate flavors, counts and production.")
+    parser.add_argument("--stores", type=int, default=1, help="number of stores (default 1)")
+    parser.add_argument("--flavors", type=int, default=len(FLAVORS), help=f"flavors per store (default {len(FLAVORS)})")
+    parser.add_argument("--days", type=int, default=5, help="days of history ending yesterday (default 5)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a reproducible dataset")
+    parser.add_argument("--no-rollups", action="store_true", help="skip building report rollups (built on next startup)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.stores} store(s) x {args.flavors} flavors x {args.days} days...")
+    result = seed(args.stores, args.flavors, args.days, args.seed, build_rollups=not args.no_rollups)
+    print(f"Seeded {result['stores']} stores, {result['flavors']} flavors, {result['par_levels']} par levels")
+    print(f"Seeded {result['production']} production entries ({result['deleted_production']} soft-deleted)")
+    print(f"Seeded {result['counts']} daily count entries in {result['seconds']}s")
+    if "rollups" in result:
+        print(f"Built {result['rollups']} rollup rows ({result['seconds_with_rollups']}s total)")
+    print("Done!")
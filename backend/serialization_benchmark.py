@@ -0,0 +1,126 @@
+"""JSON serialization cost per endpoint.
+
+Calls each endpoint function directly (no HTTP) against a generated
+database to get its return value, then times only the encoding step both
+ways:
+- generic: FastAPI's jsonable_encoder followed by Starlette's json.dumps
+- fast: FastJSONResponse.render (orjson, see serialization.py)
+
+It also checks that both produce the same JSON document.
+
+Run this script:
+- python serialization_benchmark.py [--size medium] [--repeats 20]
+"""
+
+import argparse
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+from benchmark import BACKEND_DIR, SIZES, database_for, _percentile
+
+# (label, module, function, argument overrides)
+ENDPOINTS = [
+    ("GET /api/flavors", "routes.flavors", "list_flavors", {}),
+    ("GET /api/flavors/par-levels", "routes.flavors", "get_all_par_levels", {}),
+    ("GET /api/counts/history", "routes.counts", "count_history", {}),
+    ("GET /api/counts/smart-defaults", "routes.counts", "get_smart_defaults", {}),
+    ("GET /api/production", "routes.production", "list_production", {}),
+    ("GET /api/dashboard/inventory", "routes.dashboard", "current_inventory", {}),
+    ("GET /api/dashboard/consumption?days=30", "routes.dashboard", "daily_consumption", {"days": 30}),
+    ("GET /api/dashboard/make-list", "routes.dashboard", "morning_make_list", {}),
+    ("GET /api/reports/variance?days=30", "routes.reports", "variance_report", {"days": 30}),
+    ("GET /api/reports/employee-performance?days=30", "routes.reports", "employee_performance", {"days": 30}),
+    ("GET /api/forecast", "routes.forecast", "demand_forecast", {}),
+]
+
+
+def _call(endpoint, db, overrides):
+    """Call an endpoint function with its declared defaults, a session and the default store."""
+    from fastapi.params import Param
+
+    kwargs = {}
+    for name, param in inspect.signature(endpoint).parameters.items():
+        if name in overrides:
+            kwargs[name] = overrides[name]
+        elif name == "db":
+            kwargs[name] = db
+        elif name == "store_id":
+            kwargs[name] = 1
+        elif param.default is not inspect.Parameter.empty:
+            # Query(7, ...) and friends carry the real default on .default
+            default = param.default
+            kwargs[name] = default.default if isinstance(default, Param) else default
+    return inspect.unwrap(endpoint)(**kwargs)
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _percentile(samples, 50), out
+
+
+def run_worker(repeats):
+    import importlib
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+    from database import SessionLocal
+    from serialization import FastJSONResponse
+
+    generic = JSONResponse(None)
+    fast = FastJSONResponse(None)
+    results = []
+    db = SessionLocal()
+    try:
+        for label, module, name, overrides in ENDPOINTS:
+            endpoint = getattr(importlib.import_module(module), name)
+            content = _call(endpoint, db, overrides)
+            generic_ms, generic_body = _time(lambda: generic.render(jsonable_encoder(content)), repeats)
+            fast_ms, fast_body = _time(lambda: fast.render(content), repeats)
+            results.append({
+                "endpoint": label,
+                "kb": round(len(fast_body) / 1024, 1),
+                "generic_ms": round(generic_ms, 3),
+                "fast_ms": round(fast_ms, 3),
+                "same": json.loads(generic_body) == json.loads(fast_body),
+            })
+    finally:
+        db.close()
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time JSON serialization per endpoint.")
+    parser.add_argument("--size", choices=list(SIZES), default="medium")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeats)
+        sys.exit(0)
+
+    path = database_for(args.size, args.regenerate)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", "--repeats", str(args.repeats)],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    results = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"\n{args.size}: median encode time over {args.repeats} runs")
+    print(f"  {'endpoint':48} {'KB':>8} {'generic ms':>11} {'fast ms':>8} {'speedup':>8}")
+    for r in results:
+        speedup = r["generic_ms"] / r["fast_ms"] if r["fast_ms"] else float("inf")
+        note = "" if r["same"] else "  OUTPUT DIFFERS"
+        print(f"  {r['endpoint']:48} {r['kb']:8} {r['generic_ms']:11} {r['fast_ms']:8} {speedup:7.1f}x{note}")
+    if not all(r["same"] for r in results):
+        sys.exit(1)
@@ -0,0 +1,63 @@
+"""Store (shop location) scoping.
+
+Every flavor, count, production entry, par level and rollup belongs to one
+store. Requests choose a store with the `store_id` query parameter or the
+X-Store-Id header; without either they get the default store, so
+single-shop clients keep working unchanged.
+"""
+
+from typing import Optional
+from fastapi import Header, Query, HTTPException
+from sqlalchemy import text
+from database import SessionLocal, engine
+from models import Store
+from metrics import cache_lookup
+
+DEFAULT_STORE_ID = 1
+DEFAULT_STORE_NAME = "Main"
+
+# Store ids confirmed to exist; stores are never deleted
+_known_store_ids = set()
+
+
+def ensure_default_store():
+    """Create the default store that pre-existing rows belong to."""
+    db = SessionLocal()
+    try:
+        if db.query(Store.id).filter(Store.id == DEFAULT_STORE_ID).first() is None:
+            db.add(Store(id=DEFAULT_STORE_ID, name=DEFAULT_STORE_NAME))
+            db.commit()
+            if engine.dialect.name == "postgresql":
+                # Explicit id insert doesn't advance the serial sequence
+                db.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('stores', 'id'), (SELECT MAX(id) FROM stores))"
+                ))
+                db.commit()
+    finally:
+        db.close()
+
+
+def store_exists(store_id: int) -> bool:
+    if store_id in _known_store_ids:
+        cache_lookup("store", True)
+        return True
+    cache_lookup("store", False)
+    db = SessionLocal()
+    try:
+        found = db.query(Store.id).filter(Store.id == store_id).first() is not None
+    finally:
+        db.close()
+    if found:
+        _known_store_ids.add(store_id)
+    return found
+
+
+def get_store_id(
+    store_id: Optional[int] = Query(None),
+    x_store_id: Optional[int] = Header(None),
+) -> int:
+    """FastAPI dependency resolving the store a request is scoped to."""
+    resolved = store_id or x_store_id or DEFAULT_STORE_ID
+    if not store_exists(resolved):
+        raise HTTPException(404, "Store not found")
+    return resolved
@@ -0,0 +1,146 @@
+"""Delta sync for clients that keep a local copy of a store's lists.
+
+GET /api/sync?since=<cursor> returns the store's flavors, par levels, counts
+and production created or updated since the cursor (which includes soft
+deletes: archived and discontinued flavors, production with deleted_at set),
+the ids of rows deleted outright, and the cursor to send next time. Without
+a cursor it starts a full sync: the first page has "full": true, and the
+client replaces its copy with what that page and the ones after it bring.
+So does a cursor the server never issued, e.g. after a restore.
+
+Responses are paged: at most `limit` rows per table (default
+SYNC_PAGE_SIZE). While "has_more" is true the cursor continues the same
+sync, so keep calling with it; once it is false the cursor is the one to
+send next time.
+
+Every row of those tables carries change_seq, its store's data version
+(see datacache.py) as of the commit that last wrote it: database.py stamps
+it as part of each commit, and records deletions in deleted_rows. A sync
+reads the store's current version V first and returns rows with
+since < change_seq <= V, each table paged on (change_seq, id) with
+pagination.keyset_slice -- an index range scan per table. A store's writers
+commit in version order, so every row at or below V is already visible, and
+one committed after V was read is picked up by the next sync.
+
+Run this script:
+- Count a store's changes since a cursor: python sync.py [cursor] [--store-id N]
+"""
+
+import argparse
+import base64
+import orjson
+from fastapi import HTTPException
+from models import Flavor, ParLevel, DailyCount, Production, DeletedRow
+from pagination import keyset_slice
+import datacache
+import reads
+
+SYNC_PAGE_SIZE = 1000       # Rows per table per response
+MAX_SYNC_PAGE_SIZE = 5000
+
+# Response key -> model, for the synced tables (see database.SYNCED_TABLES)
+SYNCED = {"flavors": Flavor, "par_levels": ParLevel, "counts": DailyCount, "production": Production}
+_KEYS = {model.__tablename__: key for key, model in SYNCED.items()}
+
+
+def encode_cursor(until, since=None, positions=None):
+    """Cursor for a finished sync up to data version `until`, or, with
+    positions ({stream: [change_seq, id]}), for the next page of one."""
+    state = {"u": until}
+    if positions is not None:
+        state.update(s=since, p=positions)
+    return base64.urlsafe_b64encode(orjson.dumps(state)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """The state encoded by encode_cursor: "u", and "s" and "p" mid-sync.
+
+    Raises:
+        HTTPException(400) if the cursor is malformed
+    """
+    try:
+        state = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(state, dict) or not isinstance(state.get("u"), int):
+            raise ValueError(cursor)
+        if "p" in state and not (
+            (state.get("s") is None or isinstance(state["s"], int))
+            and isinstance(state["p"], dict)
+            and all(isinstance(pos, list) and len(pos) == 2 and all(isinstance(v, int) for v in pos)
+                    for pos in state["p"].values())
+        ):
+            raise ValueError(cursor)
+        return state
+    except (ValueError, UnicodeDecodeError, orjson.JSONDecodeError):
+        raise HTTPException(400, "Invalid sync cursor")
+
+
+def changes(db, store_id, cursor=None, limit=SYNC_PAGE_SIZE):
+    """One page of a store's rows changed since a cursor's data version.
+
+    Args:
+        cursor: State from decode_cursor, or None to start a full sync
+        limit: Most rows returned per table (and of deletions)
+
+    Returns:
+        dict with "cursor", "full", "has_more", a list of row dicts per
+        synced table and "deleted": ids per table of rows deleted outright
+    """
+    version = datacache.current(db, store_id)
+    if cursor is None or cursor["u"] > version:
+        since, until, positions, full = None, version, {}, True
+    elif "p" in cursor:
+        since, until, positions, full = cursor["s"], cursor["u"], dict(cursor["p"]), False
+    else:
+        since, until, positions, full = cursor["u"], version, {}, False
+
+    result = {"full": full}
+    has_more = False
+    for key, model in SYNCED.items():
+        rows, more = keyset_slice(db, reads.changed_rows(model, store_id, since, until),
+                                  model.change_seq, model.id, positions.get(key), limit)
+        items = []
+        for row in rows:
+            item = dict(row._mapping)
+            positions[key] = [item.pop("change_seq"), item["id"]]
+            items.append(item)
+        result[key] = items
+        has_more = has_more or more
+
+    result["deleted"] = {key: [] for key in SYNCED}
+    if since is not None:  # A full sync has nothing to delete
+        rows, more = keyset_slice(db, reads.deleted_rows(store_id, since, until),
+                                  DeletedRow.change_seq, DeletedRow.id, positions.get("deleted"), limit)
+        for row in rows:
+            result["deleted"][_KEYS[row.table_name]].append(row.row_id)
+            positions["deleted"] = [row.change_seq, row.id]
+        has_more = has_more or more
+
+    result["has_more"] = has_more
+    result["cursor"] = encode_cursor(until, since, positions) if has_more else encode_cursor(until)
+    return result
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    from stores import DEFAULT_STORE_ID
+
+    parser = argparse.ArgumentParser(description="Count a store's changes since a sync cursor.")
+    parser.add_argument("cursor", nargs="?")
+    parser.add_argument("--store-id", type=int, default=DEFAULT_STORE_ID)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        page = changes(db, args.store_id, decode_cursor(args.cursor) if args.cursor else None)
+        full, pages = page["full"], [page]
+        while page["has_more"]:
+            page = changes(db, args.store_id, decode_cursor(page["cursor"]))
+            pages.append(page)
+    finally:
+        db.close()
+    print(f"{'Full sync' if full else 'Changes'} up to data version {decode_cursor(page['cursor'])['u']} "
+          f"in {len(pages)} page(s) (next cursor {page['cursor']}):")
+    for key in SYNCED:
+        changed = sum(len(p[key]) for p in pages)
+        deleted = sum(len(p["deleted"][key]) for p in pages)
+        print(f"  {key:12} {changed:7} changed, {deleted} deleted")
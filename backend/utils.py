@@ -1,8 +1,7 @@
 """Helper utilities for auto-discontinuation logic."""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from datetime import datetime
+from sqlalchemy import select, update, func
 from models import DailyCount
 
 
@@ -20,33 +19,28 @@ def is_specialty_category(category: str) -> bool:
     return category.lower() in ['specialty', 'seasonal', 'specials']
 
 
-def update_last_counted_cache(db: Session, flavor_id: int) -> datetime:
-    """Update the last_counted_at field for a flavor based on most recent DailyCount.
+def update_last_counted_cache(db: Session, flavor_ids) -> None:
+    """Update the last_counted_at field of flavors from their most recent DailyCount.
 
-    This should be called after count submission to keep the cache fresh.
+    Call after counts are added or changed (and flushed), in the same
+    transaction: one UPDATE for all the flavors, and the caller commits.
 
     Args:
         db: Database session
-        flavor_id: The flavor ID to update
-
-    Returns:
-        The last counted datetime, or None if no counts exist
+        flavor_ids: The flavor IDs to update
     """
     from models import Flavor
 
-    # Get the most recent count for this flavor
-    last_count = (
-        db.query(DailyCount.counted_at)
-        .filter(DailyCount.flavor_id == flavor_id)
-        .order_by(desc(DailyCount.counted_at))
-        .first()
+    if not flavor_ids:
+        return
+    latest = (
+        select(func.max(DailyCount.counted_at))
+        .where(DailyCount.store_id == Flavor.store_id, DailyCount.flavor_id == Flavor.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Flavor)
+        .where(Flavor.id.in_(flavor_ids))
+        .values(last_counted_at=latest)
+        .execution_options(synchronize_session=False)
     )
-
-    # Update the flavor's cache
-    flavor = db.query(Flavor).filter(Flavor.id == flavor_id).first()
-    if flavor and last_count:
-        flavor.last_counted_at = last_count[0]
-        db.commit()
-        return last_count[0]
-
-    return None
@@ -0,0 +1,162 @@
+"""Voice command parsing through Groq, for POST /api/voice/parse-groq.
+
+Imported by the route on first use rather than at startup (see
+importtime.py), like the HTTP client it calls Groq with.
+"""
+
+import os
+import json
+from typing import List
+from metrics import track_llm_call
+from routes.voice import ParsedEntry, VoiceParseResponse
+
+# Groq API Configuration
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+def parse_transcript(transcript: str, available_flavors: List[str]) -> VoiceParseResponse:
+    """Parse a spoken count or production update into entries matched to available flavors."""
+    # Build prompt
+    flavors_list = ", ".join(available_flavors)
+
+    prompt = f"""You are a voice command parser for an ice cream inventory system.
+
+Available flavors: {flavors_list}
+
+Product types: tub, pint, quart
+
+User said: "{transcript}"
+
+Parse this into structured inventory entries. Detect:
+1. Flavor names (match to available flavors, use fuzzy matching)
+2. Product type (tub/pint/quart)
+3. Quantity (numbers, including "a" = 1, "two" = 2, etc.)
+4. Action: "add" if they say "another", "found", "add", "plus"; otherwise "set"
+
+Handle:
+- Multiple items in one utterance
+- Conversational fillers (oh, um, wait)
+- Compound entries like "tub of vanilla and chocolate" = 2 entries
+
+Respond ONLY with valid JSON in this exact format:
+{{
+  "entries": [
+    {{"flavor": "Vanilla", "type": "tub", "quantity": 1, "action": "set", "confidence": 0.95}},
+    {{"flavor": "Chocolate", "type": "tub", "quantity": 1, "action": "set", "confidence": 0.95}}
+  ]
+}}
+
+If you can't parse it, return: {{"entries": []}}"""
+
+    try:
+        # Call Groq API
+        import requests  # Lazy load to speed up app startup
+        with track_llm_call("groq") as call:
+            response = requests.post(
+                GROQ_API_URL,
+                headers={
+                    "Authorization": f"Bearer {GROQ_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "llama-3.3-70b-versatile",
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": "You are a JSON-only response bot. Always respond with valid JSON only, no other text."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    "temperature": 0.1,
+                    "max_tokens": 1024
+                },
+                timeout=10
+            )
+            call["ok"] = response.status_code == 200
+
+        # Check for errors before raising
+        if response.status_code != 200:
+            error_detail = response.text
+            print(f"Groq API Error {response.status_code}: {error_detail}")
+            return VoiceParseResponse(
+                entries=[],
+                confidence=0.0,
+                raw_response=f"Groq API Error {response.status_code}: {error_detail}"
+            )
+
+        result = response.json()
+
+        # Extract AI response
+        ai_response = result["choices"][0]["message"]["content"].strip()
+
+        # Parse JSON from response
+        # Handle markdown code blocks if present
+        if "```json" in ai_response:
+            ai_response = ai_response.split("```json")[1].split("```")[0].strip()
+        elif "```" in ai_response:
+            ai_response = ai_response.split("```")[1].split("```")[0].strip()
+
+        parsed = json.loads(ai_response)
+
+        # Validate and normalize entries
+        validated_entries = []
+        for entry in parsed.get("entries", []):
+            # Fuzzy match flavor name
+            matched_flavor = fuzzy_match_flavor(entry["flavor"], available_flavors)
+            if matched_flavor:
+                validated_entries.append(ParsedEntry(
+                    flavor=matched_flavor,
+                    type=entry["type"].lower(),
+                    quantity=float(entry["quantity"]),
+                    action=entry.get("action", "set"),
+                    confidence=entry.get("confidence", 0.8)
+                ))
+
+        # Calculate overall confidence
+        if validated_entries:
+            avg_confidence = sum(e.confidence for e in validated_entries) / len(validated_entries)
+        else:
+            avg_confidence = 0.0
+
+        return VoiceParseResponse(
+            entries=validated_entries,
+            confidence=avg_confidence,
+            raw_response=ai_response
+        )
+
+    except Exception as e:
+        print(f"Groq API error: {e}")
+        return VoiceParseResponse(
+            entries=[],
+            confidence=0.0,
+            raw_response=str(e)
+        )
+
+
+
+def fuzzy_match_flavor(spoken_name: str, available_flavors: List[str]) -> str:
+    """Fuzzy match spoken flavor name to available flavors."""
+    spoken = spoken_name.lower().strip()
+
+    # Exact match
+    for flavor in available_flavors:
+        if flavor.lower() == spoken:
+            return flavor
+
+    # Contains match
+    for flavor in available_flavors:
+        if spoken in flavor.lower() or flavor.lower() in spoken:
+            return flavor
+
+    # Word match
+    spoken_words = set(spoken.split())
+    for flavor in available_flavors:
+        flavor_words = set(flavor.lower().split())
+        if spoken_words & flavor_words:  # Any word overlap
+            return flavor
+
+    return None
@@ -0,0 +1,169 @@
+"""Background cache warm-up.
+
+After startup, and again whenever shop data changes, a background thread in
+each worker computes the results the first screens ask for into the
+datacache caches, for every store: inventory, alerts, the make list, smart
+defaults, the forecast behind them and the default report windows. The first
+person to open the app after a cold start or the nightly count then gets a
+cached response, or waits for the warm-up's computation already under way
+rather than starting another.
+
+The thread wakes right away when a route calls request() after a
+significant write (a count batch, an import), and otherwise every
+WARMUP_POLL_SECONDS. It warms again the stores whose data version has moved
+since its last pass (every store once the date has moved), so writes made
+through other workers are picked up within one poll. After a wake-up it waits WARMUP_DEBOUNCE_SECONDS so a
+burst of writes is warmed once.
+
+GET /ready answers 503 until the first pass has finished, then 200. It
+also answers 200 if that pass failed, since the app still works, just
+cold. /health stays a pure liveness check.
+
+Settings (environment):
+- WARMUP_ENABLED: 0 disables warm-up (/ready is then ready at once)
+- WARMUP_POLL_SECONDS: default 15
+- WARMUP_DEBOUNCE_SECONDS: default 2
+
+Run this script:
+- Time one warm pass (cold, then warm): python warmup.py
+"""
+
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from database import SessionLocal
+from models import Store
+import datacache
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") != "0"
+WARMUP_POLL_SECONDS = float(os.environ.get("WARMUP_POLL_SECONDS", "15"))
+WARMUP_DEBOUNCE_SECONDS = float(os.environ.get("WARMUP_DEBOUNCE_SECONDS", "2"))
+
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+_state = {
+    "ready": not WARMUP_ENABLED,
+    "passes": 0,
+    "warmed_versions": None,
+    "warmed_date": None,
+    "last_started_at": None,
+    "last_finished_at": None,
+    "last_ms": None,
+    "last_error": None,
+}
+
+
+def warm(warmed=None):
+    """Compute the stores' cached first-screen results.
+
+    Args:
+        warmed: "data_versions" of an earlier pass today; stores still at
+            those versions are skipped (None warms every store)
+
+    Returns:
+        dict with "stores" (how many were warmed), "data_versions" and "ms"
+    """
+    from routes import counts, dashboard, reports
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        versions = datacache.versions(db)
+        store_ids = [
+            store_id for (store_id,) in db.query(Store.id).order_by(Store.id)
+            if warmed is None or warmed.get(store_id) != versions.get(store_id)
+        ]
+        for store_id in store_ids:
+            dashboard.current_inventory(store_id=store_id, db=db)
+            dashboard.low_stock_alerts(store_id=store_id, db=db)  # Also the forecast
+            dashboard.morning_make_list(store_id=store_id, db=db)
+            counts.get_smart_defaults(store_id=store_id, db=db)
+            dashboard.flavor_popularity(days=7, date_from=None, date_to=None, store_id=store_id, db=db)
+            reports.waste_report(days=7, date_from=None, date_to=None, store_id=store_id, db=db)
+    finally:
+        db.close()
+    return {"stores": len(store_ids), "data_versions": versions,
+            "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def _stale():
+    """Whether any store's data or the date moved since the last pass."""
+    if _state["warmed_date"] != datetime.utcnow().date():
+        return True
+    db = SessionLocal()
+    try:
+        return datacache.versions(db) != _state["warmed_versions"]
+    finally:
+        db.close()
+
+
+def _warm_pass():
+    _state["last_started_at"] = datetime.utcnow()
+    today = _state["last_started_at"].date()
+    try:
+        result = warm(_state["warmed_versions"] if _state["warmed_date"] == today else None)
+        _state.update(warmed_versions=result["data_versions"], warmed_date=today,
+                      last_ms=result["ms"], last_error=None)
+    except Exception:
+        _state["last_error"] = traceback.format_exc()
+        print(f"Cache warm-up failed:\n{_state['last_error']}")
+    _state["passes"] += 1
+    _state["last_finished_at"] = datetime.utcnow()
+    _state["ready"] = True
+
+
+def _loop():
+    _warm_pass()
+    while not _stop.is_set():
+        if _wake.wait(WARMUP_POLL_SECONDS):
+            if _stop.wait(WARMUP_DEBOUNCE_SECONDS):
+                return
+            _wake.clear()
+        if _stop.is_set():
+            return
+        try:
+            if _stale():
+                _warm_pass()
+        except Exception:
+            print(f"Cache warm-up check failed:\n{traceback.format_exc()}")
+
+
+def start():
+    """Start this process's warm-up thread (no-op when disabled or already running)."""
+    global _thread
+    if not WARMUP_ENABLED or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="warmup", daemon=True)
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+    _wake.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+
+
+def request():
+    """Ask for a warm pass soon, after a write that changes what the first screens show."""
+    _wake.set()
+
+
+def status():
+    """Readiness and the last pass's timing, for GET /ready."""
+    state = dict(_state)
+    for name in ("warmed_date", "last_started_at", "last_finished_at"):
+        if state[name] is not None:
+            state[name] = state[name].isoformat()
+    state["enabled"] = WARMUP_ENABLED
+    return state
+
+
+if __name__ == "__main__":
+    cold = warm()
+    again = warm()
+    print(f"Warmed {cold['stores']} store(s): {cold['ms']} ms cold, {again['ms']} ms from cache")
@@ -0,0 +1,122 @@
+"""Check that a write served by one worker invalidates the caches of the others.
+
+Starts several single-worker uvicorn processes on one scratch copy of a
+generated database -- the same as gunicorn -w N, except each worker can be
+addressed directly -- and then:
+1. warms every worker's inventory cache and checks the next request is a
+   cache hit (from each worker's /metrics)
+2. submits a count through the first worker
+3. checks every other worker misses its cache once and returns the new
+   on-hand figure, then hits again
+
+Exits with status 1 if any worker serves stale data.
+
+Run this script:
+- python worker_coherence.py [--workers 3] [--size small]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import requests
+from benchmark import BACKEND_DIR, SIZES, database_for
+from loadtest import start_server, REQUEST_TIMEOUT
+
+INVENTORY = "/api/dashboard/inventory"
+
+
+def cache_lookups(url, cache="inventory"):
+    """(hits, misses) of one worker's cache, from its /metrics."""
+    text = requests.get(f"{url}/metrics", timeout=REQUEST_TIMEOUT).text
+    counts = {"hit": 0, "miss": 0}
+    for result, value in re.findall(rf'cache_lookups_total{{cache="{cache}",result="(\w+)"}} (\S+)', text):
+        counts[result] = float(value)
+    return counts["hit"], counts["miss"]
+
+
+def on_hand(url, flavor_id, product_type="tub"):
+    inventory = requests.get(f"{url}{INVENTORY}", timeout=REQUEST_TIMEOUT).json()
+    item = next(item for item in inventory if item["flavor_id"] == flavor_id)
+    return item["products"][product_type]["on_hand"]
+
+
+def check(urls):
+    """Run the scenario; returns a list of failure messages."""
+    failures = []
+    flavor_id = requests.get(f"{urls[0]}{INVENTORY}", timeout=REQUEST_TIMEOUT).json()[0]["flavor_id"]
+
+    print("Warming caches:")
+    for i, url in enumerate(urls):
+        before = on_hand(url, flavor_id)
+        hits = cache_lookups(url)[0]
+        on_hand(url, flavor_id)
+        cached = cache_lookups(url)[0] > hits
+        print(f"  worker {i}: on_hand {before}, second read {'cached' if cached else 'NOT cached'}")
+        if not cached:
+            failures.append(f"worker {i} did not serve inventory from its cache")
+
+    new_count = before + 7
+    response = requests.post(
+        f"{urls[0]}/api/counts",
+        json={"entries": [{"flavor_id": flavor_id, "product_type": "tub", "count": new_count}]},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    print(f"Counted {new_count} tubs of flavor {flavor_id} through worker 0")
+
+    for i, url in enumerate(urls[1:], start=1):
+        misses = cache_lookups(url)[1]
+        seen = on_hand(url, flavor_id)
+        recomputed = cache_lookups(url)[1] > misses
+        hits = cache_lookups(url)[0]
+        on_hand(url, flavor_id)
+        cached_again = cache_lookups(url)[0] > hits
+        ok = seen == new_count and recomputed and cached_again
+        print(f"  worker {i}: on_hand {seen}, {'recomputed' if recomputed else 'served from cache'}, "
+              f"then {'cached' if cached_again else 'NOT cached'}: {'OK' if ok else 'FAIL'}")
+        if seen != new_count:
+            failures.append(f"worker {i} returned on_hand {seen} after the write, expected {new_count}")
+        if not cached_again:
+            failures.append(f"worker {i} did not cache the recomputed inventory")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check cross-worker cache invalidation.")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--size", default="small", choices=list(SIZES), help="generated database to use")
+    args = parser.parse_args()
+
+    source = database_for(args.size)
+    db_path = source.replace(".sqlite", ".workers.sqlite")
+    shutil.copyfile(source, db_path)
+    # Warm-up threads refill caches on their own; keep them out so hits and misses are the requests'
+    os.environ["WARMUP_ENABLED"] = "0"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    # Migrate once up front, as start.sh does, rather than racing in each worker
+    subprocess.run([sys.executable, "migrations.py"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+
+    procs, urls = [], []
+    try:
+        for i in range(args.workers):
+            proc, url = start_server(db_path, 1, db_path.replace(".sqlite", f".{i}.log"))
+            procs.append(proc)
+            urls.append(url)
+        failures = check(urls)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=30)
+        for path in [db_path] + [db_path.replace(".sqlite", f".{i}.log") for i in range(args.workers)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
@@ -245,6 +245,26 @@ async function api(path, opts = {}) {
   return res.json();
 }
 
+// POST that is safe to retry: every attempt carries the same Idempotency-Key,
+// so if the connection drops after the server saved it, the retry gets the
+// saved response back instead of saving a second copy.
+async function postOnce(path, body, attempts = 3) {
+  const key = crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await api(path, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
+        body: JSON.stringify(body),
+      });
+    } catch (e) {
+      // fetch rejects with a TypeError when the request or response was lost
+      if (!(e instanceof TypeError) || attempt >= attempts) throw e;
+      await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+    }
+  }
+}
+
 function toast(msg, type = 'success') {
   const el = document.getElementById('toast');
   el.textContent = msg;
@@ -1812,14 +1832,11 @@ async function confirmProductionVoiceBatch() {
   let successCount = 0;
   for (const entry of result.entries) {
     try {
-      await api('/api/production', {
-        method: 'POST',
-        body: JSON.stringify({
-          flavor_id: entry.flavorId,
-          product_type: entry.type,
-          quantity: entry.quantity,
-          employee_name: employeeName
-        })
+      await postOnce('/api/production', {
+        flavor_id: entry.flavorId,
+        product_type: entry.type,
+        quantity: entry.quantity,
+        employee_name: employeeName
       });
       successCount++;
     } catch (e) {
@@ -2606,10 +2623,7 @@ async function submitProductionBatch(e) {
         employee_name: entry.employee_name
       };
       if (loggedAt) body.logged_at = loggedAt;
-      await api('/api/production', {
-        method: 'POST',
-        body: JSON.stringify(body)
-      });
+      await postOnce('/api/production', body);
       successCount++;
     } catch (e) {
       console.error('Failed to log production:', e);
@@ -2968,10 +2982,7 @@ async function confirmSubmitCounts() {
   btn.textContent = 'Submitting...';
 
   try {
-    await api('/api/counts', {
-      method: 'POST',
-      body: JSON.stringify({ entries }),
-    });
+    await postOnce('/api/counts', { entries });
     toast(`Saved ${entries.length} counts!`);
 
     // Save employee name to localStorage for next time
@@ -4816,10 +4827,7 @@ async function submitPhotoImport() {
   }
 
   try {
-    await api('/api/counts', {
-      method: 'POST',
-      body: JSON.stringify({ entries: dedupedEntries }),
-    });
+    await postOnce('/api/counts', { entries: dedupedEntries });
     const msg = `Imported ${dedupedEntries.length} counts!` +
                 (skippedCount > 0 ? ` (${skippedCount} skipped — unmatched flavors)` : '');
     toast(msg);
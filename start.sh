@@ -3,4 +3,8 @@
 # Uses gunicorn with uvicorn workers for better performance
 
 cd backend
-gunicorn -w 1 -k uvicorn.workers.UvicornWorker app:app --bind 0.0.0.0:${PORT:-8000}
+python assets.py
+# Migrate once here, not concurrently in every worker's startup
+python migrations.py
+# Workers keep their caches coherent through the data_version row (see datacache.py)
+gunicorn -w ${WEB_CONCURRENCY:-2} -k uvicorn.workers.UvicornWorker app:app --bind 0.0.0.0:${PORT:-8000}